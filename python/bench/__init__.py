@@ -0,0 +1,5 @@
+"""
+Benchmarks of the interpreter pipeline over generated programs.
+
+Run 'python -m bench --help' from the python directory.
+"""
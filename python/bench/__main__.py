@@ -0,0 +1,133 @@
+import json
+import sys
+from argparse import ArgumentParser
+
+from spi.lexer import Scanner
+
+from bench.generator import generate_program
+from bench.harness import compare
+from bench.harness import ENGINES
+from bench.harness import run_benchmarks
+from bench.harness import scale_workload
+from bench.harness import WORKLOADS
+
+
+def _print_report(report):
+    for workload, result in report["workloads"].items():
+        source = result["source"]
+        print(
+            f"{workload}: {source['lines']} lines, "
+            f"{source['tokens']} tokens"
+        )
+        for stage, timing in result["stages"].items():
+            print(
+                f"  {stage:<16} {timing['median'] * 1000:10.3f} ms "
+                f"{timing['ops_per_sec']:10.2f} ops/s "
+                f"{timing['peak_memory'] / 1024:10.1f} KiB"
+            )
+
+
+def _print_comparison(rows, max_slowdown):
+    slower = 0
+    for workload, stage, median, old_median, ratio in rows:
+        mark = ""
+        if ratio > 1 + max_slowdown:
+            mark = "  SLOWER"
+            slower += 1
+        print(
+            f"{workload:<14} {stage:<16} {old_median * 1000:10.3f} ms -> "
+            f"{median * 1000:10.3f} ms {(ratio - 1) * 100:+7.1f}%{mark}"
+        )
+    return slower
+
+
+def main():
+    parser = ArgumentParser(
+        prog="python -m bench",
+        description="Benchmarks of the interpreter over generated programs."
+    )
+    parser.add_argument(
+        "workloads",
+        nargs="*",
+        help=f"Workloads to run, all by default: {', '.join(WORKLOADS)}."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--repeat",
+        help="Number of timed runs of every stage.",
+        type=int,
+        default=5
+    )
+    parser.add_argument(
+        "--scale",
+        help="Multiplies the sizes of the programs except nesting.",
+        type=float,
+        default=1.0
+    )
+    parser.add_argument(
+        "--scanner",
+        choices=[scanner.value for scanner in Scanner],
+        default=Scanner.CHAR.value
+    )
+    parser.add_argument(
+        "--engine",
+        help="Engines to time, all by default.",
+        action="append",
+        choices=list(ENGINES)
+    )
+    parser.add_argument(
+        "--output",
+        help="Save the results as JSON.",
+        metavar="FILE"
+    )
+    parser.add_argument(
+        "--baseline",
+        help="Compare the results with the saved ones.",
+        metavar="FILE"
+    )
+    parser.add_argument(
+        "--max-slowdown",
+        help="Fail if a stage is slower than the baseline by this fraction.",
+        type=float,
+        default=0.1
+    )
+    parser.add_argument(
+        "--emit",
+        help="Print the program of the workload instead of running it.",
+        choices=list(WORKLOADS)
+    )
+    args = parser.parse_args()
+    for workload in args.workloads:
+        if workload not in WORKLOADS:
+            parser.error(f"unknown workload '{workload}'")
+
+    if args.emit is not None:
+        sizes = scale_workload(WORKLOADS[args.emit], args.scale)
+        print(generate_program(seed=args.seed, **sizes), end="")
+        return 0
+
+    report = run_benchmarks(
+        args.workloads or list(WORKLOADS),
+        seed=args.seed,
+        repeat=args.repeat,
+        scale=args.scale,
+        scanner=Scanner(args.scanner),
+        engines=args.engine or list(ENGINES)
+    )
+    _print_report(report)
+
+    if args.output is not None:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        print()
+        if _print_comparison(compare(report, baseline), args.max_slowdown):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import json
+import statistics
+import sys
+from argparse import ArgumentParser
+
+from source_to_source import SourceToSourceCompiler
+from spi.front_end import check_tree
+from spi.interpreter import Interpreter
+from spi.lexer import Lexer
+from spi.parser import Parser
+from spi.semantic_analyzer import SemanticAnalyzer
+
+from bench.generator import generate_program
+from bench.harness import scale_workload
+from bench.harness import time_stage
+from bench.harness import WORKLOADS
+
+
+def _visit_by_name(self, node):
+    # The lookup NodeVisitor did before it had dispatch tables
+    method_name = "_visit_" + type(node).__name__
+    visitor = getattr(self, method_name, self._generic_visit)
+    return visitor(node)
+
+
+def by_name(visitor_class):
+    """
+    Returns a subclass of the visitor dispatching like NodeVisitor
+    did before, to compare with.
+    """
+    return type(
+        visitor_class.__name__, (visitor_class,), {"_visit": _visit_by_name}
+    )
+
+
+def make_visitors(text):
+    """
+    Returns (name, run, visitor class) of the visitors, 'run' takes
+    the visitor class and runs it over the program.
+    """
+    tokens = Lexer(text=text).tokenize_all()
+    parsed_tree = Parser(lexer=tokens.reader()).parse()
+    tree = check_tree(Parser(lexer=tokens.reader()).parse())
+
+    def analyze(analyzer_class):
+        analyzer_class().analyze(parsed_tree)
+
+    def execute(interpreter_class):
+        interpreter_class(parser=None).run(tree)
+
+    # The parser keeps its tree, so only the compiler runs every time
+    parser = Parser(lexer=tokens.reader())
+    parser.parse()
+
+    def compile_source(compiler_class):
+        compiler_class(parser=parser).compile()
+
+    return [
+        ("analyze", analyze, SemanticAnalyzer),
+        ("execute", execute, Interpreter),
+        ("source", compile_source, SourceToSourceCompiler),
+    ]
+
+
+def count_visits(run, visitor_class):
+    count = 0
+
+    def visit(self, node):
+        nonlocal count
+        count += 1
+        return visitor_class._visit(self, node)
+
+    run(type(visitor_class.__name__, (visitor_class,), {"_visit": visit}))
+    return count
+
+
+def measure_dispatch(text, repeat=5):
+    """
+    Times every visitor with dispatch tables and with lookups by name.
+    The difference per visit is the dispatch overhead saved.
+    """
+    results = {}
+    for name, run, visitor_class in make_visitors(text):
+        visits = count_visits(run, visitor_class)
+        named_class = by_name(visitor_class)
+        table = statistics.median(
+            time_stage(lambda: run(visitor_class), repeat)
+        )
+        named = statistics.median(
+            time_stage(lambda: run(named_class), repeat)
+        )
+        results[name] = {
+            "visits": visits,
+            "table": table,
+            "by_name": named,
+            "table_ns_per_visit": table / visits * 1e9,
+            "by_name_ns_per_visit": named / visits * 1e9,
+            "saved_ns_per_visit": (named - table) / visits * 1e9,
+        }
+    return results
+
+
+def main():
+    parser = ArgumentParser(
+        prog="python -m bench.dispatch",
+        description=(
+            "Time per node of the visitors with NodeVisitor dispatch "
+            "tables and with method lookups by name."
+        )
+    )
+    parser.add_argument(
+        "workloads",
+        nargs="*",
+        help=f"Workloads to measure, all by default: {', '.join(WORKLOADS)}."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument(
+        "--output",
+        help="Save the results as JSON.",
+        metavar="FILE"
+    )
+    args = parser.parse_args()
+    for workload in args.workloads:
+        if workload not in WORKLOADS:
+            parser.error(f"unknown workload '{workload}'")
+
+    report = {}
+    for workload in args.workloads or list(WORKLOADS):
+        sizes = scale_workload(WORKLOADS[workload], args.scale)
+        text = generate_program(seed=args.seed, **sizes)
+        report[workload] = measure_dispatch(text, repeat=args.repeat)
+        print(f"{workload}:")
+        for name, result in report[workload].items():
+            print(
+                f"  {name:<8} {result['visits']:>9} visits "
+                f"{result['table_ns_per_visit']:>8.1f} ns/visit "
+                f"{result['by_name_ns_per_visit']:>8.1f} ns/visit by name "
+                f"{result['saved_ns_per_visit']:>7.1f} ns saved"
+            )
+
+    if args.output is not None:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import random
+
+
+# Parenthesized groups keep the trees of long expressions shallow,
+# so the recursive visitors don't run out of python stack.
+GROUP_SIZE = 8
+
+# Literals and the values of all variables stay below this bound
+MAX_VALUE = 1000
+
+
+class ProgramGenerator:
+    """
+    Generates valid pascal programs of configurable size.
+
+    The program declares 'declarations' global variables and a chain of
+    'nesting' procedures, each nested into the previous one. The main
+    block initializes the globals and calls the outermost procedure
+    'calls' times, every procedure calls the next one once. Procedure
+    bodies assign expressions of 'expression_length' terms to their
+    locals and to a global.
+
+    Every variable is assigned before it is read and expressions only
+    divide by positive literals, so programs run without errors. Values
+    are kept small. The same seed always gives the same program.
+    """
+
+    def __init__(
+            self,
+            seed=0,
+            declarations=100,
+            nesting=4,
+            expression_length=16,
+            calls=100,
+            locals_per_procedure=4
+    ):
+        self._random = random.Random(seed)
+        self._declarations = max(declarations, 1)
+        self._nesting = max(nesting, 1)
+        self._expression_length = max(expression_length, 1)
+        self._calls = calls
+        self._locals_per_procedure = max(locals_per_procedure, 1)
+        self._lines = []
+
+    def generate(self):
+        self._lines = []
+        globals_ = [f"g{i}" for i in range(self._declarations)]
+
+        self._emit(0, "program Bench;")
+        self._emit(0, "var")
+        for name in globals_:
+            self._emit(1, f"{name} : integer;")
+        self._emit(0, "")
+        self._procedure(level=1, visible=globals_, globals_=globals_)
+
+        self._emit(0, "begin { Main }")
+        for name in globals_:
+            self._emit(1, f"{name} := {self._literal()};")
+        for _ in range(self._calls):
+            self._emit(1, f"P1({self._expression(globals_)});")
+        self._emit(0, "end.  { Main }")
+        return "\n".join(self._lines) + "\n"
+
+    def _procedure(self, level, visible, globals_):
+        indent = level - 1
+        parameter = f"a{level}"
+        locals_ = [
+            f"l{level}_{i}" for i in range(self._locals_per_procedure)
+        ]
+
+        self._emit(indent, f"procedure P{level}({parameter} : integer);")
+        self._emit(indent, "var")
+        for name in locals_:
+            self._emit(indent + 1, f"{name} : integer;")
+        self._emit(indent, "")
+
+        # Locals are visible to the nested procedures only after the
+        # body of this one has assigned them, which happens before the call
+        visible = visible + [parameter]
+        if level < self._nesting:
+            self._procedure(level + 1, visible + locals_, globals_)
+
+        self._emit(indent, f"begin {{ P{level} }}")
+        for name in locals_:
+            self._emit(indent + 1, f"{name} := {self._expression(visible)};")
+            visible = visible + [name]
+        target = self._random.choice(globals_)
+        self._emit(indent + 1, f"{target} := {self._expression(visible)};")
+        if level < self._nesting:
+            self._emit(
+                indent + 1, f"P{level + 1}({self._expression(visible)});"
+            )
+        self._emit(indent, f"end;  {{ P{level} }}")
+        self._emit(0, "")
+
+    def _expression(self, visible):
+        # Terms are at most 9 * MAX_VALUE in absolute value and there are
+        # 'length' of them, so the division brings the sum back in bounds.
+        length = self._expression_length
+        return f"({self._terms(visible, length)}) div {10 * length}"
+
+    def _terms(self, visible, length):
+        if length <= GROUP_SIZE:
+            parts = [self._term(visible) for _ in range(length)]
+        else:
+            size = -(-length // GROUP_SIZE)
+            parts = [
+                f"({self._terms(visible, min(size, length - start))})"
+                for start in range(0, length, size)
+            ]
+
+        expression = parts[0]
+        for part in parts[1:]:
+            expression += f" {self._random.choice('+-')} {part}"
+        return expression
+
+    def _term(self, visible):
+        choice = self._random.random()
+        if choice < 0.25:
+            return str(self._literal())
+        name = self._random.choice(visible)
+        if choice < 0.5:
+            return f"{name} * {self._random.randint(2, 9)}"
+        return name
+
+    def _literal(self):
+        return self._random.randint(1, MAX_VALUE - 1)
+
+    def _emit(self, indent, line):
+        self._lines.append("   " * indent + line if line else "")
+
+
+def generate_program(seed=0, **sizes):
+    """
+    Returns the source of a generated program, see ProgramGenerator.
+    """
+    return ProgramGenerator(seed=seed, **sizes).generate()
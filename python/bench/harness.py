@@ -0,0 +1,189 @@
+import gc
+import platform
+import statistics
+import tracemalloc
+from time import perf_counter
+
+from spi import __version__
+from spi.closure_compiler import ClosureInterpreter
+from spi.front_end import check_tree
+from spi.interpreter import Interpreter
+from spi.lexer import Lexer
+from spi.lexer import Scanner
+from spi.optimizer import ConstantFolder
+from spi.parser import Parser
+from spi.python_codegen import PythonInterpreter
+from spi.semantic_analyzer import SemanticAnalyzer
+from spi.stack_interpreter import StackInterpreter
+from spi.vm import VirtualMachine
+
+from bench.generator import generate_program
+
+
+ENGINES = {
+    "tree": Interpreter,
+    "closure": ClosureInterpreter,
+    "python": PythonInterpreter,
+    "vm": VirtualMachine,
+    "stack": StackInterpreter,
+}
+
+# Sizes of the generated programs, every workload stresses one dimension
+WORKLOADS = {
+    "declarations": dict(
+        declarations=5000, nesting=1, expression_length=4, calls=1
+    ),
+    "nesting": dict(
+        declarations=10, nesting=32, expression_length=4, calls=20
+    ),
+    "expressions": dict(
+        declarations=20, nesting=1, expression_length=2000, calls=5
+    ),
+    "calls": dict(
+        declarations=10, nesting=2, expression_length=4, calls=5000
+    ),
+}
+
+# Sizes which aren't multiplied by the scale
+UNSCALED = ("nesting",)
+
+
+def scale_workload(sizes, scale):
+    return {
+        name: value if name in UNSCALED else max(int(value * scale), 1)
+        for name, value in sizes.items()
+    }
+
+
+def make_stages(text, scanner=Scanner.CHAR, engines=tuple(ENGINES)):
+    """
+    Returns pairs of a stage name and a function running the stage.
+
+    Every stage starts from the output of the previous one, prepared
+    once here, so the functions time one pipeline stage each.
+    """
+    tokens = Lexer(text=text, scanner=scanner).tokenize_all()
+    parsed_tree = Parser(lexer=tokens.reader()).parse()
+    tree = check_tree(Parser(lexer=tokens.reader()).parse())
+
+    stages = [
+        ("lex", lambda: Lexer(text=text, scanner=scanner).tokenize_all()),
+        ("parse", lambda: Parser(lexer=tokens.reader()).parse()),
+        ("analyze", lambda: SemanticAnalyzer().analyze(parsed_tree)),
+        ("fold", lambda: ConstantFolder().fold(tree)),
+    ]
+    for engine in engines:
+        engine_class = ENGINES[engine]
+        stages.append(
+            (
+                f"execute:{engine}",
+                lambda engine_class=engine_class:
+                    engine_class(parser=None).run(tree)
+            )
+        )
+    return stages, len(tokens)
+
+
+def time_stage(function, repeat):
+    """
+    Returns the wall times of 'repeat' runs. The garbage collector is
+    paused for every run like timeit does.
+    """
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = perf_counter()
+            function()
+            times.append(perf_counter() - start)
+        finally:
+            gc.enable()
+    return times
+
+
+def peak_memory(function):
+    """
+    Returns the peak of memory allocated by python during one run,
+    in bytes.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        function()
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+def run_workload(sizes, seed=0, repeat=5, **stage_options):
+    text = generate_program(seed=seed, **sizes)
+    stages, token_count = make_stages(text, **stage_options)
+
+    results = {}
+    for name, function in stages:
+        times = time_stage(function, repeat)
+        median = statistics.median(times)
+        results[name] = {
+            "min": min(times),
+            "median": median,
+            "ops_per_sec": 1 / median if median else None,
+            "peak_memory": peak_memory(function),
+        }
+    # The parse stage reads tokens too, so both report a token rate
+    for name in ("lex", "parse"):
+        median = results[name]["median"]
+        results[name]["tokens_per_sec"] = token_count / median if median else None
+
+    return {
+        "sizes": sizes,
+        "source": {
+            "bytes": len(text.encode()),
+            "lines": text.count("\n"),
+            "tokens": token_count,
+        },
+        "stages": results,
+    }
+
+
+def run_benchmarks(workloads, seed=0, repeat=5, scale=1.0, **stage_options):
+    """
+    Runs the named workloads and returns a JSON compatible report.
+    """
+    report = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "seed": seed,
+        "repeat": repeat,
+        "scale": scale,
+        "workloads": {},
+    }
+    for name in workloads:
+        sizes = scale_workload(WORKLOADS[name], scale)
+        report["workloads"][name] = run_workload(
+            sizes, seed=seed, repeat=repeat, **stage_options
+        )
+    return report
+
+
+def compare(report, baseline):
+    """
+    Yields (workload, stage, median, baseline median, ratio) for every
+    stage found in both reports. A ratio over 1 is a slowdown.
+    """
+    for workload, result in report["workloads"].items():
+        old_result = baseline["workloads"].get(workload)
+        if old_result is None:
+            continue
+        for stage, timing in result["stages"].items():
+            old_timing = old_result["stages"].get(stage)
+            if old_timing is None:
+                continue
+            yield (
+                workload,
+                stage,
+                timing["median"],
+                old_timing["median"],
+                timing["median"] / old_timing["median"],
+            )
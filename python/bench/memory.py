@@ -0,0 +1,131 @@
+import gc
+import json
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+
+from spi.activation_record import ActivationRecord
+from spi.activation_record import ArType
+from spi.arena import parse_to_arena
+from spi.ast import walk
+from spi.lexer import Lexer
+from spi.parser import Parser
+from spi.semantic_analyzer import SemanticAnalyzer
+
+from bench.generator import generate_program
+from bench.harness import scale_workload
+from bench.harness import WORKLOADS
+
+
+# Number of activation records allocated to measure one of them
+RECORD_COUNT = 10000
+
+
+def _allocated(function):
+    """
+    Returns the result of the function and the bytes it left allocated.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = function()
+        gc.collect()
+        return result, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def measure_tree(text):
+    """
+    Returns the sizes of the parse tree and of the arena of the program.
+    The tokens are lexed in advance, so only the nodes and the tokens
+    they keep count.
+    """
+    tokens = Lexer(text=text).tokenize_all()
+    tree, tree_bytes = _allocated(lambda: Parser(lexer=tokens.reader()).parse())
+    node_count = sum(1 for _ in walk(tree))
+
+    arena, arena_bytes = _allocated(lambda: parse_to_arena(tokens.reader()))
+
+    analyzer = SemanticAnalyzer()
+    _, analysis_bytes = _allocated(lambda: analyzer.analyze(tree))
+    return {
+        "nodes": node_count,
+        "tree_bytes": tree_bytes,
+        "bytes_per_node": tree_bytes / node_count,
+        "arena_nodes": len(arena),
+        "arena_bytes": arena_bytes,
+        "arena_bytes_per_node": arena_bytes / len(arena),
+        "symbols": analyzer.symbol_count,
+        "analysis_bytes": analysis_bytes,
+    }
+
+
+def measure_records(slot_count=4):
+    slot_names = tuple(f"v{i}" for i in range(slot_count))
+    records, records_bytes = _allocated(
+        lambda: [
+            ActivationRecord(
+                name="p",
+                ar_type=ArType.PROCEDURE,
+                nesting_level=2,
+                slot_names=slot_names
+            )
+            for _ in range(RECORD_COUNT)
+        ]
+    )
+    return {
+        "slots": slot_count,
+        "bytes_per_record": records_bytes / len(records),
+    }
+
+
+def main():
+    parser = ArgumentParser(
+        prog="python -m bench.memory",
+        description="Memory taken by parse trees and activation records."
+    )
+    parser.add_argument(
+        "workloads",
+        nargs="*",
+        help=f"Workloads to measure, all by default: {', '.join(WORKLOADS)}."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument(
+        "--output",
+        help="Save the results as JSON.",
+        metavar="FILE"
+    )
+    args = parser.parse_args()
+    for workload in args.workloads:
+        if workload not in WORKLOADS:
+            parser.error(f"unknown workload '{workload}'")
+
+    report = {"workloads": {}, "records": measure_records()}
+    for name in args.workloads or list(WORKLOADS):
+        sizes = scale_workload(WORKLOADS[name], args.scale)
+        text = generate_program(seed=args.seed, **sizes)
+        result = measure_tree(text)
+        report["workloads"][name] = result
+        print(
+            f"{name:<14} {result['nodes']:>8} nodes "
+            f"{result['tree_bytes'] / 1024:>10.1f} KiB "
+            f"{result['bytes_per_node']:>8.1f} B/node "
+            f"{result['arena_bytes_per_node']:>8.1f} B/node in arena "
+            f"{result['analysis_bytes'] / 1024:>10.1f} KiB analysis"
+        )
+    print(
+        f"{'records':<14} {report['records']['bytes_per_record']:.1f} "
+        f"B/record with {report['records']['slots']} slots"
+    )
+
+    if args.output is not None:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,263 @@
 
+import json
+import sys
 from argparse import ArgumentParser
+from functools import partial
 
-from spi.lexer import Lexer
-from spi.parser import Parser
+from spi.batch import collect_sources
+from spi.batch import run_batch
+from spi.cache import build_cached_file_tree
+from spi.cache import default_cache_directory
+from spi.cache import MemoryCache
+from spi.cache import ParseCache
+from spi.cache import DEFAULT_MAX_ENTRIES
+from spi.cache import DEFAULT_MAX_SIZE
+from spi.lexer import Scanner
 from spi.interpreter import Interpreter
+from spi.closure_compiler import ClosureInterpreter
+from spi.profiler import Profile
+from spi.profiler import ProfileMode
+from spi.profiler import ProfilingInterpreter
+from spi.python_codegen import PythonInterpreter
+from spi.server import Server
+from spi.stack_interpreter import StackInterpreter
+from spi.stats import profile_file
+from spi.tracing import FileSink
+from spi.tracing import StdoutSink
+from spi.tracing import Tracer
+from spi.vm import VirtualMachine
 
 
-def _evaluate(path_to_source, should_log_stack=False):
-    with open(path_to_source) as source_file:
-        interpreter = Interpreter(
-            should_log_stack=should_log_stack,
-            parser=Parser(lexer=Lexer(text=source_file.read()))
+# Maps engine name to the class that executes a program
+ENGINES = {
+    "tree": Interpreter,
+    "closure": ClosureInterpreter,
+    "python": PythonInterpreter,
+    "vm": VirtualMachine,
+    "stack": StackInterpreter,
+}
+
+
+def _evaluate(
+        path_to_source,
+        tracer=None,
+        scanner=Scanner.CHAR,
+        engine_class=Interpreter,
+        optimize=False,
+        cache=None,
+        profile=None
+):
+    if profile is not None:
+        ar, stats = profile_file(
+            path_to_source,
+            engine_class,
+            scanner=scanner,
+            optimize=optimize,
+            cache=cache,
+            tracer=tracer
+        )
+        if profile == "json":
+            print(stats.to_json(), file=sys.stderr)
+        else:
+            print(stats.format_text(), file=sys.stderr)
+        return ar
+
+    tree = build_cached_file_tree(
+        path_to_source, cache=cache, optimize=optimize, scanner=scanner
+    )
+    interpreter = engine_class(parser=None, tracer=tracer)
+    return interpreter.run(tree)
+
+
+def _print_pascal_profile(profile, collapsed_path):
+    print(profile.format_flat(), file=sys.stderr)
+    print(file=sys.stderr)
+    print(profile.format_call_tree(), file=sys.stderr)
+    if collapsed_path is not None:
+        with open(collapsed_path, "w") as collapsed_file:
+            collapsed_file.write(profile.format_collapsed(with_lines=True))
+
+
+def _make_tracer(should_log_stack, trace_path):
+    sinks = []
+    if should_log_stack:
+        sinks.append(StdoutSink())
+    if trace_path is not None:
+        sinks.append(FileSink(trace_path))
+    if not sinks:
+        return None
+    return Tracer(sinks=sinks)
+
+
+def _add_front_end_arguments(parser):
+    parser.add_argument(
+        "--scanner",
+        help="Lexer backend: character walker or master regex.",
+        choices=[scanner.value for scanner in Scanner],
+        default=Scanner.CHAR.value
+    )
+    parser.add_argument(
+        "--engine",
+        help=(
+            "Execution engine: tree walking, closure compilation, "
+            "python code generation, register virtual machine or "
+            "tree walking on an explicit stack without recursion."
+        ),
+        choices=list(ENGINES),
+        default="tree"
+    )
+    parser.add_argument(
+        "--optimize",
+        help="Fold constant expressions before execution.",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--no-cache",
+        help="Don't read or write cached parse trees.",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory of cached parse trees.",
+        default=default_cache_directory()
+    )
+    parser.add_argument(
+        "--cache-size",
+        help="Maximum size of the cache directory in bytes.",
+        type=int,
+        default=DEFAULT_MAX_SIZE
+    )
+
+
+def _batch(argv):
+    parser = ArgumentParser(
+        prog="jjpi batch",
+        description=(
+            "Runs many Pascal programs in a pool of processes and prints "
+            "the result of every program as a JSON line."
+        )
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="Directories, glob patterns or manifests of Pascal sources."
+    )
+    parser.add_argument(
+        "--workers",
+        help="Number of worker processes, all CPUs by default.",
+        type=int
+    )
+    parser.add_argument(
+        "--chunksize",
+        help="Number of programs sent to a worker at once.",
+        type=int,
+        default=1
+    )
+    parser.add_argument(
+        "--output",
+        help="Write the results to the file instead of stdout.",
+        metavar="FILE"
+    )
+    _add_front_end_arguments(parser)
+    args = parser.parse_args(argv)
+
+    results = run_batch(
+        collect_sources(args.inputs),
+        workers=args.workers,
+        chunksize=args.chunksize,
+        engine_class=ENGINES[args.engine],
+        optimize=args.optimize,
+        scanner=Scanner(args.scanner),
+        cache_directory=None if args.no_cache else args.cache_dir,
+        cache_size=args.cache_size
+    )
+    output = sys.stdout if args.output is None else open(args.output, "w")
+    failures = 0
+    try:
+        for result in results:
+            if result["status"] != "ok":
+                failures += 1
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 1 if failures else 0
+
+
+def _serve(argv):
+    parser = ArgumentParser(
+        prog="jjpi serve",
+        description=(
+            "Runs Pascal programs for clients sending JSON lines on stdin "
+            "or a unix socket. A request is {\"id\": ..., \"source\": ...} "
+            "or {\"id\": ..., \"path\": ...}, optionally with 'engine', "
+            "'optimize' and 'scanner'. The options below are the defaults."
         )
-    return interpreter.execute()
+    )
+    parser.add_argument(
+        "--socket",
+        help="Listen on a unix socket instead of stdin and stdout.",
+        metavar="PATH"
+    )
+    parser.add_argument(
+        "--workers",
+        help="Number of threads running the requests.",
+        type=int
+    )
+    parser.add_argument(
+        "--memory-cache",
+        help="Number of checked parse trees kept in memory.",
+        type=int,
+        default=DEFAULT_MAX_ENTRIES
+    )
+    _add_front_end_arguments(parser)
+    args = parser.parse_args(argv)
+
+    backing = None
+    if not args.no_cache:
+        backing = ParseCache(args.cache_dir, max_size=args.cache_size)
+    server = Server(
+        ENGINES,
+        default_engine=ENGINES[args.engine],
+        optimize=args.optimize,
+        scanner=Scanner(args.scanner),
+        cache=MemoryCache(max_entries=args.memory_cache, backing=backing),
+        workers=args.workers
+    )
+    with server:
+        server.warm_up()
+        if args.socket is None:
+            # Responses own stdout, stray prints go to stderr
+            output, sys.stdout = sys.stdout, sys.stderr
+            try:
+                server.serve(sys.stdin, output)
+            finally:
+                sys.stdout = output
+            return 0
+
+        with server.unix_server(args.socket) as unix_server:
+            try:
+                unix_server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+    return 0
+
 
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] == "batch":
+        return _batch(argv[1:])
+    if argv and argv[0] == "serve":
+        return _serve(argv[1:])
 
-def main():
     parser = ArgumentParser(
-        description="JJPI - Simple Pascal Interpreter"
+        description="JJPI - Simple Pascal Interpreter",
+        epilog=(
+            "Run 'jjpi.py batch --help' to run many programs at once and "
+            "'jjpi.py serve --help' to keep a server running them."
+        )
     )
     parser.add_argument("input_file", help="Pascal source file.")
     parser.add_argument(
@@ -25,9 +265,74 @@ def main():
         help="Print stack information during execution.",
         action="store_true"
     )
-    args = parser.parse_args()
-    _evaluate(args.input_file, args.stack)
+    parser.add_argument(
+        "--trace",
+        help="Write program and procedure activations as JSON lines.",
+        metavar="FILE"
+    )
+    parser.add_argument(
+        "--profile",
+        help=(
+            "Print the time, memory peak and counters of every phase "
+            "to stderr, as a table or JSON."
+        ),
+        nargs="?",
+        choices=["text", "json"],
+        const="text"
+    )
+    parser.add_argument(
+        "--pascal-profile",
+        help=(
+            "Attribute the work to pascal procedures and lines by counting "
+            "visited nodes or sampling on a timer. Needs the tree engine."
+        ),
+        choices=[mode.value for mode in ProfileMode]
+    )
+    parser.add_argument(
+        "--collapsed",
+        help="Write the pascal profile as collapsed stacks for flamegraphs.",
+        metavar="FILE"
+    )
+    _add_front_end_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.pascal_profile is not None and args.engine != "tree":
+        parser.error("--pascal-profile needs the tree engine")
+    if (args.stack or args.trace is not None) and args.engine == "python":
+        parser.error(
+            "--stack and --trace are not supported by the python engine"
+        )
+
+    engine_class = ENGINES[args.engine]
+    pascal_profile = None
+    if args.pascal_profile is not None:
+        pascal_profile = Profile()
+        engine_class = partial(
+            ProfilingInterpreter,
+            profile=pascal_profile,
+            mode=ProfileMode(args.pascal_profile)
+        )
+    cache = None
+    if not args.no_cache:
+        cache = ParseCache(args.cache_dir, max_size=args.cache_size)
+
+    tracer = _make_tracer(args.stack, args.trace)
+    try:
+        _evaluate(
+            args.input_file,
+            tracer=tracer,
+            scanner=Scanner(args.scanner),
+            engine_class=engine_class,
+            optimize=args.optimize,
+            cache=cache,
+            profile=args.profile
+        )
+        if pascal_profile is not None:
+            _print_pascal_profile(pascal_profile, args.collapsed)
+    finally:
+        if tracer is not None:
+            tracer.close()
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -2,7 +2,8 @@
 from spi.node_visitor import NodeVisitor
 from spi.parser import Parser
 from spi.lexer import Lexer
-from spi.semantic_analyzer import PascalDuplicateIdentifier, PascalNameError
+from spi.errors import ErrorCode
+from spi.errors import SemanticError
 from spi.symbol import ProcedureSymbol
 from spi.symbol import ScopedSymbolTable
 from spi.symbol import VarSymbol
@@ -52,8 +53,10 @@ class SourceToSourceCompiler(NodeVisitor):
         var_name = node.var_node.value
         type_symbol = self._scope.lookup(node.type_node.value)
         if self._scope.lookup(name=var_name, go_deep=False) is not None:
-            raise PascalDuplicateIdentifier(
-                f"Error: Duplicate identifier '{var_name}' is found."
+            raise SemanticError(
+                error_code=ErrorCode.DUPLICATE_ID,
+                token=node.var_node.token,
+                message=f"Duplicate identifier '{var_name}' is found."
             )
         var_symbol = VarSymbol(var_name, type_symbol)
         self._scope.insert(VarSymbol(var_name, type_symbol))
@@ -89,7 +92,11 @@ class SourceToSourceCompiler(NodeVisitor):
         var_name = node.left.value
         var_symbol = self._scope.lookup(var_name)
         if var_symbol is None:
-            raise PascalNameError(var_name)
+            raise SemanticError(
+                error_code=ErrorCode.ID_NOT_FOUND,
+                token=node.left.token,
+                message=var_name
+            )
 
         tab = "    " * self._scope.scope_level
         left = f"<{var_name}{self._scope.scope_level}:{var_symbol.get_type()}>"
@@ -101,6 +108,17 @@ class SourceToSourceCompiler(NodeVisitor):
         right = self._visit(node.right)
         return f"{left} {node.op.get_value()} {right}"
 
+    def _visit_UnaryOperation(self, node):
+        return f"{node.op.get_value()}{self._visit(node.right)}"
+
+    def _visit_Number(self, node):
+        return str(node.value)
+
+    def _visit_ProcedureCall(self, node):
+        tab = "    " * self._scope.scope_level
+        params = ", ".join(self._visit(param) for param in node.actual_params)
+        self._lines.append(tab + f"{node.proc_name}({params});")
+
     def _visit_Var(self, node):
         var_name = node.value
         var_symbol = self._scope.lookup(var_name)
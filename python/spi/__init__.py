@@ -0,0 +1,2 @@
+# Part of the keys of cached parse trees, bump it when the tree changes
+__version__ = "0.11.0"
@@ -1,4 +1,3 @@
-
 from enum import Enum
 
 
@@ -7,38 +6,114 @@ class ArType(Enum):
     PROCEDURE = "procedure"
 
 
+class FrameSnapshot:
+    """
+    Copy of the variables of an activation record at some moment.
+    """
+
+    __slots__ = ("name", "ar_type", "nesting_level", "members")
+
+    def __init__(self, name, ar_type, nesting_level, members):
+        self.name = name
+        self.ar_type = ar_type
+        self.nesting_level = nesting_level
+        self.members = members
+
+    def __str__(self):
+        lines = [
+            "{level}: {ar_type} {name}".format(
+                level=self.nesting_level,
+                ar_type=self.ar_type,
+                name=self.name
+            )
+        ]
+        for name, val in self.members:
+            lines.append(f"    {name:<20}: {val}")
+
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return self.__str__()
+
+
 class ActivationRecord:
-    def __init__(self, name, ar_type, nesting_level):
+    """
+    Frame of a running program or procedure.
+
+    Variables live in a fixed size list of slots. The semantic analyzer
+    resolves every variable to the index of its slot, so the interpreter
+    accesses them through 'slots' directly. Access by name is kept for
+    diagnostics and tests.
+    """
+
+    __slots__ = (
+        "_name",
+        "_type",
+        "_nesting_level",
+        "_slot_names",
+        "slots",
+        "access_link",
+    )
+
+    def __init__(self, name, ar_type, nesting_level, slot_names=()):
         self._name = name
         self._type = ar_type
         self._nesting_level = nesting_level
-        self._members = {}
+        self._slot_names = slot_names
+        self.slots = [None] * len(slot_names)
+
+        # Record of the enclosing block, set when the record is pushed
+        self.access_link = None
 
     def __setitem__(self, key, value):
-        self._members[key] = value
+        self.slots[self._slot_index(key)] = value
 
     def __getitem__(self, item):
-        return self._members[item]
+        return self.slots[self._slot_index(item)]
 
     def get(self, key):
-        return self._members.get(key)
+        if key not in self._slot_names:
+            return None
+        return self[key]
+
+    def items(self):
+        """
+        Names and values of the variables which have a value.
+        """
+        return [
+            (name, value)
+            for name, value in zip(self._slot_names, self.slots)
+            if value is not None
+        ]
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def ar_type(self):
+        return self._type
 
     @property
     def nesting_level(self):
         return self._nesting_level
 
-    def __str__(self):
-        lines = [
-            "{level}: {ar_type} {name}".format(
-                level=self._nesting_level,
-                ar_type=self._type,
-                name=self._name
-            )
-        ]
-        for name, val in self._members.items():
-            lines.append(f"    {name:<20}: {val}")
+    def _slot_index(self, name):
+        try:
+            return self._slot_names.index(name)
+        except ValueError:
+            raise KeyError(name)
 
-        return "\n".join(lines)
+    def snapshot(self):
+        return FrameSnapshot(
+            name=self._name,
+            ar_type=self._type,
+            nesting_level=self._nesting_level,
+            members=tuple(self.items())
+        )
+
+    def __str__(self):
+        return str(self.snapshot())
 
     def __repr__(self):
         return self.__str__()
@@ -0,0 +1,379 @@
+import struct
+from array import array
+from enum import IntEnum
+from hashlib import sha256
+
+from spi.builder import AstBuilder
+from spi.node_visitor import NodeVisitor
+from spi.parser import Parser
+from spi.token import Token
+from spi.token import TokenType
+from spi.token_table import TokenTable
+
+
+class NodeKind(IntEnum):
+    # Names match the methods of the builders making the nodes
+    PROGRAM = 0
+    BLOCK = 1
+    VAR_DECLARATION = 2
+    TYPE = 3
+    PROCEDURE_DECLARATION = 4
+    PARAM = 5
+    PROCEDURE_CALL = 6
+    COMPOUND = 7
+    ASSIGN = 8
+    VAR = 9
+    BINARY_OPERATION = 10
+    UNARY_OPERATION = 11
+    NUMBER = 12
+    NO_OP = 13
+
+
+# Token index of the nodes without a token
+NO_TOKEN = -1
+
+MAGIC = b"JJAR"
+
+_HEADER = struct.Struct("<4sII")
+
+
+class AstArena:
+    """
+    Parse tree stored in parallel arrays instead of a graph of objects.
+
+    Node 'i' has a kind, the index of its token in the token table or
+    NO_TOKEN, and its children are a range of the edges array. Children
+    are always added before their parents, so the last node is the root
+    and a pass in index order sees the children of a node before it.
+    Operators are the types of the tokens of the operation nodes.
+
+    Arenas keep parse trees only. Trees converted from spi.ast drop the
+    annotations of the semantic analyzer, the names of the program and
+    procedures lose their positions.
+    """
+
+    def __init__(self):
+        self._kinds = array("B")
+        self._token_indices = array("i")
+        self._first_children = array("I")
+        self._child_counts = array("I")
+        self._edges = array("I")
+        self._tokens = TokenTable()
+
+    def add_node(self, kind, token=None, children=()):
+        """
+        Appends a node and returns its index.
+        """
+        token_index = NO_TOKEN
+        if token is not None:
+            token_index = len(self._tokens)
+            if self._tokens.lines is None:
+                self._tokens.lines = token.get_lines()
+            self._tokens.append(
+                token.get_type(), token.get_value(), token.get_offset()
+            )
+
+        self._kinds.append(kind)
+        self._token_indices.append(token_index)
+        self._first_children.append(len(self._edges))
+        self._child_counts.append(len(children))
+        self._edges.extend(children)
+        return len(self._kinds) - 1
+
+    def __len__(self):
+        return len(self._kinds)
+
+    @property
+    def root(self):
+        return len(self._kinds) - 1
+
+    def get_kind(self, index):
+        return NodeKind(self._kinds[index])
+
+    def get_token(self, index):
+        token_index = self._token_indices[index]
+        if token_index == NO_TOKEN:
+            return None
+        return self._tokens.token(token_index)
+
+    def get_token_type(self, index):
+        token_index = self._token_indices[index]
+        if token_index == NO_TOKEN:
+            return None
+        return self._tokens.get_type(token_index)
+
+    def get_value(self, index):
+        token_index = self._token_indices[index]
+        if token_index == NO_TOKEN:
+            return None
+        return self._tokens.get_value(token_index)
+
+    def children(self, index):
+        start = self._first_children[index]
+        return self._edges[start:start + self._child_counts[index]].tolist()
+
+    def walk(self, index=None):
+        """
+        Yields the indices of the nodes of the subtree, parents before
+        their children, without recursion.
+        """
+        stack = [self.root if index is None else index]
+        while stack:
+            index = stack.pop()
+            yield index
+            start = self._first_children[index]
+            stack.extend(
+                reversed(self._edges[start:start + self._child_counts[index]])
+            )
+
+    def to_bytes(self):
+        """
+        Serializes the arena. Arrays are written in the native byte order.
+        """
+        return b"".join(
+            [
+                _HEADER.pack(MAGIC, len(self._kinds), len(self._edges)),
+                self._kinds.tobytes(),
+                self._token_indices.tobytes(),
+                self._first_children.tobytes(),
+                self._child_counts.tobytes(),
+                self._edges.tobytes(),
+                self._tokens.to_bytes(),
+            ]
+        )
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, node_count, edge_count = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a serialized AST arena.")
+
+        arena = cls()
+        offset = _HEADER.size
+        columns = (
+            (arena._kinds, node_count),
+            (arena._token_indices, node_count),
+            (arena._first_children, node_count),
+            (arena._child_counts, node_count),
+            (arena._edges, edge_count),
+        )
+        for column, count in columns:
+            size = count * column.itemsize
+            column.frombytes(data[offset:offset + size])
+            offset += size
+        arena._tokens, _ = TokenTable.from_bytes(data, offset)
+        return arena
+
+    def digest(self):
+        return sha256(self.to_bytes()).hexdigest()
+
+    def to_tree(self, builder=None):
+        """
+        Replays the nodes into a builder, spi.ast objects by default.
+
+        Returns the root made by the builder.
+        """
+        if builder is None:
+            builder = AstBuilder()
+
+        nodes = []
+        for index in range(len(self._kinds)):
+            kind = self._kinds[index]
+            token = self.get_token(index)
+            c = [nodes[child] for child in self.children(index)]
+
+            if kind == NodeKind.PROGRAM:
+                node = builder.program(token, c[0])
+            elif kind == NodeKind.BLOCK:
+                node = builder.block(c[:-1], c[-1])
+            elif kind == NodeKind.VAR_DECLARATION:
+                node = builder.var_declaration(c[0], c[1])
+            elif kind == NodeKind.TYPE:
+                node = builder.type(token)
+            elif kind == NodeKind.PROCEDURE_DECLARATION:
+                node = builder.procedure_declaration(token, c[:-1], c[-1])
+            elif kind == NodeKind.PARAM:
+                node = builder.param(c[0], c[1])
+            elif kind == NodeKind.PROCEDURE_CALL:
+                node = builder.procedure_call(token, c)
+            elif kind == NodeKind.COMPOUND:
+                node = builder.compound(c)
+            elif kind == NodeKind.ASSIGN:
+                node = builder.assign(c[0], token, c[1])
+            elif kind == NodeKind.VAR:
+                node = builder.var(token)
+            elif kind == NodeKind.BINARY_OPERATION:
+                node = builder.binary_operation(c[0], token, c[1])
+            elif kind == NodeKind.UNARY_OPERATION:
+                node = builder.unary_operation(token, c[0])
+            elif kind == NodeKind.NUMBER:
+                node = builder.number(token)
+            else:
+                node = builder.no_op()
+            nodes.append(node)
+        return nodes[-1]
+
+    @classmethod
+    def from_tree(cls, tree):
+        arena = cls()
+        _ArenaWriter(ArenaBuilder(arena)).write(tree)
+        return arena
+
+
+class ArenaBuilder:
+    """
+    Builder which lets the Parser emit nodes straight into an arena.
+    The nodes are their indices.
+    """
+
+    def __init__(self, arena):
+        self._arena = arena
+
+    @property
+    def arena(self):
+        return self._arena
+
+    def program(self, name_token, block):
+        return self._arena.add_node(NodeKind.PROGRAM, name_token, (block,))
+
+    def block(self, declarations, compound_statement):
+        return self._arena.add_node(
+            NodeKind.BLOCK,
+            children=(*declarations, compound_statement)
+        )
+
+    def var_declaration(self, var_node, type_node):
+        return self._arena.add_node(
+            NodeKind.VAR_DECLARATION, children=(var_node, type_node)
+        )
+
+    def type(self, token):
+        return self._arena.add_node(NodeKind.TYPE, token)
+
+    def procedure_declaration(self, name_token, params, block):
+        return self._arena.add_node(
+            NodeKind.PROCEDURE_DECLARATION, name_token, (*params, block)
+        )
+
+    def param(self, var_node, type_node):
+        return self._arena.add_node(
+            NodeKind.PARAM, children=(var_node, type_node)
+        )
+
+    def procedure_call(self, token, actual_params):
+        return self._arena.add_node(
+            NodeKind.PROCEDURE_CALL, token, actual_params
+        )
+
+    def compound(self, children):
+        return self._arena.add_node(NodeKind.COMPOUND, children=children)
+
+    def assign(self, left, op, right):
+        return self._arena.add_node(NodeKind.ASSIGN, op, (left, right))
+
+    def var(self, token):
+        return self._arena.add_node(NodeKind.VAR, token)
+
+    def binary_operation(self, left, op, right):
+        return self._arena.add_node(
+            NodeKind.BINARY_OPERATION, op, (left, right)
+        )
+
+    def unary_operation(self, op, right):
+        return self._arena.add_node(NodeKind.UNARY_OPERATION, op, (right,))
+
+    def number(self, token):
+        return self._arena.add_node(NodeKind.NUMBER, token)
+
+    def no_op(self):
+        return self._arena.add_node(NodeKind.NO_OP)
+
+
+class _ArenaWriter(NodeVisitor):
+    """
+    Feeds an spi.ast tree to a builder, children first. Nodes shared
+    by several parents, like the type of 'a, b : integer', are built once.
+    """
+
+    def __init__(self, builder):
+        self._builder = builder
+        self._built = {}
+
+    def write(self, tree):
+        return self._visit(tree)
+
+    def _visit(self, node):
+        built = self._built.get(node)
+        if built is None:
+            built = super()._visit(node)
+            self._built[node] = built
+        return built
+
+    def _visit_Program(self, node):
+        block = self._visit(node.block)
+        return self._builder.program(_name_token(node.name), block)
+
+    def _visit_Block(self, node):
+        declarations = [self._visit(decl) for decl in node.declarations]
+        compound = self._visit(node.compound_statement)
+        return self._builder.block(declarations, compound)
+
+    def _visit_VarDeclaration(self, node):
+        var_node = self._visit(node.var_node)
+        return self._builder.var_declaration(var_node, self._visit(node.type_node))
+
+    def _visit_Type(self, node):
+        return self._builder.type(node.token)
+
+    def _visit_ProcedureDeclaration(self, node):
+        params = [self._visit(param) for param in node.params]
+        block = self._visit(node.block_node)
+        return self._builder.procedure_declaration(
+            _name_token(node.proc_name), params, block
+        )
+
+    def _visit_Param(self, node):
+        var_node = self._visit(node.var_node)
+        return self._builder.param(var_node, self._visit(node.type_node))
+
+    def _visit_ProcedureCall(self, node):
+        params = [self._visit(param) for param in node.actual_params]
+        return self._builder.procedure_call(node.token, params)
+
+    def _visit_Compound(self, node):
+        children = [self._visit(child) for child in node.children]
+        return self._builder.compound(children)
+
+    def _visit_Assign(self, node):
+        left = self._visit(node.left)
+        return self._builder.assign(left, node.op, self._visit(node.right))
+
+    def _visit_Var(self, node):
+        return self._builder.var(node.token)
+
+    def _visit_BinaryOperation(self, node):
+        left = self._visit(node.left)
+        right = self._visit(node.right)
+        return self._builder.binary_operation(left, node.op, right)
+
+    def _visit_UnaryOperation(self, node):
+        return self._builder.unary_operation(node.op, self._visit(node.right))
+
+    def _visit_Number(self, node):
+        return self._builder.number(node.token)
+
+    def _visit_NoOp(self, node):
+        return self._builder.no_op()
+
+
+def _name_token(name):
+    return Token(TokenType.ID, name)
+
+
+def parse_to_arena(lexer):
+    """
+    Parses a program straight into a new arena.
+    """
+    arena = AstArena()
+    Parser(lexer=lexer, builder=ArenaBuilder(arena)).parse()
+    return arena
@@ -1,27 +1,41 @@
 
 class Ast:
-    pass
+    # Nodes keep their attributes in slots instead of a dict, trees of
+    # big programs have millions of them.
+    __slots__ = ()
 
 
 class Program(Ast):
+    __slots__ = ("name", "block")
+
     def __init__(self, name, block):
         self.name = name
         self.block = block
 
 
 class Block(Ast):
+    __slots__ = ("declarations", "compound_statement", "slot_names")
+
     def __init__(self, declarations, compound_statement):
         self.declarations = declarations
         self.compound_statement = compound_statement
 
+        # Names of the variables stored in the activation record
+        # of the block, set by the semantic analyzer.
+        self.slot_names = ()
+
 
 class VarDeclaration(Ast):
+    __slots__ = ("var_node", "type_node")
+
     def __init__(self, var_node, type_node):
         self.var_node = var_node
         self.type_node = type_node
 
 
 class Type(Ast):
+    __slots__ = ("token",)
+
     def __init__(self, token):
         self.token = token
 
@@ -31,6 +45,8 @@ class Type(Ast):
 
 
 class BinaryOperation(Ast):
+    __slots__ = ("left", "op", "right")
+
     def __init__(self, left, op, right):
         self.left = left
         self.op = op
@@ -38,12 +54,16 @@ class BinaryOperation(Ast):
 
 
 class UnaryOperation(Ast):
+    __slots__ = ("op", "right")
+
     def __init__(self, op, right):
         self.op = op
         self.right = right
 
 
 class Number(Ast):
+    __slots__ = ("token",)
+
     def __init__(self, token):
         self.token = token
 
@@ -53,11 +73,15 @@ class Number(Ast):
 
 
 class Compound(Ast):
+    __slots__ = ("children",)
+
     def __init__(self):
         self.children = []
 
 
 class Assign(Ast):
+    __slots__ = ("left", "op", "right")
+
     def __init__(self, left, op, right):
         self.left = left
         self.op = op
@@ -65,15 +89,24 @@ class Assign(Ast):
 
 
 class Var(Ast):
+    __slots__ = ("token", "scope_level", "slot")
+
     def __init__(self, token):
         self.token = token
 
+        # Nesting level of the activation record holding the variable
+        # and index of the variable in it, set by the semantic analyzer.
+        self.scope_level = None
+        self.slot = None
+
     @property
     def value(self):
         return self.token.get_value()
 
 
 class ProcedureDeclaration(Ast):
+    __slots__ = ("proc_name", "params", "block_node")
+
     def __init__(self, proc_name, params, block_node):
         self.proc_name = proc_name
         self.params = params
@@ -87,10 +120,12 @@ class ProcedureDeclaration(Ast):
 
 
 class NoOp(Ast):
-    pass
+    __slots__ = ()
 
 
 class Param(Ast):
+    __slots__ = ("var_node", "type_node")
+
     def __init__(self, var_node, type_node):
         self.var_node = var_node
         self.type_node = type_node
@@ -105,7 +140,71 @@ class Param(Ast):
 
 
 class ProcedureCall(Ast):
+    __slots__ = ("proc_name", "actual_params", "token", "proc_symbol")
+
     def __init__(self, proc_name, actual_params, token):
         self.proc_name = proc_name
         self.actual_params = actual_params
         self.token = token
+
+        # Set by the semantic analyzer
+        self.proc_symbol = None
+
+
+def walk(tree):
+    """
+    Yields all the nodes of the tree, parents before their children.
+
+    Children are found among the attributes of the nodes, annotations
+    of the semantic analyzer are not followed.
+    """
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(children(node)))
+
+
+def walk_postorder(tree):
+    """
+    Yields all the nodes of the tree, children before their parents,
+    without recursion.
+    """
+    stack = [(tree, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            yield node
+            continue
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(children(node)))
+
+
+def children(node):
+    """
+    Returns the child nodes of the node in source order.
+    """
+    result = []
+    for field in _fields(type(node)):
+        value = getattr(node, field)
+        if isinstance(value, Ast):
+            result.append(value)
+        elif isinstance(value, list):
+            result.extend(item for item in value if isinstance(item, Ast))
+    return result
+
+
+# Names of the slots of the node classes, the ones of the bases first
+_FIELDS = {}
+
+
+def _fields(node_class):
+    fields = _FIELDS.get(node_class)
+    if fields is None:
+        fields = tuple(
+            name
+            for klass in reversed(node_class.__mro__)
+            for name in getattr(klass, "__slots__", ())
+        )
+        _FIELDS[node_class] = fields
+    return fields
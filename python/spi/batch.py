@@ -0,0 +1,158 @@
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from time import perf_counter
+
+from spi.cache import DEFAULT_MAX_SIZE
+from spi.cache import ParseCache
+from spi.errors import Error
+from spi.front_end import check_tree
+from spi.lexer import Lexer
+from spi.lexer import Scanner
+from spi.parser import Parser
+
+
+SOURCE_SUFFIX = ".pas"
+
+
+def collect_sources(inputs):
+    """
+    Expands directories, glob patterns and manifests into source paths.
+
+    A directory contributes all the .pas files below it, a manifest is
+    any other file and lists one path per line, relative to the manifest.
+    Empty lines and lines starting with '#' are skipped.
+    """
+    paths = []
+    for source in inputs:
+        if os.path.isdir(source):
+            pattern = os.path.join(source, "**", "*" + SOURCE_SUFFIX)
+            paths.extend(sorted(glob.glob(pattern, recursive=True)))
+        elif glob.has_magic(source):
+            paths.extend(sorted(glob.glob(source, recursive=True)))
+        elif source.endswith(SOURCE_SUFFIX):
+            paths.append(source)
+        else:
+            paths.extend(_read_manifest(source))
+    return paths
+
+
+def _read_manifest(path):
+    base = os.path.dirname(path)
+    with open(path) as manifest:
+        lines = [line.strip() for line in manifest]
+    return [
+        os.path.join(base, line)
+        for line in lines
+        if line and not line.startswith("#")
+    ]
+
+
+def run_file(
+        path,
+        engine_class,
+        optimize=False,
+        scanner=Scanner.CHAR,
+        cache_directory=None,
+        cache_size=DEFAULT_MAX_SIZE
+):
+    """
+    Runs one program and describes the outcome with a JSON compatible
+    dictionary: the final global frame or the error, and the time spent
+    in every phase.
+    """
+    cache = None
+    if cache_directory is not None:
+        cache = ParseCache(cache_directory, max_size=cache_size)
+    return run_program(
+        engine_class,
+        path=path,
+        optimize=optimize,
+        scanner=scanner,
+        cache=cache
+    )
+
+
+def run_program(
+        engine_class,
+        path=None,
+        text=None,
+        optimize=False,
+        scanner=Scanner.CHAR,
+        cache=None
+):
+    """
+    Same as run_file for a program given by its path or by its text.
+    'cache' is anything with the load and store methods of ParseCache.
+    """
+    result = {"path": path, "status": "ok"}
+    timings = {}
+    start = perf_counter()
+    try:
+        tree = None
+        if cache is not None:
+            if text is None:
+                key = ParseCache.make_file_key(path, optimize=optimize)
+            else:
+                key = ParseCache.make_key(text, optimize=optimize)
+            tree = _timed(timings, "load", cache.load, key)
+
+        if tree is None:
+            if text is None:
+                lexer = Lexer.from_path(path, scanner=scanner)
+            else:
+                lexer = Lexer(text, scanner=scanner)
+            try:
+                tokens = _timed(timings, "lex", lexer.tokenize_all)
+            finally:
+                lexer.close()
+            parser = Parser(lexer=tokens.reader())
+            tree = _timed(timings, "parse", parser.parse)
+            tree = _timed(timings, "analyze", check_tree, tree, optimize)
+            if cache is not None:
+                _timed(timings, "store", cache.store, key, tree)
+
+        engine = engine_class(parser=None)
+        ar = _timed(timings, "execute", engine.run, tree)
+        result["globals"] = dict(ar.items())
+    except Error as error:
+        result["status"] = "error"
+        result["error"] = {
+            "type": type(error).__name__,
+            "code": error.error_code.name if error.error_code else None,
+            "message": error.message,
+        }
+    except Exception as error:
+        result["status"] = "error"
+        result["error"] = {
+            "type": type(error).__name__,
+            "code": None,
+            "message": str(error),
+        }
+
+    timings["total"] = perf_counter() - start
+    result["timings"] = timings
+    return result
+
+
+def _timed(timings, phase, function, *args):
+    start = perf_counter()
+    try:
+        return function(*args)
+    finally:
+        timings[phase] = perf_counter() - start
+
+
+def run_batch(paths, workers=None, chunksize=1, **options):
+    """
+    Runs the programs in a pool of processes.
+
+    Yields the result of every program in the order of the paths as soon
+    as it is ready. A failing program doesn't stop the others.
+    'options' are passed to run_file.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(
+            partial(run_file, **options), paths, chunksize=chunksize
+        )
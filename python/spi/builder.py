@@ -0,0 +1,75 @@
+from spi.ast import Assign
+from spi.ast import BinaryOperation
+from spi.ast import Block
+from spi.ast import Compound
+from spi.ast import NoOp
+from spi.ast import Number
+from spi.ast import Param
+from spi.ast import ProcedureCall
+from spi.ast import ProcedureDeclaration
+from spi.ast import Program
+from spi.ast import Type
+from spi.ast import UnaryOperation
+from spi.ast import Var
+from spi.ast import VarDeclaration
+
+
+class AstBuilder:
+    """
+    Makes the nodes of the parse tree for the Parser.
+
+    The parser only passes around whatever the builder returns, so
+    another builder can store the tree in a different representation.
+    Children are always built before their parents.
+    """
+
+    def program(self, name_token, block):
+        return Program(name=name_token.get_value(), block=block)
+
+    def block(self, declarations, compound_statement):
+        return Block(
+            declarations=declarations,
+            compound_statement=compound_statement
+        )
+
+    def var_declaration(self, var_node, type_node):
+        return VarDeclaration(var_node, type_node)
+
+    def type(self, token):
+        return Type(token)
+
+    def procedure_declaration(self, name_token, params, block):
+        return ProcedureDeclaration(name_token.get_value(), params, block)
+
+    def param(self, var_node, type_node):
+        return Param(var_node, type_node)
+
+    def procedure_call(self, token, actual_params):
+        return ProcedureCall(
+            proc_name=token.get_value(),
+            actual_params=actual_params,
+            token=token
+        )
+
+    def compound(self, children):
+        root = Compound()
+        root.children.extend(children)
+        return root
+
+    def assign(self, left, op, right):
+        return Assign(left=left, op=op, right=right)
+
+    def var(self, token):
+        return Var(token)
+
+    def binary_operation(self, left, op, right):
+        return BinaryOperation(left=left, op=op, right=right)
+
+    def unary_operation(self, op, right):
+        return UnaryOperation(op=op, right=right)
+
+    def number(self, token):
+        return Number(token)
+
+    def no_op(self):
+        return NoOp()
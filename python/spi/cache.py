@@ -0,0 +1,239 @@
+import os
+import pickle
+import sys
+import zlib
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock
+from tempfile import NamedTemporaryFile
+
+from spi import __version__
+from spi.front_end import build_tree
+from spi.lexer import DEFAULT_CHUNK_SIZE
+from spi.lexer import Lexer
+from spi.lexer import Scanner
+from spi.parser import Parser
+
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+DEFAULT_MAX_ENTRIES = 256
+
+ENTRY_SUFFIX = ".ast"
+
+
+def default_cache_directory():
+    cache_home = os.environ.get(
+        "XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")
+    )
+    return os.path.join(cache_home, "jjpi")
+
+
+class ParseCache:
+    """
+    Directory of checked parse trees keyed by a hash of the source.
+
+    Entries are compressed pickles. The key also covers the interpreter
+    and python versions and the optimization flag, so entries written by
+    another interpreter are never read. Unreadable entries are treated as
+    misses and removed. Reading an entry refreshes its modification time
+    and the least recently used entries are removed when the directory
+    grows over 'max_size' bytes.
+
+    Entries are unpickled, so the directory must not be writable
+    by anybody else.
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self._directory = directory
+        self._max_size = max_size
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    @staticmethod
+    def make_key(text, optimize=False):
+        digest = _new_digest(optimize)
+        digest.update(text.encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_file_key(
+            path,
+            optimize=False,
+            chunk_size=DEFAULT_CHUNK_SIZE,
+            encoding="utf-8"
+    ):
+        """
+        Returns the key of the text of the file without reading it into
+        memory at once. The key equals make_key of the text, decoded
+        like Lexer.from_path does.
+        """
+        digest = _new_digest(optimize)
+        with open(path, encoding=encoding) as source_file:
+            for chunk in iter(lambda: source_file.read(chunk_size), ""):
+                digest.update(chunk.encode())
+        return digest.hexdigest()
+
+    def load(self, key):
+        path = self._entry_path(key)
+        try:
+            with open(path, "rb") as entry_file:
+                tree = pickle.loads(zlib.decompress(entry_file.read()))
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self._remove(path)
+            return None
+
+        # Recently used entries are evicted last; a read-only cache or an
+        # entry evicted by another process meanwhile still gives the tree
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return tree
+
+    def store(self, key, tree):
+        try:
+            data = zlib.compress(pickle.dumps(tree, pickle.HIGHEST_PROTOCOL))
+        except RecursionError:
+            # Too deep to pickle, the tree will be built again next time
+            return
+
+        with NamedTemporaryFile(
+                dir=self._directory, suffix=".tmp", delete=False
+        ) as entry_file:
+            entry_file.write(data)
+        os.replace(entry_file.name, self._entry_path(key))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self._directory):
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self._directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self._max_size:
+                break
+            self._remove(path)
+            total_size -= size
+
+    def _entry_path(self, key):
+        return os.path.join(self._directory, key + ENTRY_SUFFIX)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class MemoryCache:
+    """
+    Checked parse trees of a long running process, keyed like the
+    entries of ParseCache and shared by all of its threads.
+
+    Keeps at most 'max_entries' trees, the least recently used are
+    dropped first. Misses are looked up in the 'backing' ParseCache,
+    if any, and stores are written through to it. Trees are shared,
+    so they must not be changed by whoever runs them.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, backing=None):
+        self._max_entries = max_entries
+        self._backing = backing
+        self._trees = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._trees)
+
+    def load(self, key):
+        with self._lock:
+            tree = self._trees.get(key)
+            if tree is not None:
+                self._trees.move_to_end(key)
+                return tree
+
+        if self._backing is None:
+            return None
+        tree = self._backing.load(key)
+        if tree is not None:
+            self._remember(key, tree)
+        return tree
+
+    def store(self, key, tree):
+        self._remember(key, tree)
+        if self._backing is not None:
+            self._backing.store(key, tree)
+
+    def _remember(self, key, tree):
+        with self._lock:
+            self._trees[key] = tree
+            self._trees.move_to_end(key)
+            while len(self._trees) > self._max_entries:
+                self._trees.popitem(last=False)
+
+
+def _new_digest(optimize):
+    digest = sha256()
+    digest.update(
+        f"{__version__}:{sys.version_info[0]}.{sys.version_info[1]}:"
+        f"{int(optimize)}:".encode()
+    )
+    return digest
+
+
+def build_cached_tree(text, cache=None, optimize=False, scanner=Scanner.CHAR):
+    """
+    Returns the checked tree of the source, skipping lexing, parsing and
+    analysis when the cache already has it.
+    """
+    if cache is None:
+        return build_tree(
+            Parser(lexer=Lexer(text=text, scanner=scanner)), optimize=optimize
+        )
+
+    key = ParseCache.make_key(text, optimize=optimize)
+    tree = cache.load(key)
+    if tree is None:
+        tree = build_tree(
+            Parser(lexer=Lexer(text=text, scanner=scanner)), optimize=optimize
+        )
+        cache.store(key, tree)
+    return tree
+
+
+def build_cached_file_tree(
+        path,
+        cache=None,
+        optimize=False,
+        scanner=Scanner.CHAR
+):
+    """
+    Same as build_cached_tree, but streams the source from the file
+    instead of holding all of its text.
+    """
+    key = None
+    if cache is not None:
+        key = ParseCache.make_file_key(path, optimize=optimize)
+        tree = cache.load(key)
+        if tree is not None:
+            return tree
+
+    lexer = Lexer.from_path(path, scanner=scanner)
+    try:
+        tree = build_tree(Parser(lexer=lexer), optimize=optimize)
+    finally:
+        lexer.close()
+    if cache is not None:
+        cache.store(key, tree)
+    return tree
@@ -8,26 +8,71 @@ class CallStack:
         #       results.
         self._records = []
 
-    def access_variable(self, var_name):
-        var = self.peek().get(var_name)
-        if var is not None:
-            return var
-        var = self._records[0].get(var_name)
+        # Display: the visible activation record of every nesting level.
+        # Index 0 is unused, so the nesting level is the index.
+        self._display = [None]
+
+        # Display entries overwritten by the pushed records
+        self._saved_display = []
+
+    @property
+    def display(self):
+        """
+        The visible records by nesting level, for engines which read
+        the slots in their own loops.
+        """
+        return self._display
+
+    def access_variable(self, nesting_level, slot):
+        var = self._display[nesting_level].slots[slot]
         if var is not None:
             return var
 
-        # After proper semantic check this should never happen
+        # The variable is declared, but nothing has been assigned to it yet
         raise RuntimeInterpreterError()
 
+    def assign_variable(self, nesting_level, slot, value):
+        self._display[nesting_level].slots[slot] = value
+
+    def get_frame(self, nesting_level):
+        """
+        Returns the activation record of the block declared at
+        the nesting level which is visible from the top record.
+        """
+        return self._display[nesting_level]
+
     def push(self, ar):
+        """
+        Pushes the record and makes it the visible one of its level.
+
+        The record of the enclosing level becomes its access link. Levels
+        deeper than the record keep stale entries, but they are never
+        accessed until a procedure of that level is pushed again.
+        """
+        level = ar.nesting_level
+        display = self._display
+        while len(display) <= level:
+            display.append(None)
+
+        ar.access_link = display[level - 1]
+        self._saved_display.append(display[level])
+        display[level] = ar
         self._records.append(ar)
 
     def pop(self):
-        return self._records.pop()
+        ar = self._records.pop()
+        self._display[ar.nesting_level] = self._saved_display.pop()
+        return ar
 
     def peek(self):
         return self._records[-1]
 
+    def snapshot(self):
+        """
+        Returns copies of all the records, the top one first.
+        """
+        return tuple(ar.snapshot() for ar in reversed(self._records))
+
     def __len__(self):
         return len(self._records)
 
@@ -0,0 +1,264 @@
+from spi.errors import RuntimeInterpreterError
+from spi.token import TokenType
+from spi.node_visitor import NodeVisitor
+from spi.front_end import build_tree
+from spi.call_stack import CallStack
+from spi.activation_record import ActivationRecord
+from spi.activation_record import ArType
+from spi.tracing import make_tracer
+
+
+def _add(left, right):
+    return lambda frame: left(frame) + right(frame)
+
+
+def _subtract(left, right):
+    return lambda frame: left(frame) - right(frame)
+
+
+def _multiply(left, right):
+    return lambda frame: left(frame) * right(frame)
+
+
+def _integer_divide(left, right):
+    return lambda frame: left(frame) // right(frame)
+
+
+def _real_divide(left, right):
+    return lambda frame: left(frame) / right(frame)
+
+
+# Maps operator token type to the factory of its closure
+BINARY_OPERATIONS = {
+    TokenType.PLUS: _add,
+    TokenType.MINUS: _subtract,
+    TokenType.MULTIPLY: _multiply,
+    TokenType.INTEGER_DIV: _integer_divide,
+    TokenType.REAL_DIV: _real_divide,
+}
+
+
+class ClosureCompiler(NodeVisitor):
+    """
+    Turns a checked parse tree into nested python closures.
+
+    The tree is visited only once. Every statement and expression becomes
+    a function of the current activation record, so running a program is
+    a chain of plain function calls without any per node dispatch.
+    """
+
+    def __init__(self, call_stack, tracer=None):
+        self._call_stack = call_stack
+        self._tracer = tracer
+
+        # Compiled blocks of the procedures keyed by the blocks. A body
+        # is kept in a one item list, because recursive calls are compiled
+        # before the body of the procedure itself is finished.
+        self._procedure_bodies = {}
+
+        # Nesting level of the block being compiled
+        self._scope_level = 0
+
+    def compile(self, tree):
+        return self._visit(tree)
+
+    def _visit_Program(self, node):
+        name = node.name
+        slot_names = node.block.slot_names
+        self._scope_level = 1
+        block = self._visit(node.block)
+        call_stack = self._call_stack
+        tracer = self._tracer
+
+        def program():
+            ar = ActivationRecord(
+                name=name,
+                ar_type=ArType.PROGRAM,
+                nesting_level=1,
+                slot_names=slot_names
+            )
+            call_stack.push(ar)
+            if tracer is not None:
+                tracer.enter(call_stack)
+
+            block(ar)
+
+            if tracer is not None:
+                tracer.leave(call_stack)
+            return call_stack.pop()
+
+        return program
+
+    def _visit_Block(self, node):
+        statements = [self._visit(decl) for decl in node.declarations]
+        statements.append(self._visit(node.compound_statement))
+        return _sequence(statements)
+
+    def _visit_VarDeclaration(self, node):
+        return None
+
+    def _visit_ProcedureDeclaration(self, node):
+        body = self._procedure_body(node.block_node)
+        self._scope_level += 1
+        body[0] = self._visit(node.block_node)
+        self._scope_level -= 1
+        return None
+
+    def _visit_Compound(self, node):
+        return _sequence([self._visit(child) for child in node.children])
+
+    def _visit_NoOp(self, node):
+        return None
+
+    def _visit_Assign(self, node):
+        scope_level = node.left.scope_level
+        slot = node.left.slot
+        expression = self._visit(node.right)
+
+        if scope_level == self._scope_level:
+            def assign(frame):
+                frame.slots[slot] = expression(frame)
+        else:
+            assign_variable = self._call_stack.assign_variable
+
+            def assign(frame):
+                assign_variable(scope_level, slot, expression(frame))
+
+        return assign
+
+    def _visit_ProcedureCall(self, node):
+        name = node.proc_name
+        procedure = node.proc_symbol
+        scope_level = procedure.scope_level
+        slot_names = procedure.block_ast.slot_names
+        body = self._procedure_body(procedure.block_ast)
+        arguments = [self._visit(param) for param in node.actual_params]
+        call_stack = self._call_stack
+        tracer = self._tracer
+
+        def call(frame):
+            procedure_ar = ActivationRecord(
+                name=name,
+                ar_type=ArType.PROCEDURE,
+                nesting_level=scope_level,
+                slot_names=slot_names
+            )
+            # Parameters occupy the first slots of the procedure
+            slots = procedure_ar.slots
+            for i, argument in enumerate(arguments):
+                slots[i] = argument(frame)
+
+            call_stack.push(procedure_ar)
+            if tracer is not None:
+                tracer.enter(call_stack)
+
+            body[0](procedure_ar)
+
+            if tracer is not None:
+                tracer.leave(call_stack)
+            call_stack.pop()
+
+        return call
+
+    def _visit_BinaryOperation(self, node):
+        operation = BINARY_OPERATIONS.get(node.op.get_type())
+        if operation is None:
+            self._error()
+        return operation(self._visit(node.left), self._visit(node.right))
+
+    def _visit_UnaryOperation(self, node):
+        operand = self._visit(node.right)
+        if node.op.get_type() == TokenType.MINUS:
+            return lambda frame: -operand(frame)
+        return operand
+
+    def _visit_Number(self, node):
+        value = node.value
+        return lambda frame: value
+
+    def _visit_Var(self, node):
+        scope_level = node.scope_level
+        slot = node.slot
+        if scope_level != self._scope_level:
+            access_variable = self._call_stack.access_variable
+            return lambda frame: access_variable(scope_level, slot)
+
+        def local(frame):
+            value = frame.slots[slot]
+            if value is None:
+                raise RuntimeInterpreterError()
+            return value
+
+        return local
+
+    def _procedure_body(self, block):
+        return self._procedure_bodies.setdefault(block, [None])
+
+    def _error(self):
+        raise Exception("Incorrect parse tree.")
+
+
+def _skip(frame):
+    pass
+
+
+def _sequence(statements):
+    statements = tuple(s for s in statements if s is not None)
+    if not statements:
+        return _skip
+    if len(statements) == 1:
+        return statements[0]
+
+    def run(frame):
+        for statement in statements:
+            statement(frame)
+
+    return run
+
+
+class ClosureInterpreter:
+    """
+    Drop-in alternative to the Interpreter which compiles the checked
+    tree into closures first and then runs them.
+    """
+
+    def __init__(
+            self,
+            parser,
+            should_log_stack=False,
+            tracer=None,
+            optimize=False
+    ):
+        self._parser = parser
+        self._optimize = optimize
+        self._call_stack = CallStack()
+        if tracer is None:
+            tracer = make_tracer(should_log_stack)
+        self._tracer = tracer
+
+    def execute(self):
+        """
+        Executes a pascal program.
+
+        Returns the activation record of the program as it was
+        right before it has been popped from the call stack.
+        """
+        return self.run(build_tree(self._parser, optimize=self._optimize))
+
+    def run(self, tree):
+        """
+        Executes a parse tree which has already passed semantic analysis.
+        """
+        compiler = ClosureCompiler(
+            call_stack=self._call_stack,
+            tracer=self._tracer
+        )
+        program = compiler.compile(tree)
+        return program()
+
+    @property
+    def call_stack(self):
+        return self._call_stack
+
+    def get_current_ar_for_test(self):
+        return self._call_stack.peek()
@@ -0,0 +1,23 @@
+from spi.optimizer import ConstantFolder
+from spi.semantic_analyzer import SemanticAnalyzer
+
+
+def build_tree(parser, optimize=False):
+    """
+    Parses and checks a program and optionally folds its constants.
+
+    The result is ready to be run by any of the interpreters.
+    """
+    return check_tree(parser.parse(), optimize=optimize)
+
+
+def check_tree(tree, optimize=False):
+    """
+    Runs semantic analysis over a parse tree and optionally folds
+    its constants.
+    """
+    semantic_analyzer = SemanticAnalyzer()
+    semantic_analyzer.analyze(tree)
+    if optimize:
+        tree = ConstantFolder().fold(tree)
+    return tree
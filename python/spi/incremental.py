@@ -0,0 +1,456 @@
+from weakref import WeakKeyDictionary
+
+from spi.ast import ProcedureDeclaration
+from spi.errors import ErrorCode
+from spi.errors import LexerError
+from spi.errors import ParserError
+from spi.interner import Interner
+from spi.lexer import Lexer
+from spi.lexer import Scanner
+from spi.parser import Parser
+from spi.parser import TokenIterator
+from spi.semantic_analyzer import SemanticAnalyzer
+from spi.symbol import ProcedureSymbol
+from spi.symbol import ScopedSymbolTable
+from spi.token import Token
+from spi.token import TokenType
+
+
+class IncrementalDocument:
+    """
+    Source text of a program together with its checked parse tree,
+    kept up to date edit by edit.
+
+    An edit inside a procedure declaration lexes, parses and checks only
+    the text of the innermost procedure around it. The new declaration
+    replaces the old one in the tree and all the other nodes are reused.
+    While the name and the parameters of the procedure stay the same,
+    its body is checked against views of the enclosing scopes as they
+    were at its declaration, so the rest of the program isn't analyzed
+    again. Other edits parse and check the whole text.
+
+    Offsets of the tokens are relative to anchors at the starts and
+    the ends of the procedures around them, and their lines come from
+    one LineIndex of the document, so an edit moves the following
+    tokens by moving the anchors of the following procedures, without
+    touching the nodes. What still grows with the size of the text is
+    the copy of the text itself, the shift of the following line
+    starts and of the anchors, each one integer per line or procedure.
+    When the edited program has errors, the error is raised and the
+    document keeps its previous text and tree.
+    """
+
+    def __init__(self, text, scanner=Scanner.CHAR):
+        self._scanner = scanner
+        # Names of the reused nodes and of the edited ones stay the same
+        self._interner = Interner()
+        self._text = None
+        self._tree = None
+        self._lines = None
+
+        # Spans of all the procedure declarations in source order,
+        # the ones nested in a procedure come right after it
+        self._procedures = []
+
+        # Symbols inserted into the scopes in order and, for every
+        # procedure declaration, the enclosing scopes with the number
+        # of their symbols visible to the procedure
+        self._history = WeakKeyDictionary()
+        self._chains = {}
+
+        self._load(text)
+
+    @property
+    def text(self):
+        return self._text
+
+    @property
+    def tree(self):
+        return self._tree
+
+    def edit(self, offset, deleted, inserted):
+        """
+        Replaces 'deleted' characters at 'offset' with the inserted text.
+
+        Returns the new procedure declaration, or the new program
+        when the whole text had to be parsed again.
+        """
+        if offset < 0 or deleted < 0 or offset + deleted > len(self._text):
+            raise ValueError("Edit out of the text.")
+
+        text = self._text[:offset] + inserted + self._text[offset + deleted:]
+        index = self._enclosing_procedure(offset, deleted)
+        if index is not None:
+            try:
+                return self._edit_procedure(
+                    index, text, offset, deleted, inserted
+                )
+            except (LexerError, ParserError):
+                # The edit may join the procedure with its surroundings
+                pass
+
+        self._load(text)
+        return self._tree
+
+    def _load(self, text):
+        lexer = Lexer(text, scanner=self._scanner, interner=self._interner)
+        table = lexer.tokenize_all()
+        procedures = [
+            _ProcedureSpan(None, None, start, end)
+            for start, end in _declaration_spans(
+                (table.get_type(i), table.get_offset(i))
+                for i in range(len(table))
+            )
+        ]
+        tokens = _anchored_tokens(
+            (
+                (table.get_type(i), table.get_value(i), table.get_offset(i))
+                for i in range(len(table))
+            ),
+            procedures,
+            _Anchor(0),
+            table.lines
+        )
+        tree = Parser(lexer=TokenIterator(tokens)).parse()
+        history = WeakKeyDictionary()
+        chains = {}
+        _RecordingAnalyzer(history, chains).analyze(tree)
+
+        declarations = _procedure_declarations(tree.block)
+        for procedure, (node, parent) in zip(procedures, declarations):
+            procedure.node = node
+            procedure.parent = parent
+
+        self._text = text
+        self._tree = tree
+        self._lines = table.lines
+        self._procedures = procedures
+        self._history = history
+        self._chains = chains
+
+    def _enclosing_procedure(self, offset, deleted):
+        """
+        Returns the index of the innermost procedure span holding the
+        edit, the procedure keyword and the final semicolon excluded.
+        """
+        found = None
+        for index, procedure in enumerate(self._procedures):
+            if procedure.start >= offset:
+                break
+            if procedure.start < offset and offset + deleted < procedure.end:
+                found = index
+        return found
+
+    def _edit_procedure(self, index, text, offset, deleted, inserted):
+        old = self._procedures[index]
+        delta = len(inserted) - deleted
+        start, end = old.start, old.end + delta
+        region = text[start:end]
+
+        # Lex and parse the region alone, its tokens are anchored
+        # to the new procedures
+        lexer = Lexer(region, scanner=self._scanner, interner=self._interner)
+        local_tokens = []
+        while True:
+            token = lexer.get_next_token()
+            local_tokens.append(token)
+            if token.get_type() == TokenType.EOF:
+                break
+        spans = _declaration_spans(
+            (token.get_type(), token.get_offset()) for token in local_tokens
+        )
+        if any(span_end is None for _, span_end in spans):
+            # A declaration runs past the region, reparse the whole text
+            token = local_tokens[-1]
+            raise ParserError(
+                error_code=ErrorCode.UNEXPECTED_TOKEN,
+                token=token,
+                message=f"{ErrorCode.UNEXPECTED_TOKEN.value} -> {token}",
+            )
+        procedures = [_ProcedureSpan(None, old.parent, start, end)]
+        for span_start, span_end in spans[1:]:
+            procedures.append(
+                _ProcedureSpan(None, None, start + span_start, start + span_end)
+            )
+        tokens = _anchored_tokens(
+            (
+                (token.get_type(), token.get_value(), token.get_offset())
+                for token in local_tokens
+            ),
+            procedures,
+            procedures[0].start_anchor,
+            self._lines,
+            base=start
+        )
+        parser = Parser(lexer=TokenIterator(tokens))
+        node = parser.parse_procedure_declaration()
+
+        procedures[0].node = node
+        nested = _procedure_declarations(node.block_node)
+        for procedure, (nested_node, parent) in zip(procedures[1:], nested):
+            procedure.node = nested_node
+            procedure.parent = parent
+
+        old_nodes = [
+            procedure.node for procedure in self._procedures[index:]
+            if procedure.start < old.end
+        ]
+        enclosing = [
+            procedure for procedure in self._procedures[:index]
+            if procedure.end >= old.end
+        ]
+        following = self._procedures[index + len(old_nodes):]
+        declarations = old.parent.declarations
+        position = _index_of(declarations, old.node)
+
+        # Tokens after the edit move with the anchors, errors are
+        # reported at their new positions
+        removed = self._text[offset:offset + deleted]
+        _shift(enclosing, old, following, delta)
+        self._lines.replace(offset, deleted, inserted)
+        try:
+            if _signature(node) == _signature(old.node):
+                chains = {}
+                self._check_procedure(node, self._chains[old.node], chains)
+                declarations[position] = node
+                for old_node in old_nodes:
+                    del self._chains[old_node]
+                self._chains.update(chains)
+            else:
+                # Callers elsewhere may be affected, check the whole program
+                declarations[position] = node
+                try:
+                    self._analyze_tree()
+                except Exception:
+                    declarations[position] = old.node
+                    self._analyze_tree()
+                    raise
+        except Exception:
+            self._lines.replace(offset, len(inserted), removed)
+            _shift(enclosing, old, following, -delta)
+            raise
+
+        # Tokens after the procedure are anchored to its end
+        procedures[0].end_anchor = old.end_anchor
+        self._procedures[index:] = procedures + following
+        self._text = text
+        return node
+
+    def _analyze_tree(self):
+        history = WeakKeyDictionary()
+        chains = {}
+        _RecordingAnalyzer(history, chains).analyze(self._tree)
+        self._history = history
+        self._chains = chains
+
+    def _check_procedure(self, node, chain, chains):
+        """
+        Checks an edited procedure with unchanged name and parameters
+        against views of its enclosing scopes. Callers of the old
+        declaration keep its symbol, which is updated in place.
+        """
+        scope = None
+        for enclosing_scope, mark in reversed(chain):
+            symbols = self._history.get(enclosing_scope, [])[:mark]
+            scope = ScopedSymbolTable(
+                scope_name=enclosing_scope.scope_name,
+                scope_level=enclosing_scope.scope_level,
+                enclosing_scope=scope
+            )
+            # Symbols are inserted in the same order, so variables
+            # keep their slots
+            for symbol in symbols:
+                scope.insert(symbol)
+            self._history[scope] = symbols
+
+        proc_symbol = ProcedureSymbol(node.proc_name)
+        analyzer = _RecordingAnalyzer(self._history, chains)
+        analyzer.analyze_procedure(node, proc_symbol, scope)
+
+        old_symbol = scope.lookup(node.proc_name, go_deep=False)
+        old_symbol.params = proc_symbol.params
+        old_symbol.block_ast = proc_symbol.block_ast
+
+
+class _Anchor:
+    """
+    Offset in the document which tokens are relative to.
+    """
+
+    __slots__ = ("offset",)
+
+    def __init__(self, offset):
+        self.offset = offset
+
+
+class _AnchoredToken(Token):
+    """
+    Token of a document, its offset is relative to an anchor.
+    """
+
+    __slots__ = ("_anchor",)
+
+    def __init__(self, type_, value, offset, lines, anchor):
+        super().__init__(type_, value, offset, lines)
+        self._anchor = anchor
+
+    def get_offset(self):
+        if self._offset is None:
+            return None
+        return self._anchor.offset + self._offset
+
+    def get_position(self):
+        offset = self.get_offset()
+        if offset is None or self._lines is None:
+            return None, None
+        return self._lines.position(offset)
+
+
+class _ProcedureSpan:
+    """
+    Procedure declaration, the block declaring it and the anchors of
+    its first character and of the character after its final semicolon.
+    """
+
+    def __init__(self, node, parent, start, end):
+        self.node = node
+        self.parent = parent
+        self.start_anchor = _Anchor(start)
+        self.end_anchor = _Anchor(end)
+
+    @property
+    def start(self):
+        return self.start_anchor.offset
+
+    @property
+    def end(self):
+        return self.end_anchor.offset
+
+
+class _RecordingAnalyzer(SemanticAnalyzer):
+    """
+    Semantic analyzer which remembers the scopes every procedure
+    declaration is checked in.
+    """
+
+    def __init__(self, history, chains):
+        super().__init__()
+        self._history = history
+        self._chains = chains
+
+    def _insert(self, symbol):
+        super()._insert(symbol)
+        self._history.setdefault(self._scope, []).append(symbol)
+
+    def _check_procedure(self, node, proc_symbol):
+        chain = []
+        scope = self._scope
+        while scope is not None:
+            chain.append((scope, len(self._history.get(scope, ()))))
+            scope = scope.enclosing_scope
+        self._chains[node] = tuple(chain)
+        super()._check_procedure(node, proc_symbol)
+
+
+def _procedure_declarations(block):
+    """
+    Returns (declaration, declaring block) of all the procedures of
+    the block in source order.
+    """
+    result = []
+    for declaration in block.declarations:
+        if isinstance(declaration, ProcedureDeclaration):
+            result.append((declaration, block))
+            result.extend(_procedure_declarations(declaration.block_node))
+    return result
+
+
+def _declaration_spans(tokens):
+    """
+    Returns (start, end) offsets of the procedure declarations of
+    a correct program in source order, given its (type, offset) tokens.
+    A declaration ends with the semicolon after the compound statement
+    of its block.
+    """
+    spans = []
+    # Indices of the open declarations and the depth of their bodies
+    open_declarations = []
+    depth = 0
+    closed = None
+    for token_type, offset in tokens:
+        if token_type == TokenType.PROCEDURE:
+            spans.append([offset, None])
+            open_declarations.append([len(spans) - 1, None])
+        elif token_type == TokenType.BEGIN:
+            depth += 1
+            if open_declarations and open_declarations[-1][1] is None:
+                open_declarations[-1][1] = depth
+        elif token_type == TokenType.END:
+            if open_declarations and open_declarations[-1][1] == depth:
+                closed = open_declarations.pop()[0]
+            depth -= 1
+        elif token_type == TokenType.SEMI and closed is not None:
+            spans[closed][1] = offset + 1
+            closed = None
+    return [tuple(span) for span in spans]
+
+
+def _signature(node):
+    return node.proc_name, [
+        (param.var_node.value, param.type_node.value) for param in node.params
+    ]
+
+
+def _index_of(nodes, node):
+    for index, item in enumerate(nodes):
+        if item is node:
+            return index
+    raise ValueError("Node not found.")
+
+
+def _anchored_tokens(tokens, procedures, anchor, lines, base=0):
+    """
+    Returns the (type, value, offset) tokens anchored to the procedure
+    spans, which are in source order. Tokens of a procedure move with
+    its start and the ones after it with its end, the ones before all
+    the spans with the given anchor. Offsets of the tokens are 'base'
+    characters before the offsets in the document.
+    """
+    result = []
+    open_procedures = []
+    procedures = iter(procedures)
+    next_procedure = next(procedures, None)
+    for token_type, value, offset in tokens:
+        if offset is None:
+            result.append(Token(token_type, value))
+            continue
+
+        offset += base
+        # Procedures of incorrect programs may have no end
+        while open_procedures and (
+                open_procedures[-1].end is not None
+                and offset >= open_procedures[-1].end
+        ):
+            anchor = open_procedures.pop().end_anchor
+        if next_procedure is not None and offset == next_procedure.start:
+            open_procedures.append(next_procedure)
+            anchor = next_procedure.start_anchor
+            next_procedure = next(procedures, None)
+        result.append(
+            _AnchoredToken(
+                token_type, value, offset - anchor.offset, lines, anchor
+            )
+        )
+    return result
+
+
+def _shift(enclosing, procedure, following, delta):
+    """
+    Moves the anchors after an edit inside the procedure.
+    """
+    for enclosing_procedure in enclosing:
+        enclosing_procedure.end_anchor.offset += delta
+    procedure.end_anchor.offset += delta
+    for following_procedure in following:
+        following_procedure.start_anchor.offset += delta
+        following_procedure.end_anchor.offset += delta
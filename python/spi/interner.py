@@ -0,0 +1,34 @@
+from sys import intern
+
+from spi.token import RESERVED_KEYWORDS
+from spi.token import TokenType
+
+
+class Interner:
+    """
+    Words of a program, each spelling resolved to a token type and
+    one name object.
+
+    Lexers sharing an interner resolve every spelling of a word once:
+    later occurrences skip lowercasing and the keyword lookup and get
+    the same name object, so the symbol tables and the frames keyed on
+    names compare them by identity.
+    """
+
+    def __init__(self):
+        # Spelling in the source -> (token type, name)
+        self._words = {}
+
+    def __len__(self):
+        return len(self._words)
+
+    def word(self, lexeme):
+        """
+        Returns the token type and the name of a word of the source.
+        """
+        word = self._words.get(lexeme)
+        if word is None:
+            name = intern(lexeme.lower())
+            token_type = RESERVED_KEYWORDS.get(name, TokenType.ID)
+            self._words[lexeme] = word = (token_type, name)
+        return word
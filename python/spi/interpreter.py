@@ -1,52 +1,70 @@
 from spi.token import TokenType
 from spi.node_visitor import NodeVisitor
-from spi.semantic_analyzer import SemanticAnalyzer
+from spi.front_end import build_tree
 from spi.call_stack import CallStack
 from spi.activation_record import ActivationRecord
 from spi.activation_record import ArType
+from spi.tracing import make_tracer
 
 
 class Interpreter(NodeVisitor):
-    def __init__(self, parser, should_log_stack=False):
+    def __init__(
+            self,
+            parser,
+            should_log_stack=False,
+            tracer=None,
+            optimize=False
+    ):
         self._parser = parser
+        self._optimize = optimize
         self._call_stack = CallStack()
-        self._should_log_stack = should_log_stack
+        if tracer is None:
+            tracer = make_tracer(should_log_stack)
+        self._tracer = tracer
 
     def execute(self):
         """
         Executes a pascal program.
+
+        Returns the activation record of the program as it was
+        right before it has been popped from the call stack.
+        """
+        return self.run(build_tree(self._parser, optimize=self._optimize))
+
+    def run(self, tree):
+        """
+        Executes a parse tree which has already passed semantic analysis.
         """
-        tree = self._parser.parse()
-        semantic_analyzer = SemanticAnalyzer()
-        semantic_analyzer.analyze(tree)
         return self._visit(tree)
 
+    @property
+    def call_stack(self):
+        return self._call_stack
+
     def get_current_ar_for_test(self):
         return self._call_stack.peek()
 
     # TODO: refactor it to make nicer function names
     def _visit_ProcedureDeclaration(self, node):
-        ar = self._call_stack.peek()
-        ar[node.proc_name] = node
+        # Procedure calls are resolved by the semantic analyzer
+        pass
 
     def _visit_Program(self, node):
-        self._log(f"ENTERING: PROGRAM {node.name}")
-
         ar = ActivationRecord(
             name=node.name,
             ar_type=ArType.PROGRAM,
-            nesting_level=1
+            nesting_level=1,
+            slot_names=node.block.slot_names
         )
         self._call_stack.push(ar)
-
-        self._log(str(self._call_stack))
+        if self._tracer is not None:
+            self._tracer.enter(self._call_stack)
 
         self._visit(node.block)
 
-        self._log(f"LEAVING: PROGRAM {node.name}")
-        self._log(str(self._call_stack))
-
-        self._call_stack.pop()
+        if self._tracer is not None:
+            self._tracer.leave(self._call_stack)
+        return self._call_stack.pop()
 
     def _visit_Block(self, node):
         for decl in node.declarations:
@@ -92,40 +110,36 @@ class Interpreter(NodeVisitor):
         pass
 
     def _visit_Assign(self, node):
-        var_name = node.left.value
         var_value = self._visit(node.right)
-        ar = self._call_stack.peek()
-        ar[var_name] = var_value
+        self._call_stack.assign_variable(
+            node.left.scope_level, node.left.slot, var_value
+        )
 
     def _visit_Var(self, node):
-        return self._call_stack.access_variable(node.value)
+        return self._call_stack.access_variable(node.scope_level, node.slot)
 
     def _visit_ProcedureCall(self, node):
-        self._log(f"ENTERING: PROCEDURE {node.proc_name}")
-        current_ar = self._call_stack.peek()
-        procedure = self._call_stack.access_variable(node.proc_name)
+        procedure = node.proc_symbol
 
         procedure_ar = ActivationRecord(
             name=node.proc_name,
             ar_type=ArType.PROCEDURE,
-            nesting_level=current_ar.nesting_level + 1
+            nesting_level=procedure.scope_level,
+            slot_names=procedure.block_ast.slot_names
         )
+        # Parameters occupy the first slots of the procedure
         for i in range(len(node.actual_params)):
-            param_node = procedure.params[i]
-            procedure_ar[param_node.get_identifier()] = self._visit(node.actual_params[i])
+            procedure_ar.slots[i] = self._visit(node.actual_params[i])
 
         self._call_stack.push(procedure_ar)
-        self._log(str(self._call_stack))
-        self._visit(procedure.block_node)
+        if self._tracer is not None:
+            self._tracer.enter(self._call_stack)
 
-        self._log(f"LEAVING: PROCEDURE {node.proc_name}")
-        self._log(str(self._call_stack))
+        self._visit(procedure.block_ast)
 
+        if self._tracer is not None:
+            self._tracer.leave(self._call_stack)
         self._call_stack.pop()
 
     def _error(self):
         raise Exception("Incorrect parse tree.")
-
-    def _log(self, msg):
-        if self._should_log_stack:
-            print(msg)
@@ -1,22 +1,162 @@
+import codecs
+import re
+from enum import Enum
+
 from spi.errors import LexerError
+from spi.interner import Interner
 from spi.token import (
+    LineIndex,
     TokenType,
     Token,
-    ONE_SYMBOL_TOKENS,
-    RESERVED_KEYWORDS
+    ONE_SYMBOL_TOKENS
+)
+from spi.token_table import TokenTable
+
+
+class Scanner(Enum):
+    CHAR = "char"
+    REGEX = "regex"
+
+
+# Master pattern of the regex scanner. Alternatives are tried in order, so
+# 'real' has to go before 'integer' and 'assign' before the ':' symbol.
+_TOKEN_REGEX = re.compile(
+    r"(?P<whitespace>\s+)"
+    r"|(?P<comment>\{[^}]*\}?)"
+    r"|(?P<identifier>[^\W\d]\w*)"
+    r"|(?P<real>\d+\.\d*)"
+    r"|(?P<integer>\d+)"
+    r"|(?P<assign>:=)"
+    r"|(?P<symbol>[" + re.escape("".join(ONE_SYMBOL_TOKENS)) + r"])"
 )
 
+# Rest of a comment begun in an earlier chunk
+_COMMENT_REST_REGEX = re.compile(r"[^}]*\}?")
+
+
+# Number of characters read from a stream at once
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
 
 class Lexer:
-    def __init__(self, text):
+    """
+    Splits pascal source into tokens.
+
+    The source is either a whole text or, with the from_* constructors,
+    a file, a text stream or a memory map read in chunks. Only the
+    unread part of the current chunk is kept, so memory doesn't grow
+    with the size of the source.
+    """
+
+    def __init__(self, text, scanner=Scanner.CHAR, interner=None):
+        # Text being scanned, the current chunk for streamed sources
         self._text = text
         self._pos = 0
+        self._scanner = scanner
+
+        # Token types and names of the words, shared by the lexers
+        # of one program
+        if interner is None:
+            interner = Interner()
+        self._interner = interner
+
+        # Offset of the text in the whole source, tokens get offsets
+        # in the source and find their lines in the index
+        self._offset = 0
+        self._lines = LineIndex(text)
+
+        # Returns the next chunk of a streamed source, '' at its end
+        self._read_chunk = None
+
+        # Whether the regex scanner stopped inside a comment at the end
+        # of a chunk
+        self._in_comment = False
 
-        self._line_number = 1
-        self._column = 1
+        # File opened by the lexer itself, closed at the end of input
+        self._file = None
+
+    @classmethod
+    def from_stream(
+            cls,
+            stream,
+            scanner=Scanner.CHAR,
+            chunk_size=DEFAULT_CHUNK_SIZE,
+            interner=None
+    ):
+        lexer = cls(text="", scanner=scanner, interner=interner)
+        lexer._read_chunk = lambda: stream.read(chunk_size)
+        return lexer
+
+    @classmethod
+    def from_path(
+            cls,
+            path,
+            scanner=Scanner.CHAR,
+            chunk_size=DEFAULT_CHUNK_SIZE,
+            encoding="utf-8",
+            interner=None
+    ):
+        source_file = open(path, encoding=encoding)
+        lexer = cls.from_stream(
+            source_file,
+            scanner=scanner,
+            chunk_size=chunk_size,
+            interner=interner
+        )
+        lexer._file = source_file
+        return lexer
+
+    @classmethod
+    def from_mmap(
+            cls,
+            buffer,
+            scanner=Scanner.CHAR,
+            chunk_size=DEFAULT_CHUNK_SIZE,
+            encoding="utf-8",
+            interner=None
+    ):
+        """
+        Reads the source from an mmap or any other bytes-like buffer.
+        Characters split between chunks are decoded once complete.
+        """
+        decoder = codecs.getincrementaldecoder(encoding)()
+        offset = 0
+
+        def read_chunk():
+            nonlocal offset
+            while True:
+                data = buffer[offset:offset + chunk_size]
+                offset += len(data)
+                chunk = decoder.decode(data, final=not data)
+                if chunk or not data:
+                    return chunk
+
+        lexer = cls(text="", scanner=scanner, interner=interner)
+        lexer._read_chunk = read_chunk
+        return lexer
+
+    def close(self):
+        """
+        Closes the file opened by from_path before the end of input.
+        """
+        self._read_chunk = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def interner(self):
+        return self._interner
+
+    @property
+    def lines(self):
+        """
+        LineIndex of the source read so far.
+        """
+        return self._lines
 
     def get_current_char(self):
-        return self._text[self._pos]
+        return self._get_current_char()
 
     def get_next_token(self):
         """
@@ -26,6 +166,9 @@ class Lexer:
         One token at a time.
         """
 
+        if self._scanner == Scanner.REGEX:
+            return self._scan_next_token()
+
         self._skip_whitespace()
 
         while self._get_current_char() == "{":
@@ -42,20 +185,100 @@ class Lexer:
             return self._read_alphanumeric_token()
 
         if self._get_current_char() == ":" and self._peek() == "=":
+            token = Token(
+                TokenType.ASSIGN, ":=", self._offset + self._pos, self._lines
+            )
             self._advance()
             self._advance()
-            return Token(
-                TokenType.ASSIGN,
-                ":=",
-                line_number=self._line_number,
-                column=self._column - 2
-            )
+            return token
 
         if current_char in ONE_SYMBOL_TOKENS:
             return self._read_operator_token()
 
         self._throw_error()
 
+    def tokenize_all(self):
+        """
+        Reads all the remaining tokens into a compact TokenTable.
+
+        The table can be handed to the Parser through TokenTable.reader()
+        as many times as needed without lexing the text again.
+        """
+        table = TokenTable(lines=self._lines)
+        append = table.append
+        if self._scanner == Scanner.REGEX:
+            scan = self._scan_lexeme
+            while True:
+                lexeme = scan()
+                append(*lexeme)
+                if lexeme[0] == TokenType.EOF:
+                    return table
+
+        while True:
+            token = self.get_next_token()
+            append(token.get_type(), token.get_value(), token.get_offset())
+            if token.get_type() == TokenType.EOF:
+                return table
+
+    def _scan_next_token(self):
+        return Token(*self._scan_lexeme(), self._lines)
+
+    def _scan_lexeme(self):
+        """
+        Regex driven counterpart of get_next_token.
+
+        Matches the whole lexeme with one call to the master pattern
+        instead of walking the text character by character and returns
+        a (type, value, offset) tuple.
+        """
+        while True:
+            text = self._text
+            if self._in_comment:
+                match = _COMMENT_REST_REGEX.match(text, self._pos)
+                self._pos = match.end()
+                if match.group().endswith("}") or not self._fill():
+                    self._in_comment = False
+                continue
+
+            match = _TOKEN_REGEX.match(text, self._pos)
+            kind = None if match is None else match.lastgroup
+
+            # Skipped text is dropped before the next chunk is read, so
+            # long comments and runs of whitespace aren't scanned again
+            if kind == "whitespace" or kind == "comment":
+                self._pos = match.end()
+                if self._pos >= len(text) and self._fill():
+                    self._in_comment = (
+                        kind == "comment" and not match.group().endswith("}")
+                    )
+                continue
+
+            # A lexeme reaching the end of the chunk may go on in the next one
+            end = self._pos if match is None else match.end()
+            if end >= len(text) and self._fill():
+                continue
+
+            if match is None:
+                if self._pos >= len(text):
+                    return TokenType.EOF, None, None
+                self._throw_error()
+
+            start = self._pos
+            self._pos = match.end()
+
+            lexeme = match.group()
+            offset = self._offset + start
+            if kind == "identifier":
+                token_type, name = self._interner.word(lexeme)
+                return token_type, name, offset
+            if kind == "symbol":
+                return ONE_SYMBOL_TOKENS[lexeme], lexeme, offset
+            if kind == "integer":
+                return TokenType.INTEGER_LITERAL, int(lexeme), offset
+            if kind == "real":
+                return TokenType.REAL_LITERAL, float(lexeme), offset
+            return TokenType.ASSIGN, lexeme, offset
+
     def _skip_whitespace(self):
         while self._has_more() and self._get_current_char().isspace():
             self._advance()
@@ -67,6 +290,7 @@ class Lexer:
         self._skip_whitespace()
 
     def _read_number_literal_token(self):
+        offset = self._offset + self._pos
         val = ""
         while self._has_more() and self._get_current_char().isdigit():
             val += self._get_current_char()
@@ -74,10 +298,7 @@ class Lexer:
 
         if self._get_current_char() != ".":
             return Token(
-                TokenType.INTEGER_LITERAL,
-                int(val),
-                line_number=self._line_number,
-                column=self._column-len(val)
+                TokenType.INTEGER_LITERAL, int(val), offset, self._lines
             )
 
         val += self._get_current_char()
@@ -85,24 +306,20 @@ class Lexer:
         while self._has_more() and self._get_current_char().isdigit():
             val += self._get_current_char()
             self._advance()
-        return Token(
-            TokenType.REAL_LITERAL,
-            float(val),
-            line_number=self._line_number,
-            column=self._column - len(val)
-        )
+        return Token(TokenType.REAL_LITERAL, float(val), offset, self._lines)
 
     def _read_alphanumeric_token(self):
+        offset = self._offset + self._pos
         val = ""
         while self._has_more() and self._is_good_id_char():
             val += self._get_current_char()
             self._advance()
-        token_type = RESERVED_KEYWORDS.get(val.lower(), TokenType.ID)
+        token_type, name = self._interner.word(val)
         return Token(
             type_=token_type,
-            value=val.lower(),
-            line_number=self._line_number,
-            column=self._column - len(val)
+            value=name,
+            offset=offset,
+            lines=self._lines
         )
 
     def _read_operator_token(self):
@@ -110,26 +327,44 @@ class Lexer:
         token = Token(
             type_=token_type,
             value=self._get_current_char(),
-            line_number=self._line_number, column=self._column
+            offset=self._offset + self._pos,
+            lines=self._lines
         )
         self._advance()
         return token
 
     def _get_current_char(self):
-        if self._pos < len(self._text):
+        if self._pos < len(self._text) or self._fill():
             return self._text[self._pos]
         return None
 
     def _advance(self):
-        if self._get_current_char() == "\n":
-            self._line_number += 1
-            self._column = 0
-
         self._pos += 1
-        self._column += 1
 
     def _has_more(self):
-        return self._pos < len(self._text)
+        return self._pos < len(self._text) or self._fill()
+
+    def _fill(self):
+        """
+        Appends the next chunk of a streamed source to the unread text.
+
+        Returns False at the end of input.
+        """
+        if self._read_chunk is None:
+            return False
+
+        chunk = self._read_chunk()
+        if not chunk:
+            self.close()
+            return False
+
+        # Offsets move to the start of the new text
+        self._offset += self._pos
+        rest = self._text[self._pos:]
+        self._lines.extend(chunk, self._offset + len(rest))
+        self._text = rest + chunk
+        self._pos = 0
+        return True
 
     def _is_alpha_underscore(self):
         if self._get_current_char().isalpha():
@@ -142,15 +377,18 @@ class Lexer:
         return self._get_current_char() == "_"
 
     def _peek(self):
+        if self._pos + 1 >= len(self._text):
+            self._fill()
         pp = self._pos + 1
         if pp < len(self._text):
             return self._text[pp]
         return None
 
     def _throw_error(self):
+        line_number, column = self._lines.position(self._offset + self._pos)
         message = (
             f"Lexer error on '{self.get_current_char()}' "
-            f"line: {self._line_number}, "
-            f"column: {self._column}"
+            f"line: {line_number}, "
+            f"column: {column}"
         )
         raise LexerError(message=message)
@@ -1,9 +1,31 @@
-
 class NodeVisitor:
+    """
+    Calls the '_visit_<node class name>' method of the visitor for a node.
+
+    Methods are looked up by name once per visitor class and node class
+    and kept in a dispatch table of the visitor class. Every subclass
+    gets its own table, so it finds its own overrides.
+    """
+
+    _dispatch = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = {}
+
     def _visit(self, node):
-        method_name = "_visit_" + type(node).__name__
-        visitor = getattr(self, method_name, self._generic_visit)
-        return visitor(node)
+        visitor = self._dispatch.get(type(node))
+        if visitor is None:
+            visitor = self._find_visitor(type(node))
+        return visitor(self, node)
+
+    @classmethod
+    def _find_visitor(cls, node_class):
+        visitor = getattr(cls, "_visit_" + node_class.__name__, None)
+        if visitor is None:
+            visitor = cls._generic_visit
+        cls._dispatch[node_class] = visitor
+        return visitor
 
     def _generic_visit(self, node):
         raise Exception(f"No visit_{type(node).__name__} method.")
@@ -0,0 +1,175 @@
+import operator
+
+from spi.ast import Assign
+from spi.ast import BinaryOperation
+from spi.ast import Block
+from spi.ast import Compound
+from spi.ast import NoOp
+from spi.ast import Number
+from spi.ast import ProcedureCall
+from spi.ast import ProcedureDeclaration
+from spi.ast import Program
+from spi.ast import UnaryOperation
+from spi.node_visitor import NodeVisitor
+from spi.symbol import ProcedureSymbol
+from spi.token import Token
+from spi.token import TokenType
+
+
+# Maps operator token type to the function computing it. The functions
+# are the same python operators the interpreters use, so 'div' stays a
+# floor division and '/' a true division.
+FOLDABLE_OPERATIONS = {
+    TokenType.PLUS: operator.add,
+    TokenType.MINUS: operator.sub,
+    TokenType.MULTIPLY: operator.mul,
+    TokenType.INTEGER_DIV: operator.floordiv,
+    TokenType.REAL_DIV: operator.truediv,
+}
+
+
+class ConstantFolder(NodeVisitor):
+    """
+    Builds a smaller equivalent of a checked parse tree.
+
+    Operations over number literals are computed, operations with an
+    integer neutral element (x - 0, x * 1, 1 * x) and
+    unary pluses are dropped, nested compound statements are merged and
+    empty statements removed. Divisions by zero are left for run time.
+
+    The input tree is not modified. Annotations of the semantic analyzer
+    are carried over, procedure symbols are copied to point to the new
+    blocks.
+    """
+
+    def __init__(self):
+        # Folded blocks keyed by the original ones
+        self._blocks = {}
+
+        # Copies of the procedure symbols keyed by the original ones
+        self._procedure_symbols = {}
+
+    def fold(self, tree):
+        tree = self._visit(tree)
+        for original, symbol in self._procedure_symbols.items():
+            symbol.block_ast = self._blocks[original.block_ast]
+        return tree
+
+    def _visit_Program(self, node):
+        return Program(name=node.name, block=self._visit(node.block))
+
+    def _visit_Block(self, node):
+        block = Block(
+            declarations=[self._visit(decl) for decl in node.declarations],
+            compound_statement=self._visit(node.compound_statement)
+        )
+        block.slot_names = node.slot_names
+        self._blocks[node] = block
+        return block
+
+    def _visit_VarDeclaration(self, node):
+        return node
+
+    def _visit_ProcedureDeclaration(self, node):
+        return ProcedureDeclaration(
+            proc_name=node.proc_name,
+            params=node.params,
+            block_node=self._visit(node.block_node)
+        )
+
+    def _visit_Compound(self, node):
+        compound = Compound()
+        for child in node.children:
+            child = self._visit(child)
+            if isinstance(child, Compound):
+                compound.children.extend(child.children)
+            elif not isinstance(child, NoOp):
+                compound.children.append(child)
+        return compound
+
+    def _visit_NoOp(self, node):
+        return node
+
+    def _visit_Assign(self, node):
+        return Assign(left=node.left, op=node.op, right=self._visit(node.right))
+
+    def _visit_ProcedureCall(self, node):
+        call = ProcedureCall(
+            proc_name=node.proc_name,
+            actual_params=[self._visit(param) for param in node.actual_params],
+            token=node.token
+        )
+        call.proc_symbol = self._copy_procedure_symbol(node.proc_symbol)
+        return call
+
+    def _visit_Var(self, node):
+        return node
+
+    def _visit_Number(self, node):
+        return node
+
+    def _visit_UnaryOperation(self, node):
+        operand = self._visit(node.right)
+        if node.op.get_type() == TokenType.PLUS:
+            return operand
+        if isinstance(operand, Number):
+            return _make_number(-operand.value, node.op)
+        if (
+            isinstance(operand, UnaryOperation)
+            and operand.op.get_type() == TokenType.MINUS
+        ):
+            return operand.right
+        return UnaryOperation(op=node.op, right=operand)
+
+    def _visit_BinaryOperation(self, node):
+        left = self._visit(node.left)
+        right = self._visit(node.right)
+        op_type = node.op.get_type()
+
+        if isinstance(left, Number) and isinstance(right, Number):
+            division = op_type in (TokenType.INTEGER_DIV, TokenType.REAL_DIV)
+            if not (division and right.value == 0):
+                value = FOLDABLE_OPERATIONS[op_type](left.value, right.value)
+                return _make_number(value, node.op)
+
+        # 'x + 0' is not 'x' when x is -0.0, which variables of any
+        # declared type may hold, while 'x - 0' always is
+        if op_type == TokenType.MINUS and _is_integer(right, 0):
+            return left
+        if op_type == TokenType.MULTIPLY and _is_integer(right, 1):
+            return left
+        if op_type == TokenType.MULTIPLY and _is_integer(left, 1):
+            return right
+
+        return BinaryOperation(left=left, op=node.op, right=right)
+
+    def _copy_procedure_symbol(self, symbol):
+        copy = self._procedure_symbols.get(symbol)
+        if copy is None:
+            copy = ProcedureSymbol(symbol.get_name(), params=symbol.params)
+            copy.scope_level = symbol.scope_level
+            self._procedure_symbols[symbol] = copy
+        return copy
+
+
+def _is_integer(node, value):
+    # Only integer literals are neutral, 'x * 1.0' turns an integer into real
+    return (
+        isinstance(node, Number)
+        and type(node.value) is int
+        and node.value == value
+    )
+
+
+def _make_number(value, position_token):
+    token_type = TokenType.INTEGER_LITERAL
+    if isinstance(value, float):
+        token_type = TokenType.REAL_LITERAL
+    return Number(
+        Token(
+            token_type,
+            value,
+            offset=position_token.get_offset(),
+            lines=position_token.get_lines()
+        )
+    )
@@ -1,26 +1,44 @@
+from collections import deque
+
+from spi.builder import AstBuilder
 from spi.errors import ParserError, ErrorCode
 from spi.token import TokenType
-from spi.ast import Assign
-from spi.ast import BinaryOperation
-from spi.ast import Block
-from spi.ast import Compound
-from spi.ast import NoOp
-from spi.ast import Number
-from spi.ast import Param
-from spi.ast import ProcedureCall
-from spi.ast import ProcedureDeclaration
-from spi.ast import Program
-from spi.ast import Var
-from spi.ast import VarDeclaration
-from spi.ast import Type
-from spi.ast import UnaryOperation
+
+
+# Binding powers of the operators, higher powers bind tighter.
+# A new operator needs only its token type and power here.
+BINARY_OPERATORS = {
+    TokenType.PLUS: 10,
+    TokenType.MINUS: 10,
+    TokenType.MULTIPLY: 20,
+    TokenType.INTEGER_DIV: 20,
+    TokenType.REAL_DIV: 20,
+}
+
+# Prefix operators apply to the primary right after them, so they
+# bind tighter than any binary operator
+PREFIX_OPERATORS = {
+    TokenType.PLUS: 30,
+    TokenType.MINUS: 30,
+}
 
 
 class Parser:
-    def __init__(self, lexer):
+    binary_operators = BINARY_OPERATORS
+    prefix_operators = PREFIX_OPERATORS
+
+    def __init__(self, lexer, builder=None):
         self._lexer = lexer
         self._parse_tree = None
 
+        # Makes the nodes, spi.ast objects by default
+        if builder is None:
+            builder = AstBuilder()
+        self._builder = builder
+
+        # Tokens read ahead of the current one by _peek
+        self._lookahead = deque()
+
         # Set current token to the first token from the input
         self._current_token = self._lexer.get_next_token()
 
@@ -36,16 +54,29 @@ class Parser:
             )
         return self._parse_tree
 
+    def parse_procedure_declaration(self):
+        """
+        Parses a source holding exactly one procedure declaration,
+        like the text of an edited procedure.
+        """
+        node = self._procedure_declaration()
+        if self._current_token.get_type() != TokenType.EOF:
+            self._error(
+                error_code=ErrorCode.UNEXPECTED_TOKEN,
+                token=self._current_token
+            )
+        return node
+
     def _program(self):
         """
         program : PROGRAM variable SEMI block DOT
         """
         self._eat(TokenType.PROGRAM)
-        var_node = self._variable()
-        prog_name = var_node.value
+        name_token = self._current_token
+        self._eat(TokenType.ID)
         self._eat(TokenType.SEMI)
         block_node = self._block()
-        program_node = Program(name=prog_name, block=block_node)
+        program_node = self._builder.program(name_token, block_node)
         self._eat(TokenType.DOT)
         return program_node
 
@@ -55,9 +86,8 @@ class Parser:
         """
         declaration_nodes = self._declarations()
         compound_statement_node = self._compound_statement()
-        return Block(
-            declarations=declaration_nodes,
-            compound_statement=compound_statement_node
+        return self._builder.block(
+            declaration_nodes, compound_statement_node
         )
 
     def _declarations(self):
@@ -84,7 +114,7 @@ class Parser:
             PROCEDURE ID (LPAR formal_parameter_list RPAR)? SEMI block SEMI
         """
         self._eat(TokenType.PROCEDURE)
-        proc_name = self._current_token.get_value()
+        name_token = self._current_token
         self._eat(TokenType.ID)
         params = []
         if self._current_token.get_type() == TokenType.LPAR:
@@ -93,7 +123,9 @@ class Parser:
             self._eat(TokenType.RPAR)
         self._eat(TokenType.SEMI)
         block_node = self._block()
-        proc_decl = ProcedureDeclaration(proc_name, params, block_node)
+        proc_decl = self._builder.procedure_declaration(
+            name_token, params, block_node
+        )
         self._eat(TokenType.SEMI)
         return proc_decl
 
@@ -102,8 +134,6 @@ class Parser:
         proccall_statement: ID LPAR (expr (COMMA expr)*)? RPAR
         """
         token = self._current_token
-
-        proc_name = token.get_value()
         self._eat(TokenType.ID)
         self._eat(TokenType.LPAR)
         actual_params = []
@@ -119,11 +149,7 @@ class Parser:
 
         self._eat(TokenType.RPAR)
 
-        return ProcedureCall(
-            proc_name=proc_name,
-            actual_params=actual_params,
-            token=token
-        )
+        return self._builder.procedure_call(token, actual_params)
 
     def _formal_parameter_list(self):
         """
@@ -131,45 +157,47 @@ class Parser:
                               | formal_parameters SEMI formal_parameter_list
         """
         parameters = self._formal_parameters()
-        if self._current_token.get_type() == TokenType.SEMI:
+        while self._current_token.get_type() == TokenType.SEMI:
             self._eat(TokenType.SEMI)
-            parameters.extend(self._formal_parameter_list())
+            parameters.extend(self._formal_parameters())
         return parameters
 
     def _formal_parameters(self):
         """
         formal_parameters : ID (COMMA ID)* COLON type_spec
         """
-        param_nodes = [Var(self._current_token)]
+        param_nodes = [self._builder.var(self._current_token)]
         self._eat(TokenType.ID)
         while self._current_token.get_type() == TokenType.COMMA:
             self._eat(TokenType.COMMA)
 
-            param_nodes.append(Var(self._current_token))
+            param_nodes.append(self._builder.var(self._current_token))
             self._eat(TokenType.ID)
 
         self._eat(TokenType.COLON)
         type_node = self._type_spec()
         return [
-            Param(var_node, type_node) for var_node in param_nodes
+            self._builder.param(var_node, type_node)
+            for var_node in param_nodes
         ]
 
     def _variable_declaration(self):
         """
         variable_declaration : ID (COMMA ID)* COLON type_spec
         """
-        var_nodes = [Var(self._current_token)]  # first ID
+        var_nodes = [self._builder.var(self._current_token)]  # first ID
         self._eat(TokenType.ID)
 
         while self._current_token.get_type() == TokenType.COMMA:
             self._eat(TokenType.COMMA)
-            var_nodes.append(Var(self._current_token))
+            var_nodes.append(self._builder.var(self._current_token))
             self._eat(TokenType.ID)
 
         self._eat(TokenType.COLON)
         type_node = self._type_spec()
         return tuple(
-            VarDeclaration(var_node, type_node) for var_node in var_nodes
+            self._builder.var_declaration(var_node, type_node)
+            for var_node in var_nodes
         )
 
     def _type_spec(self):
@@ -184,7 +212,7 @@ class Parser:
         else:
             self._error(error_code=ErrorCode.UNEXPECTED_TOKEN, token=token)
 
-        return Type(token)
+        return self._builder.type(token)
 
     def _compound_statement(self):
         """
@@ -194,11 +222,7 @@ class Parser:
         nodes = self._statement_list()
         self._eat(TokenType.END)
 
-        root = Compound()
-        for node in nodes:
-            root.children.append(node)
-
-        return root
+        return self._builder.compound(nodes)
 
     def _statement_list(self):
         """
@@ -231,7 +255,7 @@ class Parser:
         if self._current_token.get_type() == TokenType.BEGIN:
             node = self._compound_statement()
         elif self._current_token.get_type() == TokenType.ID:
-            if self._lexer.get_current_char() == '(':
+            if self._peek().get_type() == TokenType.LPAR:
                 node = self._proccall_statement()
             else:
                 node = self._assignment_statement()
@@ -247,96 +271,113 @@ class Parser:
         token = self._current_token
         self._eat(TokenType.ASSIGN)
         right = self._expr()
-        return Assign(left=left, op=token, right=right)
+        return self._builder.assign(left, token, right)
 
     def _variable(self):
         """
         variable : ID
         """
-        node = Var(self._current_token)
+        node = self._builder.var(self._current_token)
         self._eat(TokenType.ID)
         return node
 
-    @staticmethod
-    def _empty():
+    def _empty(self):
         """
         An empty production.
         """
-        return NoOp()
+        return self._builder.no_op()
 
     def _expr(self):
         """
         Process expr production.
 
-        expr    : operand ((PLUS | MINUS) operand)*
-        """
-
-        node = self._operand()
-
-        while self._current_token.get_type() in (TokenType.PLUS, TokenType.MINUS):
+        expr    : prefix_operator* primary
+                  (binary_operator prefix_operator* primary)*
+        primary : INTEGER_LITERAL
+                | REAL_LITERAL
+                | LPAR expr RPAR
+                | variable
+
+        Operators are resolved by their binding powers with explicit
+        stacks of operands and of pending operators, open parentheses
+        included, so the parser doesn't recurse on nested expressions.
+        """
+        binary_powers = self.binary_operators
+        prefix_powers = self.prefix_operators
+        operands = []
+        # Pending (token, binding power, is binary), None for an open
+        # parenthesis
+        operators = []
+        groups = 0
+
+        while True:
             token = self._current_token
-            if token.get_type() == TokenType.PLUS:
-                self._eat(TokenType.PLUS)
-            elif token.get_type() == TokenType.MINUS:
-                self._eat(TokenType.MINUS)
+            while True:
+                token_type = token.get_type()
+                if token_type in prefix_powers:
+                    operators.append(
+                        (token, prefix_powers[token_type], False)
+                    )
+                elif token_type == TokenType.LPAR:
+                    operators.append(None)
+                    groups += 1
+                else:
+                    break
+                self._eat(token_type)
+                token = self._current_token
+
+            operands.append(self._primary())
+
+            while True:
+                token = self._current_token
+                token_type = token.get_type()
+                power = binary_powers.get(token_type)
+                if power is not None:
+                    # Operators of the same power associate to the left
+                    self._reduce(operands, operators, power)
+                    operators.append((token, power, True))
+                    self._eat(token_type)
+                    break
+                if token_type == TokenType.RPAR and groups:
+                    self._reduce(operands, operators, 0)
+                    operators.pop()
+                    groups -= 1
+                    self._eat(TokenType.RPAR)
+                    continue
+
+                self._reduce(operands, operators, 0)
+                if groups:
+                    self._eat(TokenType.RPAR)
+                return operands.pop()
+
+    def _reduce(self, operands, operators, power):
+        """
+        Builds the nodes of the pending operators binding at least as
+        tightly as 'power', down to the innermost open parenthesis.
+        """
+        while operators and operators[-1] is not None:
+            token, operator_power, is_binary = operators[-1]
+            if operator_power < power:
+                return
+            operators.pop()
+            right = operands.pop()
+            if is_binary:
+                operands[-1] = self._builder.binary_operation(
+                    operands[-1], token, right
+                )
             else:
-                self._error(error_code=ErrorCode.UNEXPECTED_TOKEN, token=token)
+                operands.append(self._builder.unary_operation(token, right))
 
-            node = BinaryOperation(left=node, op=token, right=self._operand())
-        return node
-
-    def _operand(self):
-        """
-        Process operand production.
-
-        operand : factor ((MULTIPLY | INTEGER_DIV | REAL_DIV) factor)*
-        """
-
-        node = self._factor()
-
-        types = (TokenType.MULTIPLY, TokenType.INTEGER_DIV, TokenType.REAL_DIV)
-        while self._current_token.get_type() in types:
-            token = self._current_token
-            if token.get_type() == TokenType.MULTIPLY:
-                self._eat(TokenType.MULTIPLY)
-            elif token.get_type() == TokenType.INTEGER_DIV:
-                self._eat(TokenType.INTEGER_DIV)
-            elif token.get_type() == TokenType.REAL_DIV:
-                self._eat(TokenType.REAL_DIV)
-            else:
-                self._error(error_code=ErrorCode.UNEXPECTED_TOKEN, token=token)
-
-            node = BinaryOperation(left=node, op=token, right=self._factor())
-        return node
-
-    def _factor(self):
-        """
-        Process factor production.
-
-        factor : PLUS factor
-               | MINUS factor
-               | INTEGER_LITERAL
-               | REAL_LITERAL
-               | LPAR expr RPAR
-               | variable
-        """
+    def _primary(self):
         token = self._current_token
-        if token.get_type() in (TokenType.PLUS, TokenType.MINUS):
-            self._eat(token.get_type())
-            return UnaryOperation(op=token, right=self._factor())
-        elif token.get_type() == TokenType.INTEGER_LITERAL:
+        token_type = token.get_type()
+        if token_type == TokenType.INTEGER_LITERAL:
             self._eat(TokenType.INTEGER_LITERAL)
-            return Number(token)
-        elif token.get_type() == TokenType.REAL_LITERAL:
+            return self._builder.number(token)
+        elif token_type == TokenType.REAL_LITERAL:
             self._eat(TokenType.REAL_LITERAL)
-            return Number(token)
-        elif token.get_type() == TokenType.LPAR:
-            self._eat(TokenType.LPAR)
-            node = self._expr()
-            self._eat(TokenType.RPAR)
-            return node
-        elif token.get_type() == TokenType.ID:
-            # ???
+            return self._builder.number(token)
+        elif token_type == TokenType.ID:
             return self._variable()
         self._error(error_code=ErrorCode.UNEXPECTED_TOKEN, token=token)
 
@@ -351,7 +392,10 @@ class Parser:
         """
 
         if self._current_token.get_type() == token_type:
-            self._current_token = self._lexer.get_next_token()
+            if self._lookahead:
+                self._current_token = self._lookahead.popleft()
+            else:
+                self._current_token = self._lexer.get_next_token()
         else:
             print(
                 f"expected type was {token_type} "
@@ -362,9 +406,35 @@ class Parser:
                 token=self._current_token
             )
 
+    def _peek(self, distance=1):
+        """
+        Returns the token 'distance' tokens after the current one
+        without consuming anything.
+        """
+        while len(self._lookahead) < distance:
+            self._lookahead.append(self._lexer.get_next_token())
+        return self._lookahead[distance - 1]
+
     def _error(self, error_code, token):
         raise ParserError(
             error_code=error_code,
             token=token,
             message=f"{error_code.value} -> {token}",
         )
+
+
+class TokenIterator:
+    """
+    Feeds the Parser from any iterable of tokens, like a list, a cache
+    or a queue filled by another thread. The iterable has to end with
+    the EOF token, which is then repeated.
+    """
+
+    def __init__(self, tokens):
+        self._tokens = iter(tokens)
+        self._last = None
+
+    def get_next_token(self):
+        if self._last is None or self._last.get_type() != TokenType.EOF:
+            self._last = next(self._tokens)
+        return self._last
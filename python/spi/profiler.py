@@ -0,0 +1,230 @@
+import signal
+from collections import Counter
+from enum import Enum
+
+from spi.interpreter import Interpreter
+
+
+class ProfileMode(Enum):
+    COUNT = "count"
+    SAMPLE = "sample"
+
+
+# Seconds of CPU time between two samples
+DEFAULT_INTERVAL = 0.001
+
+
+class CallTreeNode:
+    def __init__(self, name):
+        self.name = name
+        self.self_count = 0
+        self.total_count = 0
+        self.children = {}
+
+    def child(self, name):
+        node = self.children.get(name)
+        if node is None:
+            node = CallTreeNode(name)
+            self.children[name] = node
+        return node
+
+
+class Profile:
+    """
+    Samples of a pascal program keyed by the stack of procedure names,
+    the program first, and the source line being run.
+
+    In the count mode every visited node of a line is a sample,
+    in the sample mode a sample is taken on a CPU timer.
+    """
+
+    def __init__(self):
+        self._samples = Counter()
+
+    def add(self, stack, line, count=1):
+        self._samples[stack, line] += count
+
+    @property
+    def samples(self):
+        return dict(self._samples)
+
+    def total(self):
+        return sum(self._samples.values())
+
+    def flat(self):
+        """
+        Returns (name, self count, total count) of every procedure, the
+        most expensive first. Recursive activations count once per sample.
+        """
+        self_counts = Counter()
+        total_counts = Counter()
+        for (stack, _), count in self._samples.items():
+            self_counts[stack[-1]] += count
+            for name in set(stack):
+                total_counts[name] += count
+        rows = [
+            (name, self_counts[name], total) for name, total in total_counts.items()
+        ]
+        return sorted(rows, key=lambda row: (-row[1], -row[2], row[0]))
+
+    def lines(self):
+        """
+        Returns (procedure name, line, count) of every sampled line,
+        the hottest first.
+        """
+        counts = Counter()
+        for (stack, line), count in self._samples.items():
+            counts[stack[-1], line] += count
+        rows = [(name, line, count) for (name, line), count in counts.items()]
+        return sorted(rows, key=lambda row: (-row[2], row[0], row[1] or 0))
+
+    def call_tree(self):
+        """
+        Returns the root of the call tree. The root itself has no name,
+        its children are the programs.
+        """
+        root = CallTreeNode(None)
+        for (stack, _), count in self._samples.items():
+            root.total_count += count
+            node = root
+            for name in stack:
+                node = node.child(name)
+                node.total_count += count
+            node.self_count += count
+        return root
+
+    def format_flat(self):
+        total = self.total() or 1
+        lines = [f"{'SELF':>8} {'%':>6} {'TOTAL':>8} {'%':>6}  PROCEDURE"]
+        for name, self_count, total_count in self.flat():
+            lines.append(
+                f"{self_count:>8} {self_count * 100 / total:>6.1f} "
+                f"{total_count:>8} {total_count * 100 / total:>6.1f}  {name}"
+            )
+        lines.append("")
+        lines.append(f"{'COUNT':>8} {'%':>6}  LINE")
+        for name, line, count in self.lines():
+            lines.append(f"{count:>8} {count * 100 / total:>6.1f}  {name}:{line}")
+        return "\n".join(lines)
+
+    def format_call_tree(self):
+        lines = [f"{'TOTAL':>8} {'SELF':>8}  PROCEDURE"]
+
+        def add(node, depth):
+            lines.append(
+                f"{node.total_count:>8} {node.self_count:>8}  "
+                f"{'  ' * depth}{node.name}"
+            )
+            children = sorted(
+                node.children.values(), key=lambda child: -child.total_count
+            )
+            for child in children:
+                add(child, depth + 1)
+
+        for program in self.call_tree().children.values():
+            add(program, 0)
+        return "\n".join(lines)
+
+    def format_collapsed(self, with_lines=False):
+        """
+        Returns one 'Main;Alpha;Beta count' line per stack, the format
+        read by flamegraph.pl and speedscope. With lines, the source line
+        becomes the leaf frame.
+        """
+        counts = Counter()
+        for (stack, line), count in self._samples.items():
+            frames = ";".join(stack)
+            if with_lines:
+                frames += f";line {line}"
+            counts[frames] += count
+        return "".join(
+            f"{frames} {count}\n" for frames, count in sorted(counts.items())
+        )
+
+
+def _node_line(node):
+    token = getattr(node, "token", None)
+    if token is None:
+        token = getattr(node, "op", None)
+    if token is None:
+        return None
+    return token.get_line_number()
+
+
+class ProfilingInterpreter(Interpreter):
+    """
+    Tree walking interpreter which attributes the work to pascal
+    procedures and source lines.
+
+    The profile is filled while the program runs. The sample mode uses
+    SIGPROF, so it's only available on unix and in the main thread.
+    """
+
+    def __init__(
+            self,
+            parser,
+            should_log_stack=False,
+            tracer=None,
+            optimize=False,
+            profile=None,
+            mode=ProfileMode.COUNT,
+            interval=DEFAULT_INTERVAL
+    ):
+        super().__init__(
+            parser,
+            should_log_stack=should_log_stack,
+            tracer=tracer,
+            optimize=optimize
+        )
+        if profile is None:
+            profile = Profile()
+        self._profile = profile
+        self._mode = mode
+        self._interval = interval
+
+        # Names of the activations being run and the line being run
+        self._stack = ()
+        self._line = None
+
+    @property
+    def profile(self):
+        return self._profile
+
+    def run(self, tree):
+        if self._mode == ProfileMode.COUNT:
+            return super().run(tree)
+
+        previous_handler = signal.signal(signal.SIGPROF, self._take_sample)
+        signal.setitimer(signal.ITIMER_PROF, self._interval, self._interval)
+        try:
+            return super().run(tree)
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, previous_handler)
+
+    def _visit(self, node):
+        line = _node_line(node)
+        if line is None:
+            return super()._visit(node)
+
+        if self._mode == ProfileMode.COUNT:
+            self._profile.add(self._stack, line)
+        previous_line = self._line
+        self._line = line
+        try:
+            return super()._visit(node)
+        finally:
+            self._line = previous_line
+
+    def _visit_Block(self, node):
+        # Blocks are visited right after their activation is pushed
+        previous_stack = self._stack
+        self._stack = previous_stack + (self._call_stack.peek().name,)
+        try:
+            super()._visit_Block(node)
+        finally:
+            self._stack = previous_stack
+
+    def _take_sample(self, signum, frame):
+        if self._stack:
+            self._profile.add(self._stack, self._line)
@@ -0,0 +1,244 @@
+from spi.activation_record import ActivationRecord
+from spi.activation_record import ArType
+from spi.ast import BinaryOperation
+from spi.ast import Number
+from spi.ast import UnaryOperation
+from spi.errors import RuntimeInterpreterError
+from spi.node_visitor import NodeVisitor
+from spi.front_end import build_tree
+from spi.parser import BINARY_OPERATORS as BINDING_POWERS
+from spi.parser import PREFIX_OPERATORS as PREFIX_POWERS
+from spi.token import TokenType
+
+
+# Maps operator token type to the python operator
+BINARY_OPERATORS = {
+    TokenType.PLUS: "+",
+    TokenType.MINUS: "-",
+    TokenType.MULTIPLY: "*",
+    TokenType.INTEGER_DIV: "//",
+    TokenType.REAL_DIV: "/",
+}
+
+# Maps pascal type name to the python annotation of a variable
+PYTHON_TYPES = {
+    "integer": "int",
+    "real": "float",
+}
+
+INDENT = "    "
+
+# Name of the python function which runs the main block
+PROGRAM_FUNCTION = "program"
+
+
+def variable_name(name):
+    # Prefixes keep pascal identifiers away from python keywords and builtins
+    return f"v_{name}"
+
+
+def procedure_name(name):
+    return f"p_{name}"
+
+
+def _binding_power(node):
+    """
+    Returns how tightly the code of the expression binds, with the
+    binding powers of the parser, which order python operators alike.
+    """
+    while (
+            isinstance(node, UnaryOperation)
+            and node.op.get_type() == TokenType.PLUS
+    ):
+        node = node.right
+    if isinstance(node, BinaryOperation):
+        return BINDING_POWERS[node.op.get_type()]
+    if isinstance(node, UnaryOperation) or (
+            isinstance(node, Number) and repr(node.value).startswith("-")
+    ):
+        return PREFIX_POWERS[TokenType.MINUS]
+    return float("inf")
+
+
+class PythonCodeGenerator(NodeVisitor):
+    """
+    Translates a checked parse tree into python source.
+
+    The main block becomes the 'program' function, every procedure
+    becomes a function nested into the function of its enclosing
+    block, and pascal variables become python locals. Assignments to
+    variables of enclosing blocks are declared nonlocal, so python
+    resolves every name with the same static scoping as pascal.
+    """
+
+    def __init__(self):
+        self._lines = []
+        self._level = 0
+
+        # Names declared by and names assigned to from outside of each
+        # function being generated, innermost last
+        self._declared = []
+        self._nonlocals = []
+
+    def generate(self, tree):
+        self._visit(tree)
+        return "\n".join(self._lines) + "\n"
+
+    def _visit_Program(self, node):
+        self._emit(f"def {PROGRAM_FUNCTION}():")
+        self._function_body(node.block, params=())
+        self._level += 1
+        self._emit("return locals()")
+        self._level -= 1
+
+    def _visit_ProcedureDeclaration(self, node):
+        params = ", ".join(
+            f"{variable_name(param.get_identifier())}: "
+            f"{PYTHON_TYPES[param.type_node.value]}"
+            for param in node.params
+        )
+        self._emit(f"def {procedure_name(node.proc_name)}({params}):")
+        self._function_body(node.block_node, params=node.params)
+
+    def _function_body(self, block, params):
+        self._level += 1
+        self._declared.append({param.get_identifier() for param in params})
+        self._nonlocals.append(set())
+        nonlocal_position = len(self._lines)
+        self._visit(block)
+
+        self._declared.pop()
+        nonlocals = self._nonlocals.pop()
+        if nonlocal_position == len(self._lines):
+            self._emit("pass")
+        if nonlocals:
+            names = ", ".join(variable_name(name) for name in sorted(nonlocals))
+            self._lines.insert(
+                nonlocal_position, INDENT * self._level + f"nonlocal {names}"
+            )
+        self._level -= 1
+
+    def _visit_Block(self, node):
+        for declaration in node.declarations:
+            self._visit(declaration)
+        self._visit(node.compound_statement)
+
+    def _visit_VarDeclaration(self, node):
+        # A bare annotation makes the name local without binding a value,
+        # so reading it before an assignment still fails.
+        name = node.var_node.value
+        self._declared[-1].add(name)
+        self._emit(
+            f"{variable_name(name)}: {PYTHON_TYPES[node.type_node.value]}"
+        )
+
+    def _visit_Compound(self, node):
+        for child in node.children:
+            self._visit(child)
+
+    def _visit_NoOp(self, node):
+        pass
+
+    def _visit_Assign(self, node):
+        name = node.left.value
+        if name not in self._declared[-1]:
+            self._nonlocals[-1].add(name)
+        self._emit(f"{variable_name(name)} = {self._visit(node.right)}")
+
+    def _visit_ProcedureCall(self, node):
+        arguments = ", ".join(
+            self._visit(param) for param in node.actual_params
+        )
+        self._emit(f"{procedure_name(node.proc_name)}({arguments})")
+
+    def _visit_BinaryOperation(self, node):
+        # Operators of one power associate to the left in python too
+        op_type = node.op.get_type()
+        power = BINDING_POWERS[op_type]
+        left = self._operand(node.left, power)
+        right = self._operand(node.right, power + 1)
+        return f"{left} {BINARY_OPERATORS[op_type]} {right}"
+
+    def _visit_UnaryOperation(self, node):
+        if node.op.get_type() == TokenType.MINUS:
+            power = PREFIX_POWERS[TokenType.MINUS]
+            return f"-{self._operand(node.right, power)}"
+        return self._visit(node.right)
+
+    def _operand(self, node, power):
+        """
+        Returns the code of an operand, in parentheses only when it
+        binds less tightly than 'power', so long chains stay flat.
+        """
+        code = self._visit(node)
+        if _binding_power(node) < power:
+            return f"({code})"
+        return code
+
+    def _visit_Number(self, node):
+        return repr(node.value)
+
+    def _visit_Var(self, node):
+        return variable_name(node.value)
+
+    def _emit(self, line):
+        self._lines.append(INDENT * self._level + line)
+
+
+class PythonInterpreter:
+    """
+    Executes a pascal program by translating it into python source and
+    letting CPython compile and run it.
+
+    The stack of activation records lives in python frames, so the
+    interpreter can't trace it.
+    """
+
+    def __init__(
+            self,
+            parser,
+            should_log_stack=False,
+            tracer=None,
+            optimize=False
+    ):
+        if should_log_stack or tracer is not None:
+            raise ValueError("Stack tracing is not supported by codegen.")
+        self._parser = parser
+        self._optimize = optimize
+        self._source = None
+
+    def execute(self):
+        """
+        Executes a pascal program.
+
+        Returns an activation record with the variables of the program
+        after its main block has finished.
+        """
+        return self.run(build_tree(self._parser, optimize=self._optimize))
+
+    def run(self, tree):
+        """
+        Executes a parse tree which has already passed semantic analysis.
+        """
+        self._source = PythonCodeGenerator().generate(tree)
+        code = compile(self._source, f"<pascal {tree.name}>", "exec")
+        namespace = {}
+        exec(code, namespace)
+        try:
+            values = namespace[PROGRAM_FUNCTION]()
+        except NameError as error:
+            # Python refuses to read a variable which has no value yet
+            raise RuntimeInterpreterError(message=str(error))
+
+        ar = ActivationRecord(
+            name=tree.name,
+            ar_type=ArType.PROGRAM,
+            nesting_level=1,
+            slot_names=tree.block.slot_names
+        )
+        for slot, name in enumerate(tree.block.slot_names):
+            ar.slots[slot] = values.get(variable_name(name))
+        return ar
+
+    def get_source(self):
+        return self._source
@@ -1,3 +1,5 @@
+from spi.ast import Var
+from spi.ast import walk
 from spi.errors import SemanticError, ErrorCode
 from spi.node_visitor import NodeVisitor
 from spi.symbol import ProcedureSymbol
@@ -9,13 +11,29 @@ class SemanticAnalyzer(NodeVisitor):
     def __init__(self):
         self._scope = None
 
+        # Number of symbols declared by the program
+        self._symbol_count = 0
+
     @property
     def scope(self):
         return self._scope
 
+    @property
+    def symbol_count(self):
+        return self._symbol_count
+
     def analyze(self, tree):
         self._visit(tree)
 
+    def analyze_procedure(self, node, proc_symbol, scope):
+        """
+        Checks a procedure declaration against the scope it's declared
+        in. The symbol of the procedure is filled, but not inserted into
+        the scope, so an edited procedure can be checked again alone.
+        """
+        self._scope = scope
+        self._check_procedure(node, proc_symbol)
+
     def _throw_error(self, error_code, token):
         raise SemanticError(
             error_code=error_code,
@@ -23,18 +41,24 @@ class SemanticAnalyzer(NodeVisitor):
             message=f"{error_code.value} -> {token}"
         )
 
+    def _insert(self, symbol):
+        self._scope.insert(symbol)
+        self._symbol_count += 1
+
     def _visit_Block(self, node):
         for dec in node.declarations:
             self._visit(dec)
+        node.slot_names = self._scope.slot_names
         self._visit(node.compound_statement)
 
     def _visit_ProcedureDeclaration(self, node):
-        proc_name = node.proc_name
-        proc_symbol = ProcedureSymbol(proc_name)
-        self._scope.insert(proc_symbol)
+        proc_symbol = ProcedureSymbol(node.proc_name)
+        self._insert(proc_symbol)
+        self._check_procedure(node, proc_symbol)
 
+    def _check_procedure(self, node, proc_symbol):
         procedure_scope = ScopedSymbolTable(
-            scope_name=proc_name,
+            scope_name=node.proc_name,
             scope_level=self._scope.scope_level + 1,
             enclosing_scope=self._scope
         )
@@ -45,13 +69,14 @@ class SemanticAnalyzer(NodeVisitor):
             param_type = self._scope.lookup(param.type_node.value)
             param_name = param.var_node.value
             var_symbol = VarSymbol(param_name, param_type)
-            self._scope.insert(var_symbol)
+            self._insert(var_symbol)
             proc_symbol.params.append(var_symbol)
 
+        proc_symbol.scope_level = procedure_scope.scope_level
+        proc_symbol.block_ast = node.block_node
         self._visit(node.block_node)
         self._scope = self._scope.enclosing_scope
 
-
     def _visit_Program(self, node):
         global_scope = ScopedSymbolTable(
             scope_name="Global",
@@ -63,14 +88,19 @@ class SemanticAnalyzer(NodeVisitor):
         self._scope = global_scope
 
     def _visit_BinaryOperation(self, node):
-        self._visit(node.left)
-        self._visit(node.right)
+        self._check_expression(node)
 
     def _visit_Number(self, node):
         pass
 
     def _visit_UnaryOperation(self, node):
-        self._visit(node.right)
+        self._check_expression(node)
+
+    def _check_expression(self, node):
+        # Generated expressions may be too deep to recurse into
+        for child in walk(node):
+            if isinstance(child, Var):
+                self._visit_Var(child)
 
     def _visit_Compound(self, node):
         for child in node.children:
@@ -90,31 +120,37 @@ class SemanticAnalyzer(NodeVisitor):
                 token=node.var_node.token
             )
 
-        self._scope.insert(VarSymbol(var_name, type_symbol))
+        self._insert(VarSymbol(var_name, type_symbol))
 
     def _visit_Assign(self, node):
-        var_name = node.left.value
-        var_symbol = self._scope.lookup(var_name)
-        if var_symbol is None:
-            self._throw_error(
-                error_code=ErrorCode.ID_NOT_FOUND,
-                token=node.token
-            )
-
+        self._visit(node.left)
         self._visit(node.right)
 
     def _visit_Var(self, node):
         var_name = node.value
         var_symbol = self._scope.lookup(var_name)
 
-        if var_symbol is None:
+        if not isinstance(var_symbol, VarSymbol):
             self._throw_error(
                 error_code=ErrorCode.ID_NOT_FOUND,
                 token=node.token
             )
 
+        # Resolve the variable to its slot, so the interpreter
+        # doesn't have to look it up by name.
+        node.scope_level = var_symbol.scope_level
+        node.slot = var_symbol.slot
+
     def _visit_ProcedureCall(self, node):
-        formal_parameters = self._scope.lookup(node.proc_name).params
+        proc_symbol = self._scope.lookup(node.proc_name)
+        if not isinstance(proc_symbol, ProcedureSymbol):
+            self._throw_error(
+                error_code=ErrorCode.ID_NOT_FOUND,
+                token=node.token
+            )
+
+        node.proc_symbol = proc_symbol
+        formal_parameters = proc_symbol.params
         if not _actual_parameters_valid(formal_parameters, node.actual_params):
             self._throw_error(
                 error_code=ErrorCode.PROCEDURE_PARAMETERS_MISMATCH,
@@ -0,0 +1,204 @@
+import io
+import json
+import os
+import socketserver
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from threading import Lock
+
+from spi.batch import run_program
+from spi.cache import MemoryCache
+from spi.interpreter import Interpreter
+from spi.lexer import Scanner
+
+
+# Program run by every engine once the server starts, so the first
+# request doesn't pay for the lazy setup of the runtime
+WARM_UP_SOURCE = """
+program WarmUp;
+var a : integer;
+procedure Touch(b : integer);
+begin
+   a := b * 2 + 1
+end;
+begin
+   Touch(1)
+end.
+"""
+
+
+class RequestError(Exception):
+    pass
+
+
+class Server:
+    """
+    Runs pascal programs for clients speaking line delimited JSON.
+
+    Every request is an object with either the 'source' text or the
+    'path' of a program and optionally 'id', which is copied into the
+    response, and 'engine', 'optimize' and 'scanner' overriding the
+    defaults of the server. The response is the result of
+    spi.batch.run_program.
+
+    Requests run in a pool of threads and responses are written as soon
+    as they are ready, so they may come out of order. Every request
+    gets its own engine, with its own CallStack, while checked trees
+    are shared through the cache.
+    """
+
+    def __init__(
+            self,
+            engines,
+            default_engine=Interpreter,
+            optimize=False,
+            scanner=Scanner.CHAR,
+            cache=None,
+            workers=None
+    ):
+        self._engines = engines
+        self._default_engine = default_engine
+        self._optimize = optimize
+        self._scanner = scanner
+        if cache is None:
+            cache = MemoryCache()
+        self._cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def warm_up(self):
+        for engine_class in set(self._engines.values()):
+            run_program(engine_class, text=WARM_UP_SOURCE)
+
+    def handle(self, request):
+        """
+        Runs one request and returns its response.
+        """
+        try:
+            options = self._options(request)
+        except RequestError as error:
+            response = _error_response(error)
+        else:
+            response = run_program(cache=self._cache, **options)
+
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    def handle_line(self, line):
+        try:
+            request = json.loads(line)
+        except ValueError as error:
+            return _error_response(RequestError(f"Invalid JSON: {error}"))
+        if not isinstance(request, dict):
+            return _error_response(
+                RequestError("A request must be a JSON object.")
+            )
+        return self.handle(request)
+
+    def serve(self, input_stream, output_stream):
+        """
+        Answers the requests read from the input until its end.
+        """
+        output_lock = Lock()
+        pending = set()
+
+        def respond(future):
+            try:
+                response = json.dumps(future.result())
+            except Exception as error:
+                response = json.dumps(_error_response(error))
+            with output_lock:
+                output_stream.write(response + "\n")
+                output_stream.flush()
+                pending.discard(future)
+
+        for line in input_stream:
+            if not line.strip():
+                continue
+            future = self._executor.submit(self.handle_line, line)
+            with output_lock:
+                pending.add(future)
+            future.add_done_callback(respond)
+
+        with output_lock:
+            waiting = list(pending)
+        wait(waiting)
+
+    def unix_server(self, path):
+        """
+        Returns a socketserver answering the clients of a unix socket,
+        every connection is served like a stream. Run it with its
+        serve_forever method, the socket is removed when it's closed.
+        """
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                server.serve(
+                    io.TextIOWrapper(self.rfile, encoding="utf-8"),
+                    io.TextIOWrapper(
+                        self.wfile, encoding="utf-8", write_through=True
+                    )
+                )
+
+        return _UnixServer(path, Handler)
+
+    def _options(self, request):
+        source = request.get("source")
+        path = request.get("path")
+        if (source is None) == (path is None):
+            raise RequestError("A request needs either 'source' or 'path'.")
+
+        engine_class = self._default_engine
+        if "engine" in request:
+            engine_class = self._engines.get(request["engine"])
+            if engine_class is None:
+                raise RequestError(f"Unknown engine '{request['engine']}'.")
+
+        scanner = self._scanner
+        if "scanner" in request:
+            try:
+                scanner = Scanner(request["scanner"])
+            except ValueError:
+                raise RequestError(
+                    f"Unknown scanner '{request['scanner']}'."
+                )
+
+        return {
+            "engine_class": engine_class,
+            "path": path,
+            "text": source,
+            "optimize": bool(request.get("optimize", self._optimize)),
+            "scanner": scanner,
+        }
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.remove(self.server_address)
+        except FileNotFoundError:
+            pass
+
+
+def _error_response(error):
+    return {
+        "status": "error",
+        "error": {
+            "type": type(error).__name__,
+            "code": None,
+            "message": str(error),
+        },
+    }
@@ -0,0 +1,255 @@
+from spi.activation_record import ActivationRecord
+from spi.activation_record import ArType
+from spi.ast import Assign
+from spi.ast import BinaryOperation
+from spi.ast import Compound
+from spi.ast import NoOp
+from spi.ast import Number
+from spi.ast import ProcedureCall
+from spi.ast import UnaryOperation
+from spi.ast import Var
+from spi.call_stack import CallStack
+from spi.front_end import build_tree
+from spi.token import TokenType
+from spi.tracing import make_tracer
+
+
+# Kinds of the work items, a node to run or evaluate first
+VISIT = 0
+# then the continuations run once the values of the children are ready
+APPLY = 1
+NEGATE = 2
+STORE = 3
+CALL = 4
+RETURN = 5
+
+PLUS = TokenType.PLUS
+MINUS = TokenType.MINUS
+MULTIPLY = TokenType.MULTIPLY
+INTEGER_DIV = TokenType.INTEGER_DIV
+REAL_DIV = TokenType.REAL_DIV
+
+
+class StackInterpreter:
+    """
+    Drop-in alternative to the Interpreter which runs the tree without
+    python recursion.
+
+    Statements, expressions and calls are pushed onto an explicit work
+    stack together with the continuations consuming their values, and
+    values are passed on a value stack, so the depth of expressions and
+    of call chains is limited only by memory. Everything runs in one
+    loop, without a python call per node. Operations on variables and
+    numbers are computed right away instead of going through the stacks.
+    """
+
+    def __init__(
+            self,
+            parser,
+            should_log_stack=False,
+            tracer=None,
+            optimize=False
+    ):
+        self._parser = parser
+        self._optimize = optimize
+        self._call_stack = CallStack()
+        if tracer is None:
+            tracer = make_tracer(should_log_stack)
+        self._tracer = tracer
+
+    @property
+    def call_stack(self):
+        return self._call_stack
+
+    def execute(self):
+        """
+        Executes a pascal program.
+
+        Returns the activation record of the program as it was
+        right before it has been popped from the call stack.
+        """
+        return self.run(build_tree(self._parser, optimize=self._optimize))
+
+    def run(self, tree):
+        """
+        Executes a parse tree which has already passed semantic analysis.
+        """
+        ar = ActivationRecord(
+            name=tree.name,
+            ar_type=ArType.PROGRAM,
+            nesting_level=1,
+            slot_names=tree.block.slot_names
+        )
+        self._call_stack.push(ar)
+        if self._tracer is not None:
+            self._tracer.enter(self._call_stack)
+
+        self._loop(tree.block.compound_statement)
+
+        if self._tracer is not None:
+            self._tracer.leave(self._call_stack)
+        return self._call_stack.pop()
+
+    def get_current_ar_for_test(self):
+        return self._call_stack.peek()
+
+    def _loop(self, statement):
+        call_stack = self._call_stack
+        display = call_stack.display
+        tracer = self._tracer
+
+        # Work items take two entries, the node or operand and the kind
+        work = [statement, VISIT]
+        push = work.append
+        pop = work.pop
+        values = []
+        push_value = values.append
+        pop_value = values.pop
+
+        while work:
+            kind = pop()
+            item = pop()
+
+            if kind == VISIT:
+                node_class = type(item)
+                if node_class is Assign:
+                    left = item.left
+                    right = item.right
+                    right_class = type(right)
+                    if right_class is Number:
+                        value = right.token.get_value()
+                    elif right_class is Var:
+                        value = display[right.scope_level].slots[right.slot]
+                        if value is None:
+                            value = call_stack.access_variable(
+                                right.scope_level, right.slot
+                            )
+                    else:
+                        push(left)
+                        push(STORE)
+                        push(right)
+                        push(VISIT)
+                        continue
+                    display[left.scope_level].slots[left.slot] = value
+
+                elif node_class is BinaryOperation:
+                    left = item.left
+                    right = item.right
+                    left_class = type(left)
+                    right_class = type(right)
+                    if (
+                            (left_class is Var or left_class is Number)
+                            and (right_class is Var or right_class is Number)
+                    ):
+                        # Both operands are at hand, skip the stacks
+                        if left_class is Number:
+                            a = left.token.get_value()
+                        else:
+                            a = display[left.scope_level].slots[left.slot]
+                            if a is None:
+                                a = call_stack.access_variable(
+                                    left.scope_level, left.slot
+                                )
+                        if right_class is Number:
+                            b = right.token.get_value()
+                        else:
+                            b = display[right.scope_level].slots[right.slot]
+                            if b is None:
+                                b = call_stack.access_variable(
+                                    right.scope_level, right.slot
+                                )
+                        push_value(_apply(item.op.get_type(), a, b))
+                    else:
+                        push(item.op.get_type())
+                        push(APPLY)
+                        push(right)
+                        push(VISIT)
+                        push(left)
+                        push(VISIT)
+
+                elif node_class is Var:
+                    value = display[item.scope_level].slots[item.slot]
+                    if value is None:
+                        value = call_stack.access_variable(
+                            item.scope_level, item.slot
+                        )
+                    push_value(value)
+
+                elif node_class is Number:
+                    push_value(item.token.get_value())
+
+                elif node_class is Compound:
+                    for child in reversed(item.children):
+                        push(child)
+                        push(VISIT)
+
+                elif node_class is ProcedureCall:
+                    push(item)
+                    push(CALL)
+                    for param in reversed(item.actual_params):
+                        push(param)
+                        push(VISIT)
+
+                elif node_class is UnaryOperation:
+                    if item.op.get_type() == MINUS:
+                        push(None)
+                        push(NEGATE)
+                    push(item.right)
+                    push(VISIT)
+
+                elif node_class is not NoOp:
+                    self._error()
+
+            elif kind == APPLY:
+                b = pop_value()
+                values[-1] = _apply(item, values[-1], b)
+
+            elif kind == STORE:
+                display[item.scope_level].slots[item.slot] = pop_value()
+
+            elif kind == NEGATE:
+                values[-1] = -values[-1]
+
+            elif kind == CALL:
+                procedure = item.proc_symbol
+                procedure_ar = ActivationRecord(
+                    name=item.proc_name,
+                    ar_type=ArType.PROCEDURE,
+                    nesting_level=procedure.scope_level,
+                    slot_names=procedure.block_ast.slot_names
+                )
+                # Parameters occupy the first slots of the procedure
+                count = len(item.actual_params)
+                if count:
+                    procedure_ar.slots[:count] = values[-count:]
+                    del values[-count:]
+
+                call_stack.push(procedure_ar)
+                if tracer is not None:
+                    tracer.enter(call_stack)
+                push(None)
+                push(RETURN)
+                push(procedure.block_ast.compound_statement)
+                push(VISIT)
+
+            else:
+                if tracer is not None:
+                    tracer.leave(call_stack)
+                call_stack.pop()
+
+    def _error(self):
+        raise Exception("Incorrect parse tree.")
+
+
+def _apply(op, a, b):
+    if op == PLUS:
+        return a + b
+    if op == MINUS:
+        return a - b
+    if op == MULTIPLY:
+        return a * b
+    if op == INTEGER_DIV:
+        return a // b
+    if op == REAL_DIV:
+        return a / b
+    raise Exception("Incorrect parse tree.")
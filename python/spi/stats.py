@@ -0,0 +1,248 @@
+import json
+import tracemalloc
+from functools import partial
+from time import perf_counter
+
+from spi.ast import walk
+from spi.cache import ParseCache
+from spi.lexer import Lexer
+from spi.lexer import Scanner
+from spi.optimizer import ConstantFolder
+from spi.parser import Parser
+from spi.semantic_analyzer import SemanticAnalyzer
+
+
+class PhaseStats:
+    """
+    Wall time, tracemalloc peak in bytes and the counters of one phase.
+    """
+
+    def __init__(self, name, wall_time, memory_peak):
+        self.name = name
+        self.wall_time = wall_time
+        self.memory_peak = memory_peak
+        self.counters = {}
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "wall_time": self.wall_time,
+            "memory_peak": self.memory_peak,
+            "counters": dict(self.counters),
+        }
+
+
+class RunStats:
+    """
+    Statistics of the phases of one program run, in the order they ran.
+
+    Memory is traced with tracemalloc while a phase runs, which makes
+    the phase itself a few times slower. Pass trace_memory=False to get
+    undisturbed wall times.
+    """
+
+    def __init__(self, trace_memory=True):
+        self._trace_memory = trace_memory
+        self._phases = []
+
+    @property
+    def phases(self):
+        return list(self._phases)
+
+    def get_phase(self, name):
+        for phase in self._phases:
+            if phase.name == name:
+                return phase
+        return None
+
+    def measure(self, name, function, *args):
+        """
+        Runs the function as the named phase and returns its result
+        and the stats of the phase.
+        """
+        # Someone else may be tracing already, then only the peak is reset
+        started = False
+        baseline = 0
+        if self._trace_memory:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+            else:
+                tracemalloc.start()
+                started = True
+
+        start = perf_counter()
+        try:
+            result = function(*args)
+        finally:
+            wall_time = perf_counter() - start
+            memory_peak = None
+            if self._trace_memory:
+                memory_peak = tracemalloc.get_traced_memory()[1] - baseline
+            if started:
+                tracemalloc.stop()
+            phase = PhaseStats(name, wall_time, memory_peak)
+            self._phases.append(phase)
+        return result, phase
+
+    def total_time(self):
+        return sum(phase.wall_time for phase in self._phases)
+
+    def to_dict(self):
+        return {
+            "phases": [phase.to_dict() for phase in self._phases],
+            "total_time": self.total_time(),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+    def format_text(self):
+        lines = [f"{'PHASE':<10} {'TIME, ms':>10} {'PEAK, KiB':>10}  COUNTERS"]
+        for phase in self._phases:
+            peak = "-"
+            if phase.memory_peak is not None:
+                peak = f"{phase.memory_peak / 1024:.1f}"
+            counters = ", ".join(
+                f"{name}={value}" for name, value in phase.counters.items()
+            )
+            lines.append(
+                f"{phase.name:<10} {phase.wall_time * 1000:>10.3f} "
+                f"{peak:>10}  {counters}".rstrip()
+            )
+        lines.append(f"{'total':<10} {self.total_time() * 1000:>10.3f}")
+        return "\n".join(lines)
+
+
+def profile_program(
+        text,
+        engine_class,
+        scanner=Scanner.CHAR,
+        optimize=False,
+        cache=None,
+        tracer=None,
+        trace_memory=True
+):
+    """
+    Runs a program phase by phase and collects the stats of every phase.
+
+    Returns the final activation record of the program and the stats.
+    When the cache has the checked tree, loading it replaces lexing,
+    parsing and analysis.
+    """
+    return _profile(
+        partial(ParseCache.make_key, text, optimize=optimize),
+        partial(Lexer, text=text, scanner=scanner),
+        engine_class,
+        optimize,
+        cache,
+        tracer,
+        trace_memory
+    )
+
+
+def profile_file(
+        path,
+        engine_class,
+        scanner=Scanner.CHAR,
+        optimize=False,
+        cache=None,
+        tracer=None,
+        trace_memory=True
+):
+    """
+    Same as profile_program, but streams the source from the file
+    instead of holding all of its text.
+    """
+    return _profile(
+        partial(ParseCache.make_file_key, path, optimize=optimize),
+        partial(Lexer.from_path, path, scanner=scanner),
+        engine_class,
+        optimize,
+        cache,
+        tracer,
+        trace_memory
+    )
+
+
+def _profile(
+        make_key,
+        make_lexer,
+        engine_class,
+        optimize,
+        cache,
+        tracer,
+        trace_memory
+):
+    stats = RunStats(trace_memory=trace_memory)
+    tree = None
+    key = None
+    if cache is not None:
+        key = make_key()
+        tree, _ = stats.measure("load", cache.load, key)
+
+    if tree is None:
+        lexer = make_lexer()
+        try:
+            tokens, phase = stats.measure("lex", lexer.tokenize_all)
+        finally:
+            lexer.close()
+        phase.counters["tokens"] = len(tokens)
+
+        parser = Parser(lexer=tokens.reader())
+        tree, phase = stats.measure("parse", parser.parse)
+        phase.counters["nodes"] = _count_nodes(tree)
+
+        analyzer = SemanticAnalyzer()
+        _, phase = stats.measure("analyze", analyzer.analyze, tree)
+        phase.counters["symbols"] = analyzer.symbol_count
+
+        if optimize:
+            tree, phase = stats.measure("fold", ConstantFolder().fold, tree)
+            phase.counters["nodes"] = _count_nodes(tree)
+        if cache is not None:
+            stats.measure("store", cache.store, key, tree)
+
+    engine = engine_class(parser=None, tracer=tracer)
+    counter = None
+    if getattr(engine, "call_stack", None) is not None:
+        # Engines with a call stack report activations to tracers,
+        # count them on the way to the tracer of the run
+        counter = _CallCounter(tracer)
+        engine = engine_class(parser=None, tracer=counter)
+    ar, phase = stats.measure("execute", engine.run, tree)
+    if counter is not None:
+        phase.counters["activation_records"] = counter.activations
+        phase.counters["max_call_depth"] = counter.max_depth
+    return ar, stats
+
+
+class _CallCounter:
+    """
+    Tracer counting the activation records and the deepest call stack,
+    so the CallStack doesn't count them in every run.
+    """
+
+    def __init__(self, tracer):
+        self._tracer = tracer
+        self.activations = 0
+        self.max_depth = 0
+
+    def enter(self, call_stack):
+        self.activations += 1
+        if len(call_stack) > self.max_depth:
+            self.max_depth = len(call_stack)
+        if self._tracer is not None:
+            self._tracer.enter(call_stack)
+
+    def leave(self, call_stack):
+        if self._tracer is not None:
+            self._tracer.leave(call_stack)
+
+    def close(self):
+        if self._tracer is not None:
+            self._tracer.close()
+
+
+def _count_nodes(tree):
+    return sum(1 for _ in walk(tree))
@@ -1,7 +1,14 @@
 
+from sys import intern
+
+
 class Symbol:
+    __slots__ = ("_name", "_type")
+
     def __init__(self, name, the_type=None):
-        self._name = name
+        # Names from the lexer are interned already, so scopes and
+        # frames compare the names they are looked up by with identity
+        self._name = intern(name)
         self._type = the_type
 
     def get_name(self):
@@ -12,6 +19,8 @@ class Symbol:
 
 
 class BuiltinTypeSymbol(Symbol):
+    __slots__ = ()
+
     def __init__(self, name):
         super().__init__(name)
 
@@ -22,9 +31,16 @@ class BuiltinTypeSymbol(Symbol):
 
 
 class VarSymbol(Symbol):
+    __slots__ = ("scope_level", "slot")
+
     def __init__(self, name, the_type):
         super().__init__(name, the_type)
 
+        # Address of the variable in an activation record,
+        # assigned when the symbol is inserted into a scope.
+        self.scope_level = None
+        self.slot = None
+
     def __str__(self):
         return f"<{self._name}:{self._type}>"
 
@@ -32,6 +48,8 @@ class VarSymbol(Symbol):
 
 
 class ProcedureSymbol(Symbol):
+    __slots__ = ("params", "scope_level", "block_ast")
+
     def __init__(self, name, params=None):
         super().__init__(name)
         self._type = BuiltinTypeSymbol("procedure")
@@ -39,6 +57,10 @@ class ProcedureSymbol(Symbol):
         if params is None:
             self.params = []
 
+        # Filled in by the semantic analyzer
+        self.scope_level = None
+        self.block_ast = None
+
     def __str__(self):
         return (
             f"<{self.__class__.__name__}"
@@ -53,6 +75,7 @@ class ScopedSymbolTable:
         self._scope_name = scope_name
         self._scope_level = scope_level
         self._symbols = {}
+        self._slot_names = []
         self._enclosing_scope = enclosing_scope
         self._init_builtins()
 
@@ -68,6 +91,13 @@ class ScopedSymbolTable:
     def enclosing_scope(self):
         return self._enclosing_scope
 
+    @property
+    def slot_names(self):
+        """
+        Names of the variables of the scope in the order of their slots.
+        """
+        return tuple(self._slot_names)
+
     def __str__(self):
         return "Symbols: {symbols}".format(
             symbols=[val for val in self._symbols.values()]
@@ -77,6 +107,10 @@ class ScopedSymbolTable:
 
     def insert(self, symbol):
         self._symbols[symbol.get_name()] = symbol
+        if isinstance(symbol, VarSymbol):
+            symbol.scope_level = self._scope_level
+            symbol.slot = len(self._slot_names)
+            self._slot_names.append(symbol.get_name())
 
     def lookup(self, name, go_deep=True):
         if not go_deep:
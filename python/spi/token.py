@@ -1,3 +1,5 @@
+from array import array
+from bisect import bisect_right
 from enum import Enum
 
 
@@ -28,12 +30,80 @@ class TokenType(Enum):
     EOF = "EOF"
 
 
+# Small integer codes of the token types, used by compact token storage
+TOKEN_TYPES = tuple(TokenType)
+TOKEN_TYPE_CODES = {
+    token_type: code for code, token_type in enumerate(TOKEN_TYPES)
+}
+
+
+class LineIndex:
+    """
+    Offsets of the first characters of the lines of a source.
+
+    Tokens keep only their offsets, lines and columns are found here
+    when they are asked for, usually to report an error.
+    """
+
+    __slots__ = ("_starts",)
+
+    def __init__(self, text=""):
+        self._starts = array("I", [0])
+        self.extend(text, 0)
+
+    @classmethod
+    def from_starts(cls, starts):
+        index = cls()
+        index._starts = array("I", starts)
+        return index
+
+    @property
+    def starts(self):
+        return self._starts
+
+    def extend(self, text, offset):
+        """
+        Adds the lines beginning in a piece of the source, which starts
+        at the offset. Pieces have to come in order.
+        """
+        starts = self._starts
+        newline = text.find("\n")
+        while newline != -1:
+            starts.append(offset + newline + 1)
+            newline = text.find("\n", newline + 1)
+
+    def replace(self, offset, deleted, inserted):
+        """
+        Updates the index after 'deleted' characters at the offset
+        have been replaced with the inserted text.
+        """
+        starts = self._starts
+        first = bisect_right(starts, offset)
+        last = bisect_right(starts, offset + deleted)
+        delta = len(inserted) - deleted
+        following = array("I", (start + delta for start in starts[last:]))
+        del starts[first:]
+        self.extend(inserted, offset)
+        starts.extend(following)
+
+    def position(self, offset):
+        """
+        Returns the line and the column of the offset, both from 1.
+        """
+        line = bisect_right(self._starts, offset)
+        return line, offset - self._starts[line - 1] + 1
+
+
 class Token:
-    def __init__(self, type_, value, line_number=None, column=None):
+    __slots__ = ("_type", "_value", "_offset", "_lines")
+
+    def __init__(self, type_, value, offset=None, lines=None):
         self._type = type_
         self._value = value
-        self._line_number = line_number
-        self._column = column
+        # Offset of the first character in the source and the LineIndex
+        # of the source, both None when the token has no position
+        self._offset = offset
+        self._lines = lines
 
     def get_type(self):
         return self._type
@@ -41,15 +111,27 @@ class Token:
     def get_value(self):
         return self._value
 
+    def get_offset(self):
+        return self._offset
+
+    def get_lines(self):
+        return self._lines
+
     def get_line_number(self):
-        return self._line_number
+        return self.get_position()[0]
 
     def get_column(self):
-        return self._column
+        return self.get_position()[1]
+
+    def get_position(self):
+        if self._offset is None or self._lines is None:
+            return None, None
+        return self._lines.position(self._offset)
 
     def __str__(self):
+        line_number, column = self.get_position()
         return (
-            f"Token({self._type.value}, {self._value}, position={self._line_number}:{self._column})"
+            f"Token({self._type.value}, {self._value}, position={line_number}:{column})"
         )
 
     def __repr__(self):
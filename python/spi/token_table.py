@@ -0,0 +1,144 @@
+import json
+import struct
+from array import array
+from sys import intern
+
+from spi.token import LineIndex, Token, TOKEN_TYPES, TOKEN_TYPE_CODES
+
+
+class TokenTable:
+    """
+    Column oriented storage of a token sequence.
+
+    Token types are kept as one byte codes, offsets in the source
+    plus one and values in a list where equal values share one object.
+    Offset 0 stands for a missing position (the EOF token). Lines and
+    columns come from the LineIndex of the source.
+    """
+
+    def __init__(self, lines=None):
+        self._types = array("B")
+        self._offsets = array("I")
+        self._values = []
+        self._pool = {}
+        self._lines = lines
+
+    @property
+    def lines(self):
+        return self._lines
+
+    @lines.setter
+    def lines(self, lines):
+        self._lines = lines
+
+    def append(self, token_type, value, offset):
+        self._types.append(TOKEN_TYPE_CODES[token_type])
+        self._offsets.append(0 if offset is None else offset + 1)
+        self._values.append(self._share(value))
+
+    def __len__(self):
+        return len(self._types)
+
+    def get_type(self, index):
+        return TOKEN_TYPES[self._types[index]]
+
+    def get_value(self, index):
+        return self._values[index]
+
+    def get_offset(self, index):
+        offset = self._offsets[index]
+        if offset == 0:
+            return None
+        return offset - 1
+
+    def get_line_number(self, index):
+        return self.token(index).get_line_number()
+
+    def get_column(self, index):
+        return self.token(index).get_column()
+
+    def token(self, index):
+        return Token(
+            TOKEN_TYPES[self._types[index]],
+            self._values[index],
+            self.get_offset(index),
+            self._lines
+        )
+
+    def reader(self):
+        return TokenTableReader(self)
+
+    def to_bytes(self):
+        """
+        Serializes the table. Arrays are written in the native byte order.
+        """
+        values = json.dumps(self._values).encode()
+        starts = array("I")
+        if self._lines is not None:
+            starts = self._lines.starts
+        return b"".join(
+            [
+                struct.pack(
+                    "<III", len(self._types), len(values), len(starts)
+                ),
+                self._types.tobytes(),
+                self._offsets.tobytes(),
+                values,
+                starts.tobytes(),
+            ]
+        )
+
+    @classmethod
+    def from_bytes(cls, data, offset=0):
+        """
+        Reads a table written by to_bytes starting at the offset.
+
+        Returns the table and the offset right after it.
+        """
+        count, values_size, line_count = struct.unpack_from(
+            "<III", data, offset
+        )
+        offset += struct.calcsize("<III")
+
+        table = cls()
+        table._types.frombytes(data[offset:offset + count])
+        offset += count
+        offsets_size = count * table._offsets.itemsize
+        table._offsets.frombytes(data[offset:offset + offsets_size])
+        offset += offsets_size
+        values = json.loads(data[offset:offset + values_size].decode())
+        offset += values_size
+        if line_count:
+            starts = array("I")
+            starts_size = line_count * starts.itemsize
+            starts.frombytes(data[offset:offset + starts_size])
+            offset += starts_size
+            table._lines = LineIndex.from_starts(starts)
+
+        table._values.extend(table._share(value) for value in values)
+        return table, offset
+
+    def _share(self, value):
+        key = (type(value), value)
+        shared = self._pool.get(key)
+        if shared is None and value is not None:
+            if isinstance(value, str):
+                value = intern(value)
+            self._pool[key] = shared = value
+        return shared
+
+
+class TokenTableReader:
+    """
+    Feeds the tokens of a TokenTable to the Parser one index at a time.
+    """
+
+    def __init__(self, table):
+        self._table = table
+        self._index = 0
+
+    def get_next_token(self):
+        # The last token of a table is always EOF, keep returning it
+        index = min(self._index, len(self._table) - 1)
+        self._index = index + 1
+        return self._table.token(index)
@@ -0,0 +1,158 @@
+import json
+from collections import deque
+from enum import Enum
+
+
+class TraceEventType(Enum):
+    ENTER = "enter"
+    LEAVE = "leave"
+
+
+class TraceEvent:
+    """
+    Entering or leaving a program or procedure.
+
+    'frames' holds snapshots of the whole call stack, the top record
+    first, or None if the tracer doesn't take snapshots.
+    """
+
+    def __init__(self, event_type, name, ar_type, nesting_level, depth, frames):
+        self.event_type = event_type
+        self.name = name
+        self.ar_type = ar_type
+        self.nesting_level = nesting_level
+        self.depth = depth
+        self.frames = frames
+
+    def to_dict(self):
+        event = {
+            "event": self.event_type.value,
+            "name": self.name,
+            "type": self.ar_type.value,
+            "nesting_level": self.nesting_level,
+            "depth": self.depth,
+        }
+        if self.frames is not None:
+            event["frames"] = [
+                {
+                    "name": frame.name,
+                    "type": frame.ar_type.value,
+                    "nesting_level": frame.nesting_level,
+                    "members": dict(frame.members),
+                }
+                for frame in self.frames
+            ]
+        return event
+
+
+def format_text(event):
+    """
+    Formats an event the way the interpreter has always logged the stack.
+    """
+    verb = "ENTERING" if event.event_type == TraceEventType.ENTER else "LEAVING"
+    header = f"{verb}: {event.ar_type.value.upper()} {event.name}"
+    if event.frames is None:
+        return header
+    frames = "\n".join(repr(frame) for frame in event.frames)
+    return f"{header}\nCALL STACK\n{frames}\n"
+
+
+def format_json(event):
+    return json.dumps(event.to_dict())
+
+
+class StdoutSink:
+    def __init__(self, formatter=format_text):
+        self._formatter = formatter
+
+    def emit(self, event):
+        print(self._formatter(event))
+
+    def close(self):
+        pass
+
+
+class FileSink:
+    """
+    Writes one formatted event per line, JSON lines by default.
+    """
+
+    def __init__(self, path, formatter=format_json):
+        self._formatter = formatter
+        self._file = open(path, "w")
+
+    def emit(self, event):
+        self._file.write(self._formatter(event))
+        self._file.write("\n")
+
+    def close(self):
+        self._file.close()
+
+
+class RingBufferSink:
+    """
+    Keeps the last 'capacity' events in memory.
+    """
+
+    def __init__(self, capacity=1024):
+        self._events = deque(maxlen=capacity)
+
+    @property
+    def events(self):
+        return list(self._events)
+
+    def emit(self, event):
+        self._events.append(event)
+
+    def close(self):
+        pass
+
+
+class Tracer:
+    """
+    Reports program and procedure activations to the sinks.
+
+    Interpreters keep None instead of a tracer when tracing is off,
+    so a disabled tracer costs one comparison per activation and
+    nothing is formatted or copied.
+    """
+
+    def __init__(self, sinks, snapshot_frames=True):
+        self._sinks = tuple(sinks)
+        self._snapshot_frames = snapshot_frames
+
+    def enter(self, call_stack):
+        self._emit(TraceEventType.ENTER, call_stack)
+
+    def leave(self, call_stack):
+        self._emit(TraceEventType.LEAVE, call_stack)
+
+    def close(self):
+        for sink in self._sinks:
+            sink.close()
+
+    def _emit(self, event_type, call_stack):
+        ar = call_stack.peek()
+        frames = None
+        if self._snapshot_frames:
+            frames = call_stack.snapshot()
+        event = TraceEvent(
+            event_type=event_type,
+            name=ar.name,
+            ar_type=ar.ar_type,
+            nesting_level=ar.nesting_level,
+            depth=len(call_stack),
+            frames=frames
+        )
+        for sink in self._sinks:
+            sink.emit(event)
+
+
+def make_tracer(should_log_stack):
+    """
+    Returns the tracer which prints the stack to stdout
+    if it should be logged.
+    """
+    if should_log_stack:
+        return Tracer(sinks=[StdoutSink()])
+    return None
@@ -0,0 +1,424 @@
+from array import array
+from enum import IntEnum
+
+from spi.activation_record import ActivationRecord
+from spi.activation_record import ArType
+from spi.ast import BinaryOperation
+from spi.ast import Number
+from spi.ast import UnaryOperation
+from spi.ast import Var
+from spi.call_stack import CallStack
+from spi.errors import RuntimeInterpreterError
+from spi.front_end import build_tree
+from spi.node_visitor import NodeVisitor
+from spi.token import TokenType
+from spi.tracing import make_tracer
+
+
+class Opcode(IntEnum):
+    """
+    Instructions of the register machine.
+
+    Every instruction takes INSTRUCTION_SIZE integers: the opcode and
+    three operands, unused operands are 0. 'r' operands are registers
+    of the running code, slots belong to its activation record.
+    """
+
+    # r, constant index
+    LOAD_CONST = 0
+    # r, slot
+    LOAD_SLOT = 1
+    # r, slot
+    STORE_SLOT = 2
+    # r, nesting level, slot
+    LOAD_OUTER = 3
+    # r, nesting level, slot
+    STORE_OUTER = 4
+    # r, r left, r right
+    ADD = 5
+    SUB = 6
+    MUL = 7
+    IDIV = 8
+    RDIV = 9
+    # r, r operand
+    NEG = 10
+    # code index, first argument register, argument count
+    CALL = 11
+    RET = 12
+
+
+INSTRUCTION_SIZE = 4
+
+# Maps operator token type to the opcode computing it
+BINARY_OPCODES = {
+    TokenType.PLUS: Opcode.ADD,
+    TokenType.MINUS: Opcode.SUB,
+    TokenType.MULTIPLY: Opcode.MUL,
+    TokenType.INTEGER_DIV: Opcode.IDIV,
+    TokenType.REAL_DIV: Opcode.RDIV,
+}
+
+# Plain ints for the dispatch loop, comparing enum members is slower
+LOAD_CONST = int(Opcode.LOAD_CONST)
+LOAD_SLOT = int(Opcode.LOAD_SLOT)
+STORE_SLOT = int(Opcode.STORE_SLOT)
+LOAD_OUTER = int(Opcode.LOAD_OUTER)
+STORE_OUTER = int(Opcode.STORE_OUTER)
+ADD = int(Opcode.ADD)
+SUB = int(Opcode.SUB)
+MUL = int(Opcode.MUL)
+IDIV = int(Opcode.IDIV)
+RDIV = int(Opcode.RDIV)
+NEG = int(Opcode.NEG)
+CALL = int(Opcode.CALL)
+RET = int(Opcode.RET)
+
+
+class CodeObject:
+    """
+    Compiled block of the program or of a procedure.
+    """
+
+    def __init__(self, name, ar_type, nesting_level, slot_names):
+        self.name = name
+        self.ar_type = ar_type
+        self.nesting_level = nesting_level
+        self.slot_names = slot_names
+        self.instructions = array("i")
+        self.constants = []
+        self.register_count = 0
+
+        # Indices of the constants keyed by their types and spellings,
+        # so 1 and 1.0, as well as 0.0 and -0.0, get different constants
+        self._constant_indices = {}
+
+    def emit(self, opcode, a=0, b=0, c=0):
+        self.instructions.extend((opcode, a, b, c))
+
+    def add_constant(self, value):
+        key = (type(value), repr(value))
+        index = self._constant_indices.get(key)
+        if index is None:
+            index = len(self.constants)
+            self.constants.append(value)
+            self._constant_indices[key] = index
+        return index
+
+
+class VmCompiler(NodeVisitor):
+    """
+    Compiles a checked parse tree into code objects, the program first.
+
+    Expressions are compiled into a target register. Temporaries are
+    allocated above it like a stack and freed right after use, so the
+    number of registers of a code object is the deepest expression.
+    """
+
+    def __init__(self):
+        self._codes = []
+
+        # Indices of the code objects keyed by the blocks of procedures
+        self._code_indices = {}
+
+        # Code being compiled and its next free register
+        self._code = None
+        self._next_register = 0
+
+    def compile(self, tree):
+        self._visit(tree)
+        return self._codes
+
+    def _visit_Program(self, node):
+        self._codes.append(None)
+        self._compile_block(
+            CodeObject(node.name, ArType.PROGRAM, 1, node.block.slot_names),
+            index=0,
+            block=node.block
+        )
+
+    def _compile_block(self, code, index, block):
+        outer_code = self._code
+        outer_register = self._next_register
+        self._code = code
+        self._next_register = 0
+
+        self._visit(block)
+        code.emit(Opcode.RET)
+        self._codes[index] = code
+
+        self._code = outer_code
+        self._next_register = outer_register
+
+    def _visit_Block(self, node):
+        for declaration in node.declarations:
+            self._visit(declaration)
+        self._visit(node.compound_statement)
+
+    def _visit_VarDeclaration(self, node):
+        pass
+
+    def _visit_ProcedureDeclaration(self, node):
+        code = CodeObject(
+            node.proc_name,
+            ArType.PROCEDURE,
+            self._code.nesting_level + 1,
+            node.block_node.slot_names
+        )
+        index = self._code_index(node.block_node)
+        self._compile_block(code, index=index, block=node.block_node)
+
+    def _visit_Compound(self, node):
+        for child in node.children:
+            self._visit(child)
+
+    def _visit_NoOp(self, node):
+        pass
+
+    def _visit_Assign(self, node):
+        register = self._allocate()
+        self._compile_expression(node.right, register)
+        if node.left.scope_level == self._code.nesting_level:
+            self._code.emit(Opcode.STORE_SLOT, register, node.left.slot)
+        else:
+            self._code.emit(
+                Opcode.STORE_OUTER,
+                register,
+                node.left.scope_level,
+                node.left.slot
+            )
+        self._free(register)
+
+    def _visit_ProcedureCall(self, node):
+        # Arguments are computed into consecutive registers
+        base = self._next_register
+        for _ in node.actual_params:
+            self._allocate()
+        for i, param in enumerate(node.actual_params):
+            self._compile_expression(param, base + i)
+
+        index = self._code_index(node.proc_symbol.block_ast)
+        self._code.emit(Opcode.CALL, index, base, len(node.actual_params))
+        self._next_register = base
+
+    def _compile_expression(self, node, target):
+        if isinstance(node, Number):
+            constant = self._code.add_constant(node.value)
+            self._code.emit(Opcode.LOAD_CONST, target, constant)
+        elif isinstance(node, Var):
+            if node.scope_level == self._code.nesting_level:
+                self._code.emit(Opcode.LOAD_SLOT, target, node.slot)
+            else:
+                self._code.emit(
+                    Opcode.LOAD_OUTER, target, node.scope_level, node.slot
+                )
+        elif isinstance(node, UnaryOperation):
+            self._compile_expression(node.right, target)
+            if node.op.get_type() == TokenType.MINUS:
+                self._code.emit(Opcode.NEG, target, target)
+        elif isinstance(node, BinaryOperation):
+            opcode = BINARY_OPCODES.get(node.op.get_type())
+            if opcode is None:
+                self._error()
+            self._compile_expression(node.left, target)
+            right = self._allocate()
+            self._compile_expression(node.right, right)
+            self._code.emit(opcode, target, target, right)
+            self._free(right)
+        else:
+            self._error()
+
+    def _allocate(self):
+        register = self._next_register
+        self._next_register += 1
+        if self._next_register > self._code.register_count:
+            self._code.register_count = self._next_register
+        return register
+
+    def _free(self, register):
+        self._next_register = register
+
+    def _code_index(self, block):
+        index = self._code_indices.get(block)
+        if index is None:
+            index = len(self._codes)
+            self._codes.append(None)
+            self._code_indices[block] = index
+        return index
+
+    def _error(self):
+        raise Exception("Incorrect parse tree.")
+
+
+def disassemble(codes):
+    """
+    Returns a readable listing of the compiled code objects.
+    """
+    lines = []
+    for index, code in enumerate(codes):
+        lines.append(
+            f"code {index}: {code.ar_type.value} {code.name}, "
+            f"level {code.nesting_level}, slots {list(code.slot_names)}, "
+            f"{code.register_count} registers"
+        )
+        instructions = code.instructions
+        for pc in range(0, len(instructions), INSTRUCTION_SIZE):
+            opcode = Opcode(instructions[pc])
+            a, b, c = instructions[pc + 1:pc + INSTRUCTION_SIZE]
+            lines.append(
+                f"  {pc // INSTRUCTION_SIZE:>4}  {opcode.name:<12}"
+                f"{_format_operands(code, codes, opcode, a, b, c)}".rstrip()
+            )
+    return "\n".join(lines)
+
+
+def _format_operands(code, codes, opcode, a, b, c):
+    if opcode == Opcode.LOAD_CONST:
+        return f"r{a}, {code.constants[b]!r}"
+    if opcode in (Opcode.LOAD_SLOT, Opcode.STORE_SLOT):
+        return f"r{a}, {code.slot_names[b]}"
+    if opcode in (Opcode.LOAD_OUTER, Opcode.STORE_OUTER):
+        return f"r{a}, level {b} slot {c}"
+    if opcode == Opcode.NEG:
+        return f"r{a}, r{b}"
+    if opcode == Opcode.CALL:
+        return f"{codes[a].name}, r{b}..r{b + c - 1}" if c else codes[a].name
+    if opcode == Opcode.RET:
+        return ""
+    return f"r{a}, r{b}, r{c}"
+
+
+class VirtualMachine:
+    """
+    Drop-in alternative to the Interpreter which compiles the checked
+    tree into instructions for a register machine and runs them in
+    one dispatch loop.
+
+    Variables live in the activation records on the CallStack exactly
+    like in the Interpreter, registers only hold temporaries.
+    """
+
+    def __init__(
+            self,
+            parser,
+            should_log_stack=False,
+            tracer=None,
+            optimize=False
+    ):
+        self._parser = parser
+        self._optimize = optimize
+        self._call_stack = CallStack()
+        if tracer is None:
+            tracer = make_tracer(should_log_stack)
+        self._tracer = tracer
+        self._codes = ()
+
+    @property
+    def call_stack(self):
+        return self._call_stack
+
+    @property
+    def codes(self):
+        return self._codes
+
+    def execute(self):
+        """
+        Executes a pascal program.
+
+        Returns the activation record of the program as it was
+        right before it has been popped from the call stack.
+        """
+        return self.run(build_tree(self._parser, optimize=self._optimize))
+
+    def run(self, tree):
+        """
+        Executes a parse tree which has already passed semantic analysis.
+        """
+        self._codes = VmCompiler().compile(tree)
+        program = self._codes[0]
+        ar = ActivationRecord(
+            name=program.name,
+            ar_type=ArType.PROGRAM,
+            nesting_level=1,
+            slot_names=program.slot_names
+        )
+        self._call_stack.push(ar)
+        if self._tracer is not None:
+            self._tracer.enter(self._call_stack)
+
+        self._execute(program, ar)
+
+        if self._tracer is not None:
+            self._tracer.leave(self._call_stack)
+        return self._call_stack.pop()
+
+    def get_current_ar_for_test(self):
+        return self._call_stack.peek()
+
+    def _execute(self, code, ar):
+        instructions = code.instructions
+        constants = code.constants
+        registers = [None] * code.register_count
+        slots = ar.slots
+        call_stack = self._call_stack
+        pc = 0
+
+        while True:
+            opcode = instructions[pc]
+            a = instructions[pc + 1]
+            b = instructions[pc + 2]
+            c = instructions[pc + 3]
+            pc += INSTRUCTION_SIZE
+
+            if opcode == LOAD_SLOT:
+                value = slots[b]
+                if value is None:
+                    raise RuntimeInterpreterError()
+                registers[a] = value
+            elif opcode == LOAD_CONST:
+                registers[a] = constants[b]
+            elif opcode == ADD:
+                registers[a] = registers[b] + registers[c]
+            elif opcode == MUL:
+                registers[a] = registers[b] * registers[c]
+            elif opcode == SUB:
+                registers[a] = registers[b] - registers[c]
+            elif opcode == STORE_SLOT:
+                slots[b] = registers[a]
+            elif opcode == LOAD_OUTER:
+                registers[a] = call_stack.access_variable(b, c)
+            elif opcode == STORE_OUTER:
+                call_stack.assign_variable(b, c, registers[a])
+            elif opcode == IDIV:
+                registers[a] = registers[b] // registers[c]
+            elif opcode == RDIV:
+                registers[a] = registers[b] / registers[c]
+            elif opcode == NEG:
+                registers[a] = -registers[b]
+            elif opcode == CALL:
+                self._call(self._codes[a], registers[b:b + c])
+            elif opcode == RET:
+                return
+            else:
+                raise RuntimeInterpreterError(
+                    message=f"Unknown opcode {opcode}."
+                )
+
+    def _call(self, code, arguments):
+        procedure_ar = ActivationRecord(
+            name=code.name,
+            ar_type=ArType.PROCEDURE,
+            nesting_level=code.nesting_level,
+            slot_names=code.slot_names
+        )
+        # Parameters occupy the first slots of the procedure
+        procedure_ar.slots[:len(arguments)] = arguments
+
+        self._call_stack.push(procedure_ar)
+        if self._tracer is not None:
+            self._tracer.enter(self._call_stack)
+
+        self._execute(code, procedure_ar)
+
+        if self._tracer is not None:
+            self._tracer.leave(self._call_stack)
+        self._call_stack.pop()
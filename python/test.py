@@ -1,10 +1,31 @@
 
 import unittest
 
+from test.arena import ArenaTc
+from test.batch import BatchTc
+from test.bench import BenchTc
+from test.cache import ParseCacheTc
+from test.call_stack import CallStackTc
+from test.engines import EnginesTc
+from test.incremental import IncrementalTc
 from test.interpreter import InterpreterTc
+from test.lexer import InternerTc
 from test.lexer import LexerTc
+from test.lexer import LineIndexTc
+from test.lexer import RegexLexerTc
+from test.lexer import RegexStreamLexerTc
+from test.lexer import StreamLexerTc
+from test.lexer import StreamSourcesTc
+from test.lexer import TokenTableTc
+from test.node_visitor import NodeVisitorTc
+from test.optimizer import ConstantFolderTc
+from test.parser import ParserTc
+from test.profiler import ProfilerTc
 from test.program import ProgramTc
 from test.semantic_analyzer import SemanticAnalyzerTc
+from test.server import ServerTc
+from test.stats import StatsTc
+from test.tracing import TracingTc
 
 
 if __name__ == "__main__":
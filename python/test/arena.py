@@ -0,0 +1,71 @@
+from unittest import TestCase
+
+from spi.arena import AstArena
+from spi.arena import NodeKind
+from spi.arena import parse_to_arena
+from spi.ast import walk
+from spi.errors import ParserError
+from spi.front_end import check_tree
+from spi.interpreter import Interpreter
+from spi.lexer import Lexer
+from spi.parser import Parser
+from spi.token import TokenType
+
+
+def _read(path):
+    with open(path) as source_file:
+        return source_file.read()
+
+
+def _node_names(tree):
+    return [type(node).__name__ for node in walk(tree)]
+
+
+class ArenaTc(TestCase):
+    def test_parse(self):
+        arena = parse_to_arena(Lexer("program P; begin x := -1 + y end."))
+        kinds = [arena.get_kind(index) for index in arena.walk()]
+        self.assertEqual(
+            kinds,
+            [
+                NodeKind.PROGRAM, NodeKind.BLOCK, NodeKind.COMPOUND,
+                NodeKind.ASSIGN, NodeKind.VAR, NodeKind.BINARY_OPERATION,
+                NodeKind.UNARY_OPERATION, NodeKind.NUMBER, NodeKind.VAR,
+            ]
+        )
+        self.assertEqual(arena.get_value(arena.root), "p")
+        plus = list(arena.walk())[5]
+        self.assertEqual(arena.get_token_type(plus), TokenType.PLUS)
+        self.assertEqual(len(arena.children(plus)), 2)
+
+    def test_to_tree(self):
+        text = _read("test/data/part10.pas")
+        tree = parse_to_arena(Lexer(text)).to_tree()
+        self.assertEqual(
+            _node_names(tree), _node_names(Parser(lexer=Lexer(text)).parse())
+        )
+
+        ar = Interpreter(parser=None).run(check_tree(tree))
+        self.assertEqual(ar["b"], 25)
+        self.assertAlmostEqual(ar["y"], 5.997142857142857)
+
+    def test_from_tree(self):
+        text = _read("test/data/nestedscopes05.pas")
+        arena = AstArena.from_tree(Parser(lexer=Lexer(text)).parse())
+        ar = Interpreter(parser=None).run(check_tree(arena.to_tree()))
+        self.assertEqual(ar["total"], 115)
+
+    def test_bytes(self):
+        arena = parse_to_arena(Lexer(_read("test/data/part19a.pas")))
+        data = arena.to_bytes()
+        copy = AstArena.from_bytes(data)
+
+        self.assertEqual(copy.to_bytes(), data)
+        self.assertEqual(copy.digest(), arena.digest())
+        self.assertEqual(list(copy.walk()), list(arena.walk()))
+        with self.assertRaises(ValueError):
+            AstArena.from_bytes(b"JJPI" + data[4:])
+
+    def test_parser_errors(self):
+        with self.assertRaises(ParserError):
+            parse_to_arena(Lexer("program P; begin x := end"))
@@ -0,0 +1,86 @@
+import gc
+import os
+import warnings
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from spi.batch import collect_sources
+from spi.batch import run_batch
+from spi.batch import run_file
+from spi.closure_compiler import ClosureInterpreter
+from spi.interpreter import Interpreter
+
+
+class BatchTc(TestCase):
+    def test_collect_directory(self):
+        paths = collect_sources(["test/data"])
+        self.assertIn(os.path.join("test/data", "part10.pas"), paths)
+        self.assertTrue(all(path.endswith(".pas") for path in paths))
+
+    def test_collect_glob_and_manifest(self):
+        self.assertEqual(
+            collect_sources(["test/data/part1?.pas"]),
+            [f"test/data/part1{i}.pas" for i in (0, 1, 2, 5, 6, 7)]
+        )
+        with TemporaryDirectory() as directory:
+            manifest = os.path.join(directory, "programs.txt")
+            with open(manifest, "w") as manifest_file:
+                manifest_file.write("# programs\na.pas\n\nsub/b.pas\n")
+            self.assertEqual(
+                collect_sources([manifest]),
+                [
+                    os.path.join(directory, "a.pas"),
+                    os.path.join(directory, "sub/b.pas"),
+                ]
+            )
+
+    def test_run_file(self):
+        result = run_file("test/data/nestedscopes05.pas", Interpreter)
+        self.assertEqual(result["status"], "ok")
+        self.assertEqual(result["globals"]["total"], 115)
+        self.assertEqual(
+            set(result["timings"]),
+            {"lex", "parse", "analyze", "execute", "total"}
+        )
+
+        result = run_file("test/data/missing.pas", Interpreter)
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(result["error"]["type"], "FileNotFoundError")
+
+    def test_lexer_error_closes_file(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "broken.pas")
+            with open(path, "w") as source_file:
+                source_file.write("program Broken; begin @ end.")
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always", ResourceWarning)
+                result = run_file(path, Interpreter)
+                gc.collect()
+
+        self.assertEqual(result["error"]["type"], "LexerError")
+        self.assertEqual(
+            [w for w in caught if issubclass(w.category, ResourceWarning)], []
+        )
+
+    def test_run_batch(self):
+        paths = collect_sources(["test/data"])
+        with TemporaryDirectory() as directory:
+            results = list(
+                run_batch(
+                    paths,
+                    workers=2,
+                    engine_class=ClosureInterpreter,
+                    cache_directory=directory
+                )
+            )
+
+        self.assertEqual([result["path"] for result in results], paths)
+        results = {os.path.basename(r["path"]): r for r in results}
+        self.assertEqual(results["nestedscopes05.pas"]["globals"]["total"], 115)
+        self.assertEqual(
+            results["name_error1.pas"]["error"]["code"], "ID_NOT_FOUND"
+        )
+        self.assertEqual(
+            results["part16ArgumentMismatch1.pas"]["error"]["code"],
+            "PROCEDURE_PARAMETERS_MISMATCH"
+        )
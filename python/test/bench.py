@@ -0,0 +1,66 @@
+from unittest import TestCase
+
+from bench.generator import generate_program
+from bench.harness import compare
+from bench.harness import ENGINES
+from bench.dispatch import measure_dispatch
+from bench.harness import run_benchmarks
+from bench.memory import measure_records
+from bench.memory import measure_tree
+from spi.front_end import build_tree
+from spi.lexer import Lexer
+from spi.parser import Parser
+
+
+SIZES = dict(declarations=5, nesting=3, expression_length=20, calls=3)
+
+
+class BenchTc(TestCase):
+    def test_generator_is_seeded(self):
+        self.assertEqual(
+            generate_program(seed=7, **SIZES), generate_program(seed=7, **SIZES)
+        )
+        self.assertNotEqual(
+            generate_program(seed=7, **SIZES), generate_program(seed=8, **SIZES)
+        )
+
+    def test_generated_program_runs(self):
+        text = generate_program(seed=3, **SIZES)
+        frames = []
+        for engine_class in ENGINES.values():
+            tree = build_tree(Parser(lexer=Lexer(text)))
+            frames.append(dict(engine_class(parser=None).run(tree).items()))
+
+        self.assertEqual(len(frames[0]), SIZES["declarations"])
+        self.assertTrue(all(abs(v) < 1000 for v in frames[0].values()))
+        for frame in frames[1:]:
+            self.assertEqual(frame, frames[0])
+
+    def test_report(self):
+        report = run_benchmarks(["nesting"], repeat=1, scale=0.01)
+        stages = report["workloads"]["nesting"]["stages"]
+        self.assertEqual(
+            list(stages),
+            [
+                "lex", "parse", "analyze", "fold",
+                "execute:tree", "execute:closure", "execute:python",
+                "execute:vm", "execute:stack",
+            ]
+        )
+        self.assertGreater(stages["lex"]["tokens_per_sec"], 0)
+        ratios = [row[-1] for row in compare(report, report)]
+        self.assertEqual(ratios, [1.0] * len(stages))
+
+    def test_memory(self):
+        result = measure_tree(generate_program(seed=1, **SIZES))
+        self.assertGreater(result["nodes"], 0)
+        self.assertEqual(result["symbols"], 5 + 3 * 6)
+        # Nodes and tokens have slots, a node with its token fits in 200 bytes
+        self.assertLess(result["bytes_per_node"], 200)
+        self.assertLess(measure_records()["bytes_per_record"], 200)
+
+    def test_dispatch(self):
+        results = measure_dispatch(generate_program(seed=2, **SIZES), repeat=1)
+        self.assertEqual(list(results), ["analyze", "execute", "source"])
+        for result in results.values():
+            self.assertGreater(result["visits"], 0)
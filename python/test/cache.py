@@ -0,0 +1,90 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from spi.cache import build_cached_tree
+from spi.cache import ParseCache
+from spi.interpreter import Interpreter
+
+
+def _read(path):
+    with open(path) as source_file:
+        return source_file.read()
+
+
+def _entries(directory):
+    return sorted(os.listdir(directory))
+
+
+class ParseCacheTc(TestCase):
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        self._path = self._directory.name
+
+    def test_round_trip(self):
+        text = _read("test/data/nestedscopes05.pas")
+        cache = ParseCache(self._path)
+        built = build_cached_tree(text, cache=cache, optimize=True)
+        cached = build_cached_tree(text, cache=cache, optimize=True)
+
+        self.assertIsNot(cached, built)
+        self.assertEqual(len(_entries(self._path)), 1)
+        ar = Interpreter(parser=None).run(cached)
+        self.assertEqual(ar["total"], 115)
+
+    def test_key(self):
+        text = _read("test/data/part10.pas")
+        key = ParseCache.make_key(text)
+        self.assertEqual(key, ParseCache.make_key(text))
+        self.assertNotEqual(key, ParseCache.make_key(text, optimize=True))
+        self.assertEqual(
+            ParseCache.make_file_key("test/data/part10.pas", chunk_size=7), key
+        )
+        self.assertNotEqual(key, ParseCache.make_key(text + " "))
+
+    def test_file_key_encoding(self):
+        text = "program Caf\u00e9; begin end."
+        path = os.path.join(self._path, "source.pas")
+        key = ParseCache.make_key(text)
+        with open(path, "w", encoding="latin-1") as source_file:
+            source_file.write(text)
+        self.assertEqual(
+            ParseCache.make_file_key(path, encoding="latin-1"), key
+        )
+
+        # UTF-8 by default, whatever the locale
+        with open(path, "w", encoding="utf-8") as source_file:
+            source_file.write(text)
+        self.assertEqual(ParseCache.make_file_key(path), key)
+
+    def test_corrupted_entry(self):
+        cache = ParseCache(self._path)
+        key = ParseCache.make_key("corrupted")
+        with open(os.path.join(self._path, key + ".ast"), "wb") as entry:
+            entry.write(b"not a tree")
+
+        self.assertIsNone(cache.load(key))
+        self.assertEqual(_entries(self._path), [])
+
+    def test_least_recently_used_eviction(self):
+        names = ("part10", "part12", "part16")
+        texts = [_read(f"test/data/{name}.pas") for name in names]
+        entries = [ParseCache.make_key(text) + ".ast" for text in texts]
+        cache = ParseCache(self._path)
+        for index, text in enumerate(texts):
+            build_cached_tree(text, cache=cache)
+            os.utime(os.path.join(self._path, entries[index]), (index, index))
+        size = sum(
+            os.path.getsize(os.path.join(self._path, entry))
+            for entry in entries
+        )
+
+        # Reading part10 makes part12 the least recently used entry
+        cache.load(ParseCache.make_key(texts[0]))
+        small_cache = ParseCache(self._path, max_size=size - 1)
+        small_cache.store("extra", None)
+
+        self.assertEqual(
+            _entries(self._path), sorted([entries[0], entries[2], "extra.ast"])
+        )
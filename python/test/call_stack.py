@@ -0,0 +1,62 @@
+from unittest import TestCase
+
+from spi.activation_record import ActivationRecord
+from spi.activation_record import ArType
+from spi.call_stack import CallStack
+from spi.errors import RuntimeInterpreterError
+
+
+def _make_ar(name, nesting_level):
+    ar_type = ArType.PROGRAM if nesting_level == 1 else ArType.PROCEDURE
+    return ActivationRecord(
+        name=name,
+        ar_type=ar_type,
+        nesting_level=nesting_level,
+        slot_names=("x",)
+    )
+
+
+class CallStackTc(TestCase):
+    def test_display(self):
+        stack = CallStack()
+        main = _make_ar("main", 1)
+        alpha = _make_ar("alpha", 2)
+        beta = _make_ar("beta", 3)
+        gamma = _make_ar("gamma", 2)
+        for ar in (main, alpha, beta):
+            stack.push(ar)
+
+        self.assertIs(beta.access_link, alpha)
+        self.assertIs(alpha.access_link, main)
+        self.assertIsNone(main.access_link)
+        self.assertIs(stack.get_frame(2), alpha)
+
+        # A global procedure called from a nested one hides alpha
+        stack.push(gamma)
+        self.assertIs(gamma.access_link, main)
+        self.assertIs(stack.get_frame(2), gamma)
+        self.assertIs(stack.get_frame(1), main)
+
+        stack.pop()
+        self.assertIs(stack.get_frame(2), alpha)
+        self.assertIs(stack.get_frame(3), beta)
+
+    def test_recursion(self):
+        stack = CallStack()
+        stack.push(_make_ar("main", 1))
+        records = [_make_ar("alpha", 2) for _ in range(50)]
+        for ar in records:
+            stack.push(ar)
+            stack.assign_variable(2, 0, len(stack))
+
+        for ar in reversed(records):
+            self.assertIs(stack.get_frame(2), ar)
+            self.assertEqual(stack.access_variable(2, 0), len(stack))
+            stack.pop()
+        self.assertEqual(len(stack), 1)
+
+    def test_unassigned_variable(self):
+        stack = CallStack()
+        stack.push(_make_ar("main", 1))
+        with self.assertRaises(RuntimeInterpreterError):
+            stack.access_variable(1, 0)
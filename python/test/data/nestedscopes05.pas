@@ -0,0 +1,22 @@
+program NestedScopes05;
+var total : integer;
+
+procedure Alpha(a : integer);
+var x : integer;
+
+   procedure Beta(b : integer);
+   begin { Beta }
+      total := total + x * b;
+   end;  { Beta }
+
+begin { Alpha }
+   x := a * 2;
+   Beta(a + 1);
+   Beta(3);
+end;  { Alpha }
+
+begin { Main }
+   total := 1;
+   Alpha(5);
+   Alpha(2);
+end.  { Main }
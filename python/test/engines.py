@@ -0,0 +1,204 @@
+from contextlib import redirect_stdout
+from io import StringIO
+from os import listdir
+from unittest import TestCase
+
+from spi.closure_compiler import ClosureInterpreter
+from spi.errors import Error
+from spi.interpreter import Interpreter
+from spi.lexer import Lexer
+from spi.parser import Parser
+from spi.python_codegen import PythonInterpreter
+from spi.stack_interpreter import StackInterpreter
+from spi.vm import disassemble
+from spi.vm import VirtualMachine
+
+
+def _data_files():
+    return sorted(
+        f"test/data/{name}" for name in listdir("test/data")
+        if name.endswith(".pas")
+    )
+
+
+def _run(engine_class, text):
+    """
+    Runs a program and returns everything observable about the run:
+    the final program frame, the stack log and the error type, if any.
+    """
+    output = StringIO()
+    engine = engine_class(
+        parser=Parser(lexer=Lexer(text=text)),
+        should_log_stack=True
+    )
+    with redirect_stdout(output):
+        try:
+            result = str(engine.execute())
+        except Error as error:
+            result = type(error).__name__
+    return result, output.getvalue(), len(engine._call_stack)
+
+
+def _frame(engine_class, text, optimize=False):
+    """
+    Runs a program and returns members of its final frame by name,
+    or the error type.
+    """
+    engine = engine_class(
+        parser=Parser(lexer=Lexer(text=text)),
+        optimize=optimize
+    )
+    try:
+        return {
+            name: str(value) for name, value in engine.execute().items()
+        }
+    except Error as error:
+        return type(error).__name__
+
+
+class EnginesTc(TestCase):
+    def _check_engine(self, engine_class):
+        for path in _data_files():
+            with open(path) as source_file:
+                text = source_file.read()
+            self.assertEqual(
+                _run(engine_class, text), _run(Interpreter, text), path
+            )
+
+    def test_closure_interpreter(self):
+        self._check_engine(ClosureInterpreter)
+
+    def test_virtual_machine(self):
+        self._check_engine(VirtualMachine)
+
+    def test_stack_interpreter(self):
+        self._check_engine(StackInterpreter)
+
+    def test_stack_interpreter_depth(self):
+        # Every procedure calls the one declared before it
+        declarations = ["procedure P0(a : integer); begin x := a end;"]
+        for i in range(1, 3000):
+            declarations.append(
+                f"procedure P{i}(a : integer); begin P{i - 1}(a + 1) end;"
+            )
+        calls = f"""
+            program Deep;
+            var x : integer;
+            {" ".join(declarations)}
+            begin
+               P2999(1)
+            end.
+        """
+        self.assertEqual(_frame(StackInterpreter, calls), {"x": "3000"})
+
+        expression = f"""
+            program Long;
+            var x : integer;
+            begin
+               x := 1;
+               x := {" + ".join(["x"] * 5000)} - (-(x * 2))
+            end.
+        """
+        self.assertEqual(_frame(StackInterpreter, expression), {"x": "5002"})
+
+    def test_signed_zero(self):
+        text = """
+            program T;
+            var x, y : real;
+            begin
+               x := 2;
+               x := -0.0;
+               y := x;
+               x := 0.0
+            end.
+        """
+        expected = {"x": "0.0", "y": "-0.0"}
+        engines = (
+            Interpreter,
+            ClosureInterpreter,
+            PythonInterpreter,
+            VirtualMachine,
+            StackInterpreter,
+        )
+        for engine_class in engines:
+            for optimize in (False, True):
+                self.assertEqual(
+                    _frame(engine_class, text, optimize=optimize),
+                    expected,
+                    (engine_class.__name__, optimize)
+                )
+
+    def test_long_flat_expression(self):
+        terms = " + ".join(["x"] * 300) + " - " + " * ".join(["2"] * 300)
+        text = f"""
+            program T;
+            var x, y : integer;
+            begin
+               x := 1;
+               y := {terms}
+            end.
+        """
+        expected = {"x": "1", "y": str(300 - 2 ** 300)}
+        engines = (
+            Interpreter,
+            ClosureInterpreter,
+            PythonInterpreter,
+            VirtualMachine,
+            StackInterpreter,
+        )
+        for engine_class in engines:
+            self.assertEqual(
+                _frame(engine_class, text), expected, engine_class.__name__
+            )
+
+    def test_disassemble(self):
+        with open("test/data/nestedscopes05.pas") as source_file:
+            text = source_file.read()
+        vm = VirtualMachine(parser=Parser(lexer=Lexer(text=text)))
+        vm.execute()
+
+        self.assertEqual(
+            [code.name for code in vm.codes],
+            ["nestedscopes05", "alpha", "beta"]
+        )
+        self.assertEqual(vm.codes[2].register_count, 3)
+        listing = disassemble(vm.codes).splitlines()
+        self.assertEqual(
+            listing[-8:],
+            [
+                "code 2: procedure beta, level 3, slots ['b'], 3 registers",
+                "     0  LOAD_OUTER  r0, level 1 slot 0",
+                "     1  LOAD_OUTER  r1, level 2 slot 1",
+                "     2  LOAD_SLOT   r2, b",
+                "     3  MUL         r1, r1, r2",
+                "     4  ADD         r0, r0, r1",
+                "     5  STORE_OUTER r0, level 1 slot 0",
+                "     6  RET",
+            ]
+        )
+
+    def test_python_interpreter(self):
+        for path in _data_files():
+            with open(path) as source_file:
+                text = source_file.read()
+            self.assertEqual(
+                _frame(PythonInterpreter, text), _frame(Interpreter, text), path
+            )
+
+    def test_optimized_tree(self):
+        engines = (
+            Interpreter,
+            ClosureInterpreter,
+            PythonInterpreter,
+            VirtualMachine,
+            StackInterpreter,
+        )
+        for engine_class in engines:
+            for path in _data_files():
+                with open(path) as source_file:
+                    text = source_file.read()
+                self.assertEqual(
+                    _frame(engine_class, text, optimize=True),
+                    _frame(Interpreter, text),
+                    path
+                )
@@ -0,0 +1,147 @@
+from unittest import TestCase
+
+from spi.ast import ProcedureDeclaration
+from spi.ast import Program
+from spi.ast import walk
+from spi.errors import ParserError
+from spi.errors import SemanticError
+from spi.front_end import check_tree
+from spi.incremental import IncrementalDocument
+from spi.interpreter import Interpreter
+from spi.lexer import Lexer
+from spi.lexer import Scanner
+from spi.parser import Parser
+
+
+PROGRAM = """\
+program Main;
+var x, y : integer;
+
+procedure Alpha(a : integer);
+var b : integer;
+
+   procedure Beta(c : integer);
+   begin
+      x := a + c
+   end;
+
+begin
+   b := a * 2;
+   Beta(b)
+end;
+
+procedure Gamma; begin y := x + 1 end; procedure Delta;
+begin
+   y := y * 10
+end;
+
+begin
+   Alpha(3);
+   Gamma();
+   Delta()
+end.
+"""
+
+
+def _run(tree):
+    return dict(Interpreter(parser=None).run(tree).items())
+
+
+def _nodes(tree):
+    result = []
+    for node in walk(tree):
+        token = getattr(node, "token", None) or getattr(node, "op", None)
+        result.append((type(node).__name__, str(token)))
+    return result
+
+
+class IncrementalTc(TestCase):
+    def _check(self, document):
+        """
+        Compares the document with the whole text parsed from scratch.
+        """
+        tree = check_tree(Parser(lexer=Lexer(document.text)).parse())
+        self.assertEqual(_nodes(document.tree), _nodes(tree))
+        self.assertEqual(_run(document.tree), _run(tree))
+
+    def _edit(self, document, old, new):
+        offset = document.text.index(old)
+        return document.edit(offset, len(old), new)
+
+    def test_edit_procedure_body(self):
+        for scanner in Scanner:
+            document = IncrementalDocument(PROGRAM, scanner=scanner)
+            self.assertEqual(_run(document.tree), {"x": 9, "y": 100})
+            alpha = document.tree.block.declarations[2]
+
+            node = self._edit(document, "y * 10", "y * 20 + x")
+            self.assertIsInstance(node, ProcedureDeclaration)
+            self.assertEqual(node.proc_name, "delta")
+            self.assertIs(document.tree.block.declarations[2], alpha)
+            self.assertEqual(_run(document.tree), {"x": 9, "y": 209})
+            self._check(document)
+
+    def test_edit_nested_procedure(self):
+        document = IncrementalDocument(PROGRAM)
+        node = self._edit(document, "x := a + c", "x := a - c + b")
+        self.assertEqual(node.proc_name, "beta")
+
+        # Edits of the new declarations are incremental too
+        node = self._edit(document, "a - c", "a - c - 1")
+        self.assertEqual(node.proc_name, "beta")
+        node = self._edit(document, "b := a * 2", "b := a * 3")
+        self.assertEqual(node.proc_name, "alpha")
+        self._check(document)
+
+    def test_following_positions(self):
+        document = IncrementalDocument(PROGRAM)
+        self._edit(document, "x := a + c", "x := a\n         + c\n")
+        self._check(document)
+        self._edit(document, "y := x + 1", "y := x + 1 + 1")
+        self._check(document)
+        self._edit(document, "+ 1 + 1 end; ", "+ 2 end;\n\n")
+        self._check(document)
+
+    def test_following_tokens_kept(self):
+        document = IncrementalDocument(PROGRAM)
+        call = document.tree.block.compound_statement.children[2]
+        token = call.token
+        line, column = token.get_line_number(), token.get_column()
+
+        self._edit(document, "b := a * 2;", "b := a\n * 2;\n")
+        self._check(document)
+        self.assertIs(document.tree.block.compound_statement.children[2], call)
+        self.assertIs(call.token, token)
+        self.assertEqual(token.get_line_number(), line + 2)
+        self.assertEqual(token.get_column(), column)
+
+    def test_signature_change(self):
+        document = IncrementalDocument(PROGRAM)
+        node = self._edit(document, "a : integer", "a : real")
+        self.assertEqual(node.proc_name, "alpha")
+        self._check(document)
+
+        text = document.text
+        with self.assertRaises(SemanticError):
+            self._edit(document, "Gamma;", "Gamma(g : integer);")
+        self.assertEqual(document.text, text)
+        self._check(document)
+
+    def test_errors_keep_document(self):
+        document = IncrementalDocument(PROGRAM)
+        text = document.text
+        with self.assertRaises(SemanticError):
+            self._edit(document, "y * 10", "z * 10")
+        with self.assertRaises(ParserError):
+            self._edit(document, "y * 10\nend;", "y * 10\n")
+        with self.assertRaises(ParserError):
+            self._edit(document, "x := a + c\n   end;", "x := a + c\n   endx;")
+        self.assertEqual(document.text, text)
+        self._check(document)
+
+    def test_edit_outside_procedures(self):
+        document = IncrementalDocument(PROGRAM)
+        node = self._edit(document, "Delta()\nend.", "Delta();\n   x := y\nend.")
+        self.assertIsInstance(node, Program)
+        self.assertEqual(_run(document.tree), {"x": 100, "y": 100})
+        self._check(document)
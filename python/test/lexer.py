@@ -1,17 +1,28 @@
 
+import mmap
+import os
+from io import StringIO
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 
+from spi.errors import LexerError
+from spi.interner import Interner
 from spi.lexer import Lexer
+from spi.lexer import Scanner
+from spi.ast import ProcedureCall
+from spi.parser import Parser
+from spi.parser import TokenIterator
+from spi.semantic_analyzer import SemanticAnalyzer
+from spi.token import LineIndex
 from spi.token import TokenType
-
-
-def _make_lexer(text):
-    return Lexer(text)
+from spi.token_table import TokenTable
 
 
 class LexerTc(TestCase):
+    scanner = Scanner.CHAR
+
     def test_integer_literal(self):
-        lexer = _make_lexer("42")
+        lexer = self._make_lexer("42")
         token = lexer.get_next_token()
         self._check_token(
             token=token,
@@ -20,7 +31,7 @@ class LexerTc(TestCase):
         )
 
     def test_real_literal(self):
-        lexer = _make_lexer("42.42")
+        lexer = self._make_lexer("42.42")
         token = lexer.get_next_token()
         self._check_token(
             token=token,
@@ -29,133 +40,133 @@ class LexerTc(TestCase):
         )
 
     def test_lexer_div(self):
-        lexer = _make_lexer("/")
+        lexer = self._make_lexer("/")
         token = lexer.get_next_token()
         self._check_token(
             token=token, expected_type=TokenType.REAL_DIV, expected_value="/"
         )
 
     def test_lexer_minus(self):
-        lexer = _make_lexer("-")
+        lexer = self._make_lexer("-")
         token = lexer.get_next_token()
         self._check_token(
             token=token, expected_type=TokenType.MINUS, expected_value="-"
         )
 
     def test_lexer_mul(self):
-        lexer = _make_lexer("*")
+        lexer = self._make_lexer("*")
         token = lexer.get_next_token()
         self._check_token(
             token=token, expected_type=TokenType.MULTIPLY, expected_value="*"
         )
 
     def test_lexer_plus(self):
-        lexer = _make_lexer("+")
+        lexer = self._make_lexer("+")
         token = lexer.get_next_token()
         self._check_token(
             token=token, expected_type=TokenType.PLUS, expected_value="+"
         )
 
     def test_lexer_lpar(self):
-        lexer = _make_lexer("(")
+        lexer = self._make_lexer("(")
         token = lexer.get_next_token()
         self._check_token(
             token=token, expected_type=TokenType.LPAR, expected_value="("
         )
 
     def test_lexer_rpar(self):
-        lexer = _make_lexer(")")
+        lexer = self._make_lexer(")")
         token = lexer.get_next_token()
         self._check_token(
             token=token, expected_type=TokenType.RPAR, expected_value=")"
         )
 
     def test_lexer_begin(self):
-        lexer = _make_lexer("BEGIN")
+        lexer = self._make_lexer("BEGIN")
         token = lexer.get_next_token()
         self._check_token(
             token=token, expected_type=TokenType.BEGIN, expected_value="begin"
         )
 
     def test_lexer_begin_case_insensitive(self):
-        lexer = _make_lexer("BeGiN")
+        lexer = self._make_lexer("BeGiN")
         token = lexer.get_next_token()
         self._check_token(
             token=token, expected_type=TokenType.BEGIN, expected_value="begin"
         )
 
     def test_lexer_end(self):
-        lexer = _make_lexer("END")
+        lexer = self._make_lexer("END")
         token = lexer.get_next_token()
         self._check_token(
             token=token, expected_type=TokenType.END, expected_value="end"
         )
 
     def test_lexer_end_case_insensitive(self):
-        lexer = _make_lexer("End")
+        lexer = self._make_lexer("End")
         token = lexer.get_next_token()
         self._check_token(
             token=token, expected_type=TokenType.END, expected_value="end"
         )
 
     def test_lexer_dot(self):
-        lexer = _make_lexer(".")
+        lexer = self._make_lexer(".")
         token = lexer.get_next_token()
         self._check_token(
             token=token, expected_type=TokenType.DOT, expected_value="."
         )
 
     def test_lexer_assign(self):
-        lexer = _make_lexer(":=")
+        lexer = self._make_lexer(":=")
         token = lexer.get_next_token()
         self._check_token(
             token=token, expected_type=TokenType.ASSIGN, expected_value=":="
         )
 
     def test_lexer_semi(self):
-        lexer = _make_lexer(";")
+        lexer = self._make_lexer(";")
         token = lexer.get_next_token()
         self._check_token(
             token=token, expected_type=TokenType.SEMI, expected_value=";"
         )
 
     def test_comma_token(self):
-        lexer = _make_lexer(",")
+        lexer = self._make_lexer(",")
         token = lexer.get_next_token()
         self._check_token(
             token=token, expected_type=TokenType.COMMA, expected_value=","
         )
 
     def test_colon_token(self):
-        lexer = _make_lexer(":")
+        lexer = self._make_lexer(":")
         token = lexer.get_next_token()
         self._check_token(
             token=token, expected_type=TokenType.COLON, expected_value=":"
         )
 
     def test_lexer_variable1(self):
-        lexer = _make_lexer("x")
+        lexer = self._make_lexer("x")
         token = lexer.get_next_token()
         self._check_token(
             token=token, expected_type=TokenType.ID, expected_value="x"
         )
 
     def test_lexer_variable2(self):
-        lexer = _make_lexer("vario")
+        lexer = self._make_lexer("vario")
         token = lexer.get_next_token()
         self._check_token(
             token=token, expected_type=TokenType.ID, expected_value="vario"
         )
 
     def test_lexer_variable2_case_insensitivity(self):
-        lexer = _make_lexer("vArIO")
+        lexer = self._make_lexer("vArIO")
         token = lexer.get_next_token()
         self._check_token(
             token=token, expected_type=TokenType.ID, expected_value="vario"
         )
 
     def test_variable_starts_with_underscore(self):
-        lexer = _make_lexer("_vario")
+        lexer = self._make_lexer("_vario")
         self._check_token(
             token=lexer.get_next_token(),
             expected_type=TokenType.ID,
@@ -163,7 +174,7 @@ class LexerTc(TestCase):
         )
 
     def test_variable_ends_with_underscore(self):
-        lexer = _make_lexer("vario_")
+        lexer = self._make_lexer("vario_")
         self._check_token(
             token=lexer.get_next_token(),
             expected_type=TokenType.ID,
@@ -347,6 +358,26 @@ class LexerTc(TestCase):
                 text=pas_file.read(), expected_data=expected_data
             )
 
+    def test_lexer_error(self):
+        lexer = self._make_lexer("a := 1;\n  @")
+        for _ in range(4):
+            lexer.get_next_token()
+        with self.assertRaises(LexerError) as context:
+            lexer.get_next_token()
+        self.assertEqual(
+            context.exception.message,
+            "LexerError: Lexer error on '@' line: 2, column: 3"
+        )
+
+    def test_unterminated_comment(self):
+        self._test_lexer(
+            "x {no end",
+            ((TokenType.ID, "x"), (TokenType.EOF, None))
+        )
+
+    def _make_lexer(self, text):
+        return Lexer(text, scanner=self.scanner)
+
     def _check_token(
             self,
             token,
@@ -379,7 +410,7 @@ class LexerTc(TestCase):
             )
 
     def _test_lexer(self, text, types_and_values):
-        lexer = _make_lexer(text)
+        lexer = self._make_lexer(text)
         for t, v in types_and_values:
             self._check_token(
                 token=lexer.get_next_token(),
@@ -388,7 +419,7 @@ class LexerTc(TestCase):
             )
 
     def _test_extended_lexer(self, text, expected_data):
-        lexer = _make_lexer(text)
+        lexer = self._make_lexer(text)
         for exp_type, exp_value, exp_line, exp_column in expected_data:
             self._check_token(
                 token=lexer.get_next_token(),
@@ -397,3 +428,226 @@ class LexerTc(TestCase):
                 expected_column=exp_column,
                 expected_line=exp_line
             )
+
+
+class RegexLexerTc(LexerTc):
+    scanner = Scanner.REGEX
+
+    def test_same_tokens_as_char_scanner(self):
+        for name in ("part10", "part12", "part16", "part19a", "part19b"):
+            with open(f"test/data/{name}.pas") as pas_file:
+                text = pas_file.read()
+            char_lexer = Lexer(text, scanner=Scanner.CHAR)
+            regex_lexer = self._make_lexer(text)
+            while True:
+                expected = char_lexer.get_next_token()
+                token = regex_lexer.get_next_token()
+                self.assertEqual(str(token), str(expected), name)
+                if expected.get_type() == TokenType.EOF:
+                    break
+
+
+class StreamLexerTc(LexerTc):
+    """
+    Runs all the lexer tests over a stream read one character at a time,
+    so every token and comment crosses chunk boundaries.
+    """
+
+    def _make_lexer(self, text):
+        return Lexer.from_stream(
+            StringIO(text), scanner=self.scanner, chunk_size=1
+        )
+
+
+class RegexStreamLexerTc(RegexLexerTc):
+    def _make_lexer(self, text):
+        return Lexer.from_stream(
+            StringIO(text), scanner=self.scanner, chunk_size=1
+        )
+
+
+def _table_tokens(table):
+    return [str(table.token(index)) for index in range(len(table))]
+
+
+class StreamSourcesTc(TestCase):
+    def setUp(self):
+        with open("test/data/part19a.pas") as pas_file:
+            self._text = pas_file.read()
+
+    def test_path(self):
+        for scanner in Scanner:
+            expected = _table_tokens(Lexer(self._text, scanner).tokenize_all())
+            lexer = Lexer.from_path(
+                "test/data/part19a.pas", scanner=scanner, chunk_size=5
+            )
+            self.assertEqual(_table_tokens(lexer.tokenize_all()), expected)
+            self.assertIsNone(lexer._file)
+
+    def test_mmap(self):
+        text = "program Caf\u00e9; { \u00fcber\n\u00e9t\u00e9 } begin end."
+        expected = _table_tokens(Lexer(text).tokenize_all())
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "source.pas")
+            with open(path, "w", encoding="utf-8") as source_file:
+                source_file.write(text)
+            with open(path, "rb") as source_file:
+                with mmap.mmap(
+                        source_file.fileno(), 0, access=mmap.ACCESS_READ
+                ) as buffer:
+                    for scanner in Scanner:
+                        # Two byte characters are split between chunks
+                        lexer = Lexer.from_mmap(
+                            buffer, scanner=scanner, chunk_size=3
+                        )
+                        self.assertEqual(
+                            _table_tokens(lexer.tokenize_all()), expected
+                        )
+
+    def test_bounded_buffer(self):
+        text = self._text * 50
+        lexer = Lexer.from_stream(StringIO(text), chunk_size=256)
+        longest = 0
+        while lexer.get_next_token().get_type() != TokenType.EOF:
+            longest = max(longest, len(lexer._text))
+        self.assertLess(longest, 2 * 256)
+
+    def test_bounded_comments(self):
+        text = "x {" + " comment" * 20000 + "}" + " " * 100000 + "{" * 5000
+        text += "} y {" + "no end " * 20000
+        for scanner in Scanner:
+            lexer = Lexer.from_stream(
+                StringIO(text), scanner=scanner, chunk_size=256
+            )
+            tokens = []
+            longest = 0
+            while True:
+                token = lexer.get_next_token()
+                tokens.append((token.get_type(), token.get_value()))
+                longest = max(longest, len(lexer._text))
+                if token.get_type() == TokenType.EOF:
+                    break
+            self.assertEqual(
+                tokens,
+                [(TokenType.ID, "x"), (TokenType.ID, "y"), (TokenType.EOF, None)]
+            )
+            self.assertLess(longest, 2 * 256)
+
+    def test_parse_stream(self):
+        lexer = Lexer.from_stream(StringIO(self._text), chunk_size=2)
+        tree = Parser(lexer=lexer).parse()
+        SemanticAnalyzer().analyze(tree)
+        self.assertEqual(tree.name, "part19a")
+
+
+class TokenTableTc(TestCase):
+    def test_table_matches_token_stream(self):
+        for scanner in Scanner:
+            with open("test/data/part19a.pas") as pas_file:
+                text = pas_file.read()
+            table = Lexer(text, scanner=scanner).tokenize_all()
+            lexer = Lexer(text)
+            for index in range(len(table)):
+                self.assertEqual(
+                    str(table.token(index)), str(lexer.get_next_token())
+                )
+            self.assertEqual(table.get_type(len(table) - 1), TokenType.EOF)
+
+    def test_bytes_keep_positions(self):
+        with open("test/data/part19a.pas") as pas_file:
+            table = Lexer(pas_file.read()).tokenize_all()
+        copy, _ = TokenTable.from_bytes(table.to_bytes())
+        self.assertEqual(_table_tokens(copy), _table_tokens(table))
+
+    def test_values_are_shared(self):
+        table = Lexer("alpha := alpha + 1 + 1").tokenize_all()
+        self.assertIs(table.get_value(0), table.get_value(2))
+        self.assertIs(table.get_value(4), table.get_value(6))
+
+    def test_parse_from_table(self):
+        with open("test/data/part19b.pas") as pas_file:
+            table = Lexer(pas_file.read()).tokenize_all()
+        for _ in range(2):
+            tree = Parser(lexer=table.reader()).parse()
+            self.assertEqual(tree.name, "part19b")
+            SemanticAnalyzer().analyze(tree)
+
+    def test_call_with_space_before_parenthesis(self):
+        text = """
+            program Main;
+            procedure Alpha(a : integer);
+            begin
+            end;
+            begin
+               Alpha (1);
+               Alpha
+                  (2)
+            end.
+        """
+        table = Lexer(text).tokenize_all()
+        sources = (
+            Lexer(text),
+            table.reader(),
+            TokenIterator(table.token(i) for i in range(len(table))),
+        )
+        for source in sources:
+            tree = Parser(lexer=source).parse()
+            SemanticAnalyzer().analyze(tree)
+            calls = tree.block.compound_statement.children
+            self.assertEqual(len(calls), 2)
+            for call in calls:
+                self.assertIsInstance(call, ProcedureCall)
+
+
+class LineIndexTc(TestCase):
+    def test_position(self):
+        lines = LineIndex("ab\n\ncd\n")
+        self.assertEqual(list(lines.starts), [0, 3, 4, 7])
+        self.assertEqual(lines.position(0), (1, 1))
+        self.assertEqual(lines.position(2), (1, 3))
+        self.assertEqual(lines.position(3), (2, 1))
+        self.assertEqual(lines.position(5), (3, 2))
+        self.assertEqual(lines.position(7), (4, 1))
+
+    def test_extend(self):
+        lines = LineIndex("a\nb")
+        lines.extend("c\nd\n", 3)
+        expected = LineIndex("a\nbc\nd\n")
+        self.assertEqual(list(lines.starts), list(expected.starts))
+
+    def test_replace(self):
+        text = "begin\n  x := 1;\n  y := 2\nend."
+        edits = ((8, 1, "xx\n"), (6, 10, ""), (0, 0, "\n\n"), (27, 4, "."))
+        for offset, deleted, inserted in edits:
+            lines = LineIndex(text)
+            lines.replace(offset, deleted, inserted)
+            edited = text[:offset] + inserted + text[offset + deleted:]
+            expected = LineIndex(edited)
+            self.assertEqual(list(lines.starts), list(expected.starts))
+
+
+class InternerTc(TestCase):
+    def test_words(self):
+        interner = Interner()
+        self.assertEqual(interner.word("Begin"), (TokenType.BEGIN, "begin"))
+        self.assertEqual(interner.word("Alpha"), (TokenType.ID, "alpha"))
+        self.assertEqual(interner.word("ALPHA"), (TokenType.ID, "alpha"))
+        self.assertIs(interner.word("Alpha"), interner.word("Alpha"))
+        self.assertIs(interner.word("alpha")[1], interner.word("ALPHA")[1])
+        self.assertEqual(len(interner), 4)
+
+    def test_shared_names(self):
+        interner = Interner()
+        for scanner in Scanner:
+            tokens = []
+            for text in ("alpha := ALPHA", "begin Alpha end"):
+                lexer = Lexer(text, scanner=scanner, interner=interner)
+                tokens.extend(lexer.get_next_token() for _ in range(3))
+            names = [
+                token.get_value() for token in tokens
+                if token.get_type() == TokenType.ID
+            ]
+            self.assertEqual(names, ["alpha"] * 3)
+            for name in names:
+                self.assertIs(name, names[0])
+
@@ -0,0 +1,57 @@
+from unittest import TestCase
+
+from spi.ast import Number
+from spi.ast import NoOp
+from spi.ast import Var
+from spi.ast import walk
+from spi.ast import walk_postorder
+from spi.lexer import Lexer
+from spi.node_visitor import NodeVisitor
+from spi.parser import Parser
+
+
+class _Visitor(NodeVisitor):
+    def _visit_Number(self, node):
+        return "number"
+
+    def _visit_NoOp(self, node):
+        return "no op"
+
+
+class _SubVisitor(_Visitor):
+    def _visit_Number(self, node):
+        return "sub number"
+
+
+class NodeVisitorTc(TestCase):
+    def test_dispatch_tables(self):
+        number = Number(None)
+        self.assertEqual(_Visitor()._visit(number), "number")
+        self.assertEqual(_SubVisitor()._visit(number), "sub number")
+        self.assertEqual(_SubVisitor()._visit(NoOp()), "no op")
+        self.assertEqual(_Visitor()._visit(number), "number")
+
+        self.assertIsNot(_Visitor._dispatch, _SubVisitor._dispatch)
+        self.assertEqual(set(_Visitor._dispatch), {Number})
+        self.assertEqual(set(_SubVisitor._dispatch), {Number, NoOp})
+
+    def test_generic_visit(self):
+        with self.assertRaises(Exception):
+            _Visitor()._visit(Var(None))
+
+    def test_walk_postorder(self):
+        tree = Parser(
+            lexer=Lexer("program p; var x : integer; begin x := -1 end.")
+        ).parse()
+        names = [type(node).__name__ for node in walk_postorder(tree)]
+        self.assertEqual(
+            names,
+            [
+                "Var", "Type", "VarDeclaration",
+                "Var", "Number", "UnaryOperation", "Assign", "Compound",
+                "Block", "Program",
+            ]
+        )
+        self.assertEqual(
+            sorted(map(id, walk_postorder(tree))), sorted(map(id, walk(tree)))
+        )
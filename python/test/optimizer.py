@@ -0,0 +1,93 @@
+from unittest import TestCase
+
+from spi.ast import BinaryOperation
+from spi.ast import Number
+from spi.ast import Var
+from spi.front_end import build_tree
+from spi.interpreter import Interpreter
+from spi.lexer import Lexer
+from spi.parser import Parser
+
+
+def _fold(text):
+    return build_tree(Parser(lexer=Lexer(text=text)), optimize=True)
+
+
+def _fold_expression(expression, declarations="var x : integer; y : real;"):
+    tree = _fold(f"program p; {declarations} begin x := {expression} end.")
+    return tree.block.compound_statement.children[0].right
+
+
+class ConstantFolderTc(TestCase):
+    def test_fold_numbers(self):
+        node = _fold_expression("2 + 3 * (4 - 1)")
+        self.assertIsInstance(node, Number)
+        self.assertEqual(node.value, 11)
+
+    def test_keep_division_semantics(self):
+        self.assertEqual(_fold_expression("7 div 2").value, 3)
+        self.assertEqual(_fold_expression("-7 div 2").value, -7 // 2)
+        self.assertEqual(_fold_expression("7 / 2").value, 3.5)
+        self.assertIs(type(_fold_expression("4 / 2").value), float)
+        self.assertIs(type(_fold_expression("4 div 2").value), int)
+
+    def test_keep_division_by_zero(self):
+        node = _fold_expression("1 div (2 - 2)")
+        self.assertIsInstance(node, BinaryOperation)
+        self.assertEqual(node.right.value, 0)
+
+    def test_identities(self):
+        expressions = (
+            "x - 0", "x * 1", "1 * x", "+x", "- -x",
+            "(x * (3 - 2)) - (1 - 1)",
+        )
+        for expression in expressions:
+            node = _fold_expression(expression)
+            self.assertIsInstance(node, Var, expression)
+            self.assertEqual((node.scope_level, node.slot), (1, 0))
+
+    def test_keep_real_identities(self):
+        node = _fold_expression("x * 1.0")
+        self.assertIsInstance(node, BinaryOperation)
+
+    def test_keep_adding_zero(self):
+        for expression in ("x + 0", "0 + x"):
+            node = _fold_expression(expression)
+            self.assertIsInstance(node, BinaryOperation, expression)
+
+        # -0.0 + 0 is 0.0
+        text = """
+            program p;
+            var w : real;
+            begin
+               w := -0.0;
+               w := (--w + 0)
+            end.
+        """
+        for optimize in (False, True):
+            tree = build_tree(
+                Parser(lexer=Lexer(text=text)), optimize=optimize
+            )
+            w = Interpreter(parser=None).run(tree)["w"]
+            self.assertEqual(str(w), "0.0", optimize)
+
+    def test_collapse_compounds(self):
+        tree = _fold(
+            "program p; var x : integer; "
+            "begin begin x := 1; begin end; begin x := 2 end end; ; x := 3 end."
+        )
+        children = tree.block.compound_statement.children
+        self.assertEqual([child.right.value for child in children], [1, 2, 3])
+
+    def test_procedure_calls(self):
+        with open("test/data/part16.pas") as source_file:
+            tree = _fold(source_file.read())
+        alpha, beta = tree.block.declarations
+        alpha_call, beta_call = tree.block.compound_statement.children
+        self.assertEqual(
+            [param.value for param in alpha_call.actual_params], [8, 7]
+        )
+        self.assertIs(alpha_call.proc_symbol.block_ast, alpha.block_node)
+        self.assertIs(beta_call.proc_symbol.block_ast, beta.block_node)
+        beta_assign = beta.block_node.compound_statement.children[0]
+        self.assertEqual(beta_assign.right.value, 9.1 + 4.3)
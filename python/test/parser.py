@@ -0,0 +1,103 @@
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import TestCase
+
+from spi.ast import BinaryOperation
+from spi.ast import Number
+from spi.ast import UnaryOperation
+from spi.errors import ParserError
+from spi.lexer import Lexer
+from spi.parser import BINARY_OPERATORS
+from spi.parser import Parser
+from spi.token import TokenType
+
+
+def _program(expression, params="a : integer"):
+    return f"""
+        program Main;
+        var x : real;
+        procedure Alpha({params});
+        begin
+        end;
+        begin
+           x := {expression}
+        end.
+    """
+
+
+def _expression(text, parser_class=Parser):
+    tree = parser_class(lexer=Lexer(text=_program(text))).parse()
+    return _render(tree.block.compound_statement.children[0].right)
+
+
+def _render(root):
+    """
+    Returns the expression fully parenthesized, without recursion.
+    """
+    rendered = []
+    work = [root]
+    while work:
+        node = work.pop()
+        if isinstance(node, str):
+            rendered.append(node)
+        elif isinstance(node, BinaryOperation):
+            op = node.op.get_value()
+            work.extend((")", node.right, f" {op} ", node.left, "("))
+        elif isinstance(node, UnaryOperation):
+            work.extend((")", node.right, f"({node.op.get_value()}"))
+        elif isinstance(node, Number):
+            rendered.append(str(node.token.get_value()))
+        else:
+            rendered.append(node.value)
+    return "".join(rendered)
+
+
+class _SameLevelParser(Parser):
+    binary_operators = {**BINARY_OPERATORS, TokenType.MULTIPLY: 10}
+
+
+class ParserTc(TestCase):
+    def test_precedence(self):
+        cases = (
+            ("1 + 2 * 3", "(1 + (2 * 3))"),
+            ("1 * 2 + 3", "((1 * 2) + 3)"),
+            ("1 - 2 - 3", "((1 - 2) - 3)"),
+            ("x / 2 div 3 * 4", "(((x / 2) div 3) * 4)"),
+            ("(1 + 2) * 3", "((1 + 2) * 3)"),
+            ("((x))", "x"),
+            ("-x * 2", "((-x) * 2)"),
+            ("2 * - + x", "(2 * (-(+x)))"),
+            ("1 - -(x - 1) * 2", "(1 - ((-(x - 1)) * 2))"),
+        )
+        for text, expected in cases:
+            self.assertEqual(_expression(text), expected, text)
+
+    def test_binding_powers(self):
+        self.assertEqual(
+            _expression("1 + 2 * 3", _SameLevelParser), "((1 + 2) * 3)"
+        )
+        self.assertEqual(_expression("1 + 2 * 3"), "(1 + (2 * 3))")
+
+    def test_deep_expressions(self):
+        depth = 5000
+        nested = "(" * depth + "x" + " + 1)" * depth
+        self.assertEqual(
+            _expression(nested), "(" * depth + "x" + " + 1)" * depth
+        )
+
+        long = " - ".join(["x"] * depth)
+        self.assertEqual(
+            _expression(long), "(" * (depth - 1) + "x" + " - x)" * (depth - 1)
+        )
+        self.assertEqual(_expression("-" * depth + "x").count("-"), depth)
+
+    def test_parameters(self):
+        params = "; ".join(f"a{i} : integer" for i in range(3000))
+        tree = Parser(lexer=Lexer(text=_program("1", params))).parse()
+        self.assertEqual(len(tree.block.declarations[1].params), 3000)
+
+    def test_errors(self):
+        for text in ("(1 + 2", "1 + 2)", "1 +", "* 2", "()"):
+            with self.assertRaises(ParserError, msg=text):
+                with redirect_stdout(StringIO()):
+                    _expression(text)
@@ -0,0 +1,80 @@
+import signal
+import unittest
+from unittest import TestCase
+
+from bench.generator import generate_program
+from spi.front_end import build_tree
+from spi.lexer import Lexer
+from spi.parser import Parser
+from spi.profiler import ProfileMode
+from spi.profiler import ProfilingInterpreter
+
+
+def _build(text):
+    return build_tree(Parser(lexer=Lexer(text)))
+
+
+def _read(path):
+    with open(path) as source_file:
+        return source_file.read()
+
+
+class ProfilerTc(TestCase):
+    def test_count(self):
+        interpreter = ProfilingInterpreter(parser=None)
+        ar = interpreter.run(_build(_read("test/data/nestedscopes05.pas")))
+        self.assertEqual(ar["total"], 115)
+
+        profile = interpreter.profile
+        self.assertEqual(profile.total(), 50)
+        self.assertEqual(
+            profile.flat(),
+            [
+                ("beta", 24, 24),
+                ("alpha", 20, 44),
+                ("nestedscopes05", 6, 50),
+            ]
+        )
+        self.assertEqual(profile.lines()[0], ("beta", 9, 24))
+
+        tree = profile.call_tree()
+        alpha = tree.children["nestedscopes05"].children["alpha"]
+        self.assertEqual((alpha.total_count, alpha.self_count), (44, 20))
+        self.assertEqual(list(alpha.children), ["beta"])
+
+    def test_collapsed(self):
+        interpreter = ProfilingInterpreter(parser=None)
+        interpreter.run(_build(_read("test/data/nestedscopes05.pas")))
+        profile = interpreter.profile
+
+        collapsed = profile.format_collapsed().splitlines()
+        self.assertEqual(
+            collapsed,
+            [
+                "nestedscopes05 6",
+                "nestedscopes05;alpha 20",
+                "nestedscopes05;alpha;beta 24",
+            ]
+        )
+        self.assertIn(
+            "nestedscopes05;alpha;beta;line 9 24",
+            profile.format_collapsed(with_lines=True).splitlines()
+        )
+
+    @unittest.skipUnless(hasattr(signal, "setitimer"), "needs SIGPROF")
+    def test_sample(self):
+        text = generate_program(
+            declarations=10, nesting=3, expression_length=8, calls=300
+        )
+        interpreter = ProfilingInterpreter(
+            parser=None, mode=ProfileMode.SAMPLE, interval=0.0005
+        )
+        interpreter.run(_build(text))
+
+        self.assertEqual(
+            signal.getsignal(signal.SIGPROF), signal.SIG_DFL
+        )
+        profile = interpreter.profile
+        self.assertGreater(profile.total(), 0)
+        for stack, _ in profile.samples:
+            self.assertEqual(stack[0], "bench")
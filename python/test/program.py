@@ -36,3 +36,10 @@ class ProgramTc(TestCase):
             spi = _make_interpreter(text=source_file.read())
             spi.execute()
             self.assertTrue(True)
+
+    def test_nested_scopes05(self):
+        with open("test/data/nestedscopes05.pas") as source_file:
+            spi = _make_interpreter(text=source_file.read())
+            ar = spi.execute()
+            self.assertEqual(ar["total"], 115)
+            self.assertEqual(len(spi._call_stack), 0)
@@ -149,6 +149,25 @@ class SemanticAnalyzerTc(TestCase):
             sa.analyze(_make_parse_tree(text=source_file.read()))
             self.assertTrue(True)
 
+    def test_variable_slots(self):
+        with open("test/data/part19b.pas") as source_file:
+            tree = _make_parse_tree(text=source_file.read())
+            SemanticAnalyzer().analyze(tree)
+
+            alpha = tree.block.declarations[0]
+            beta = alpha.block_node.declarations[1]
+            self.assertEqual(alpha.block_node.slot_names, ("a", "b", "x"))
+            self.assertEqual(beta.block_node.slot_names, ("a", "b", "x"))
+
+            assign = beta.block_node.compound_statement.children[0]
+            self.assertEqual((assign.left.scope_level, assign.left.slot), (3, 2))
+            a_times_10 = assign.right.left
+            self.assertEqual((a_times_10.left.scope_level, a_times_10.left.slot), (3, 0))
+
+            call = alpha.block_node.compound_statement.children[1]
+            self.assertEqual(call.proc_symbol.scope_level, 3)
+            self.assertIs(call.proc_symbol.block_ast, beta.block_node)
+
     def test_argument_mismatch(self):
         with open("test/data/part16ArgumentMismatch1.pas") as source_file:
             sa = SemanticAnalyzer()
@@ -0,0 +1,123 @@
+import json
+import os
+import socket
+import threading
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from spi.cache import MemoryCache
+from spi.cache import ParseCache
+from spi.closure_compiler import ClosureInterpreter
+from spi.interpreter import Interpreter
+from spi.server import Server
+from spi.vm import VirtualMachine
+
+
+ENGINES = {
+    "tree": Interpreter,
+    "closure": ClosureInterpreter,
+    "vm": VirtualMachine,
+}
+
+
+def _source(value):
+    return f"""
+        program Main;
+        var x : integer;
+        procedure Twice(a : integer);
+        begin
+           x := a * 2
+        end;
+        begin
+           Twice({value})
+        end.
+    """
+
+
+class ServerTc(TestCase):
+    def test_handle(self):
+        with Server(ENGINES) as server:
+            server.warm_up()
+            response = server.handle(
+                {"id": "a", "path": "test/data/nestedscopes05.pas"}
+            )
+            self.assertEqual(response["id"], "a")
+            self.assertEqual(response["globals"], {"total": 115})
+            self.assertIn("lex", response["timings"])
+
+            # The tree is cached in memory by the first request
+            response = server.handle(
+                {"path": "test/data/nestedscopes05.pas", "engine": "vm"}
+            )
+            self.assertEqual(response["globals"], {"total": 115})
+            self.assertNotIn("lex", response["timings"])
+
+            response = server.handle({"source": _source(4), "optimize": True})
+            self.assertEqual(response["globals"], {"x": 8})
+
+    def test_bad_requests(self):
+        with Server(ENGINES) as server:
+            lines = ("{", "[1]", '{"id": 1}', '{"source": "", "engine": "no"}')
+            for line in lines:
+                response = server.handle_line(line)
+                self.assertEqual(response["status"], "error")
+                self.assertEqual(response["error"]["type"], "RequestError")
+
+            response = server.handle({"id": 2, "source": "program p; begin"})
+            self.assertEqual(response["id"], 2)
+            self.assertEqual(response["error"]["type"], "ParserError")
+
+    def test_serve_concurrently(self):
+        lines = [
+            json.dumps(
+                {"id": i, "source": _source(i), "engine": list(ENGINES)[i % 3]}
+            )
+            for i in range(60)
+        ]
+        output = StringIO()
+        with Server(ENGINES, workers=4) as server:
+            server.serve(StringIO("\n".join(lines) + "\n\n"), output)
+
+        responses = [
+            json.loads(line) for line in output.getvalue().splitlines()
+        ]
+        self.assertEqual(len(responses), 60)
+        for response in responses:
+            self.assertEqual(response["globals"], {"x": response["id"] * 2})
+
+    def test_memory_cache(self):
+        with TemporaryDirectory() as directory:
+            backing = ParseCache(directory)
+            cache = MemoryCache(max_entries=2, backing=backing)
+            for key in ("a", "b", "c"):
+                cache.store(key, [key])
+            self.assertEqual(len(cache), 2)
+
+            # Dropped trees are still in the backing cache
+            self.assertEqual(cache.load("a"), ["a"])
+            self.assertEqual(MemoryCache().load("a"), None)
+
+    def test_unix_socket(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "jjpi.sock")
+            with Server(ENGINES) as server:
+                unix_server = server.unix_server(path)
+                thread = threading.Thread(target=unix_server.serve_forever)
+                thread.start()
+                try:
+                    with socket.socket(socket.AF_UNIX) as client:
+                        client.connect(path)
+                        stream = client.makefile("rw", encoding="utf-8")
+                        request = {"id": 7, "source": _source(5)}
+                        stream.write(json.dumps(request) + "\n")
+                        stream.flush()
+                        response = json.loads(stream.readline())
+                finally:
+                    unix_server.shutdown()
+                    unix_server.server_close()
+                    thread.join()
+
+            self.assertEqual(response["id"], 7)
+            self.assertEqual(response["globals"], {"x": 10})
+            self.assertFalse(os.path.exists(path))
@@ -0,0 +1,111 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from spi.ast import Number
+from spi.ast import walk
+from spi.cache import ParseCache
+from spi.closure_compiler import ClosureInterpreter
+from spi.interpreter import Interpreter
+from spi.lexer import Lexer
+from spi.parser import Parser
+from spi.python_codegen import PythonInterpreter
+from spi.stack_interpreter import StackInterpreter
+from spi.stats import profile_file
+from spi.stats import profile_program
+from spi.tracing import RingBufferSink
+from spi.tracing import Tracer
+from spi.vm import VirtualMachine
+
+
+def _read(path):
+    with open(path) as source_file:
+        return source_file.read()
+
+
+def _counters(stats):
+    return {phase.name: phase.counters for phase in stats.phases}
+
+
+class StatsTc(TestCase):
+    def test_walk(self):
+        tree = Parser(lexer=Lexer("program P; begin end.")).parse()
+        names = [type(node).__name__ for node in walk(tree)]
+        self.assertEqual(names, ["Program", "Block", "Compound", "NoOp"])
+
+        tree = Parser(lexer=Lexer(_read("test/data/part10.pas"))).parse()
+        numbers = [node for node in walk(tree) if isinstance(node, Number)]
+        self.assertEqual(len(numbers), 8)
+
+    def test_profile(self):
+        text = _read("test/data/nestedscopes05.pas")
+        engines = (
+            Interpreter, ClosureInterpreter, VirtualMachine, StackInterpreter
+        )
+        for engine_class in engines:
+            sink = RingBufferSink()
+            ar, stats = profile_program(
+                text,
+                engine_class,
+                optimize=True,
+                tracer=Tracer(sinks=[sink], snapshot_frames=False)
+            )
+            self.assertEqual(ar["total"], 115)
+            self.assertEqual(
+                [phase.name for phase in stats.phases],
+                ["lex", "parse", "analyze", "fold", "execute"]
+            )
+            counters = _counters(stats)
+            self.assertEqual(
+                counters["lex"]["tokens"], len(Lexer(text).tokenize_all())
+            )
+            self.assertEqual(counters["analyze"], {"symbols": 6})
+            self.assertLess(counters["fold"]["nodes"], counters["parse"]["nodes"])
+            self.assertEqual(
+                counters["execute"],
+                {"activation_records": 7, "max_call_depth": 3}
+            )
+            # The tracer of the run still gets every activation
+            self.assertEqual(len(sink.events), 14)
+            self.assertTrue(all(p.memory_peak > 0 for p in stats.phases))
+
+    def test_profile_cached(self):
+        text = _read("test/data/part19b.pas")
+        with TemporaryDirectory() as directory:
+            cache = ParseCache(directory)
+            profile_program(text, Interpreter, cache=cache)
+            ar, stats = profile_program(
+                text, PythonInterpreter, cache=cache, trace_memory=False
+            )
+
+        self.assertEqual(
+            [phase.name for phase in stats.phases], ["load", "execute"]
+        )
+        self.assertEqual(stats.get_phase("execute").counters, {})
+        self.assertIsNone(stats.get_phase("load").memory_peak)
+        self.assertEqual(stats.to_dict()["total_time"], stats.total_time())
+
+    def test_profile_file(self):
+        path = "test/data/nestedscopes05.pas"
+        _, expected = profile_program(_read(path), Interpreter, optimize=True)
+        with TemporaryDirectory() as directory:
+            cache = ParseCache(directory)
+            ar, stats = profile_file(
+                path, Interpreter, optimize=True, cache=cache
+            )
+            self.assertEqual(ar["total"], 115)
+            self.assertEqual(
+                [phase.name for phase in stats.phases],
+                ["load", "lex", "parse", "analyze", "fold", "store", "execute"]
+            )
+            counters = _counters(stats)
+            del counters["load"], counters["store"]
+            self.assertEqual(counters, _counters(expected))
+
+            # The key of the file finds the tree stored by the first run
+            ar, stats = profile_file(
+                path, Interpreter, optimize=True, cache=cache
+            )
+            self.assertEqual(ar["total"], 115)
+            self.assertEqual(
+                [phase.name for phase in stats.phases], ["load", "execute"]
+            )
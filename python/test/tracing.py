@@ -0,0 +1,66 @@
+import json
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from spi.closure_compiler import ClosureInterpreter
+from spi.interpreter import Interpreter
+from spi.lexer import Lexer
+from spi.parser import Parser
+from spi.tracing import FileSink
+from spi.tracing import RingBufferSink
+from spi.tracing import Tracer
+from spi.tracing import TraceEventType
+
+
+def _trace(engine_class, tracer):
+    with open("test/data/part19b.pas") as source_file:
+        engine = engine_class(
+            parser=Parser(lexer=Lexer(text=source_file.read())),
+            tracer=tracer
+        )
+    engine.execute()
+    tracer.close()
+
+
+class TracingTc(TestCase):
+    def test_ring_buffer(self):
+        for engine_class in (Interpreter, ClosureInterpreter):
+            sink = RingBufferSink()
+            _trace(engine_class, Tracer(sinks=[sink]))
+
+            events = [(e.event_type, e.name, e.depth) for e in sink.events]
+            self.assertEqual(
+                events,
+                [
+                    (TraceEventType.ENTER, "part19b", 1),
+                    (TraceEventType.ENTER, "alpha", 2),
+                    (TraceEventType.ENTER, "beta", 3),
+                    (TraceEventType.LEAVE, "beta", 3),
+                    (TraceEventType.LEAVE, "alpha", 2),
+                    (TraceEventType.LEAVE, "part19b", 1),
+                ]
+            )
+            leave_beta = sink.events[3]
+            self.assertEqual(
+                leave_beta.frames[0].members, (("a", 5), ("b", 10), ("x", 70))
+            )
+
+    def test_ring_buffer_capacity(self):
+        sink = RingBufferSink(capacity=2)
+        _trace(Interpreter, Tracer(sinks=[sink], snapshot_frames=False))
+
+        self.assertEqual([e.name for e in sink.events], ["alpha", "part19b"])
+        self.assertIsNone(sink.events[0].frames)
+
+    def test_file_sink(self):
+        with TemporaryDirectory() as directory:
+            trace_path = path.join(directory, "trace.jsonl")
+            _trace(Interpreter, Tracer(sinks=[FileSink(trace_path)]))
+            with open(trace_path) as trace_file:
+                events = [json.loads(line) for line in trace_file]
+
+        self.assertEqual(len(events), 6)
+        self.assertEqual(events[2]["event"], "enter")
+        self.assertEqual(events[2]["name"], "beta")
+        self.assertEqual(events[4]["frames"][0]["members"], {"a": 8, "b": 7, "x": 30})